@@ -0,0 +1,404 @@
+'''End-to-end benchmark of learning from and generating messages with MarkovService on synthetic chat histories.
+
+Histories of the specified numbers of messages are generated deterministically from the seed: authors post in bursts
+of several messages a few seconds apart, with a few authors sending most of the messages, and messages are written in
+Polish, with diacritics, capitalised sentence starts, mentions, commands and hyperlinks. They are served from the
+oldest message by a fake TextChannel.history, in pages, as Discord does, and are never held in memory as a whole.
+
+Every size is benchmarked in a separate process, with the models persisted in a temporary directory, and reports:
+
+    learn     messages learned per second, including generating the history
+    rss       peak resident memory of the process, and of the learning workers
+    grammar   distinct transitions, inputs and approximate memory of the model, and the size of its files
+    load      time of the first say after evicting the model, which restores it from its files
+    say       latency percentiles of say, say around a word and say as an author, without pregenerated messages
+
+Run from the repository root, for example:
+
+    python benchmark/markov_benchmark.py --sizes 10k 1M 10M --output results.json
+
+Results can be compared with a previous run, which exits with status 1 if throughput drops, or memory, size or
+latency grows, by more than the tolerance:
+
+    python benchmark/markov_benchmark.py --sizes 10k 1M --baseline results.json --tolerance 0.25
+
+Results for 1M messages with the default arguments, on a single worker (10M messages take about ten times longer):
+
+    learn          4,157 messages/s in 240.6 s (history alone 85,618 messages/s)
+    rss            660.2 MB peak, workers 62.5 MB
+    grammar    2,282,248 transitions, 51,963 inputs, 31,615 starts, 200 authors, 204.4 MB, files 164.6 MB
+    load            50.6 ms
+    say        p50    1.648 ms   p95    1.940 ms   p99    2.894 ms
+    say_word   p50    1.033 ms   p95    1.361 ms   p99    1.666 ms
+    say_author p50   13.695 ms   p95   20.539 ms   p99   24.036 ms
+
+Generating the history takes a small part of learning. Saying as an author is the slowest, as models of authors look
+up every input by bisection and accumulate the occurrences of its row on every step.
+'''
+
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nextcord.utils import time_snowflake
+
+from config import Config
+from model.exception.word_not_learned import WordNotLearned
+from repository.file_markov_repository import FileMarkovRepository
+from service.convertor_service import ConvertorService
+from service.history_crawler_service import HistoryCrawlerService
+from service.markov_service import MarkovService
+
+
+COMMON_WORDS = '''nie się że to jest na ale jak tak już co mnie mi ja ty też być było będzie może można trzeba tylko
+    wszystko dzisiaj jutro wczoraj teraz potem chyba właśnie naprawdę dobrze źle bardzo więcej mniej żeby gdzie kiedy
+    dlaczego który która które którzy coś ktoś nic nikt zawsze nigdy jeszcze wiesz wiem myślę mówię chcę muszę idę
+    jestem jesteś są mają robić zrobić grać gra gry mecz serwer kanał wiadomość gość ziomek żółw gęś ćma łódź źdźbło
+    świat rzecz sprawa pytanie odpowiedź szkoła praca dom miasto pieniądze jedzenie piwo herbata kawa pies
+    kot'''.split()
+
+ONSETS = [ 'b', 'c', 'ch', 'cz', 'd', 'dz', 'dż', 'f', 'g', 'h', 'j', 'k', 'l', 'ł', 'm', 'n', 'p', 'r', 'rz', 's',
+           'sz', 'ś', 't', 'w', 'z', 'ż', 'ź', 'ć', 'pr', 'kr', 'st', 'gł', 'zw', 'wsz', 'prz', 'trz' ]
+NUCLEI = [ 'a', 'e', 'i', 'o', 'u', 'y', 'ą', 'ę', 'ó', 'ie', 'ia', 'io' ]
+CODAS = [ '', '', '', 'ć', 'ń', 'ł', 'k', 'm', 'n', 'ś', 'ż', 'sz', 'ch', 'ść', 'ny', 'wy' ]
+
+NOISE = [ 'https://example.com/{}', '!say {}', '<@{}>', ':kokomi{}:' ]
+
+
+class FakeAuthor:
+    '''Author of messages of the fake history. Authors are compared by identity, like members cached by nextcord.'''
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+
+class FakeMessage:
+    '''Message of the fake history, with the attributes read by MarkovService.'''
+
+    __slots__ = ('id', 'author', 'content', 'created_at', 'channel')
+
+    def __init__(self, id: int, author: FakeAuthor, content: str, created_at: datetime.datetime, channel) -> None:
+        self.id = id
+        self.author = author
+        self.content = content
+        self.created_at = created_at
+        self.channel = channel
+
+
+class FakeTextChannel:
+    '''Channel serving a synthetic history of messages through TextChannel.history. The history is generated again on
+    every call, from the same seed, so it never has to fit in memory.'''
+
+    PAGE_SIZE = 100
+
+    def __init__(self, id: int, messages: int, authors: int, vocabulary: int, seed: int) -> None:
+        self.id = id
+        self.messages = messages
+        self.created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        self.authors = [ FakeAuthor(1000 + i) for i in range(authors) ]
+        self.author_weights = list(accumulate(1 / rank for rank in range(1, authors + 1)))
+
+        rng = random.Random(seed)
+        self.seed = seed
+        self.words = build_vocabulary(vocabulary, rng)
+        self.word_weights = list(accumulate(1 / rank ** 1.1 for rank in range(1, len(self.words) + 1)))
+
+    async def history(self, oldest_first: bool, limit: None, after=None, before=None):
+        '''Yields messages sent after and before the specified objects, from the oldest one. Only the oldest first
+        order is supported, as it is the only one used by the bot.'''
+
+        assert oldest_first and limit is None
+
+        for page in self._generate_pages():
+            for msg in page:
+                if (after is None or msg.id > after.id) and (before is None or msg.id < before.id):
+                    yield msg
+
+            # Discord serves the history in pages, which lets other tasks run in between
+            await asyncio.sleep(0)
+
+    def _generate_pages(self):
+        '''Yields pages of the history, from the oldest message.'''
+
+        rng = random.Random(self.seed)
+        created_at = self.created_at
+        remaining_burst = 0
+        author = self.authors[0]
+        page = []
+
+        for sequence in range(self.messages):
+            # authors post in bursts of messages a few seconds apart, separated by minutes of silence
+            if remaining_burst == 0:
+                author = rng.choices(self.authors, cum_weights=self.author_weights)[0]
+                remaining_burst = min(int(rng.expovariate(1 / 3)) + 1, 40)
+                created_at += datetime.timedelta(seconds=rng.expovariate(1 / 120) + 1)
+
+            else:
+                created_at += datetime.timedelta(seconds=rng.uniform(1, 30))
+
+            remaining_burst -= 1
+
+            id = time_snowflake(created_at) + sequence % 4096
+            page.append(FakeMessage(id, author, self._generate_content(rng), created_at, self))
+
+            if len(page) == self.PAGE_SIZE:
+                yield page
+                page = []
+
+        if len(page) > 0:
+            yield page
+
+    def _generate_content(self, rng: random.Random) -> str:
+        '''Returns the content of a message - a few Zipf-distributed words, with an occasional mention, command or
+        hyperlink.'''
+
+        length = min(int(rng.expovariate(1 / 7)) + 1, 60)
+        tokens = rng.choices(self.words, cum_weights=self.word_weights, k=length)
+
+        if rng.random() < 0.4:
+            tokens[0] = tokens[0].capitalize()
+
+        if rng.random() < 0.05:
+            tokens.insert(rng.randrange(length + 1), rng.choice(NOISE).format(rng.randrange(1_000_000)))
+
+        return ' '.join(tokens)
+
+
+def build_vocabulary(size: int, rng: random.Random) -> list[str]:
+    '''Returns common Polish words, followed by made-up words built from Polish syllables, most frequent first.'''
+
+    words = list(dict.fromkeys(COMMON_WORDS))
+    seen = set(words)
+
+    while len(words) < size:
+        word = ''.join(rng.choice(ONSETS) + rng.choice(NUCLEI) for _ in range(rng.randint(1, 4))) + rng.choice(CODAS)
+
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+
+    return words[:size]
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    '''Returns the 50th, 95th and 99th percentile of latencies, in milliseconds.'''
+
+    quantiles = statistics.quantiles(latencies, n=100)
+
+    return { 'p50': quantiles[49] * 1000, 'p95': quantiles[94] * 1000, 'p99': quantiles[98] * 1000 }
+
+
+async def measure_say(say, samples: int) -> tuple[dict[str, float], int]:
+    '''Returns latency percentiles of say, and the number of calls that failed because the word was not learned.'''
+
+    latencies = []
+    failures = 0
+
+    for _ in range(samples):
+        begin = time.perf_counter()
+
+        try:
+            await say()
+
+        except WordNotLearned:
+            failures += 1
+
+        latencies.append(time.perf_counter() - begin)
+
+    return percentiles(latencies), failures
+
+
+async def benchmark_size(args: argparse.Namespace, messages: int, directory: str) -> dict:
+    '''Learns a channel of the specified number of messages and measures generation from it.'''
+
+    conf = Config()
+    conf.markov_directory = directory
+    conf.markov_learning_chunk_size = args.chunk_size
+    conf.markov_learning_workers = args.workers
+    conf.markov_crawl_concurrency = 1
+    conf.markov_pregenerated_messages = 0
+    conf.markov_pregeneration_watermark = 0
+    conf.markov_memory_budget = args.memory_budget * 1024 * 1024
+    conf.markov_gram_orders = args.gram_orders
+
+    service = MarkovService(conf, FileMarkovRepository(conf), ConvertorService(), HistoryCrawlerService(conf))
+    channel = FakeTextChannel(1, messages, args.authors, args.vocabulary, args.seed)
+    result = { 'messages': messages }
+
+    # the history is generated while learning, so its own rate is measured on a sample for reference
+    sample = min(messages, 100_000)
+    begin = time.perf_counter()
+
+    async for _ in FakeTextChannel(2, sample, args.authors, args.vocabulary, args.seed).history(True, None):
+        pass
+
+    result['history_per_second'] = sample / (time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    learned = await service.learn(channel)
+    result['learn_seconds'] = time.perf_counter() - begin
+    result['learn_per_second'] = learned / result['learn_seconds']
+
+    grammar = service.grammars[channel.id]
+    result['transitions'] = len(grammar)
+    result['inputs'] = len(grammar.input_vocabulary)
+    result['sentence_starts'] = len(service.sentence_starts[channel.id])
+    result['authors'] = len(service.author_grammars.get(channel.id, {}))
+    result['model_mb'] = service.model_sizes[channel.id] / 1024 / 1024
+    result['files_mb'] = sum(entry.stat().st_size for entry in os.scandir(directory)) / 1024 / 1024
+
+    # the model is restored from its files on the next use after being evicted
+    service._evict(channel.id)
+    service.model_sizes.pop(channel.id, None)
+
+    begin = time.perf_counter()
+    await service.say(channel)
+    result['load_seconds'] = time.perf_counter() - begin
+
+    rng = random.Random(args.seed)
+    words = channel.words[:1000]
+    author = channel.authors[0]
+
+    result['say'], _ = await measure_say(lambda: service.say(channel), args.samples)
+    result['say_word'], result['say_word_failures'] = await measure_say(
+        lambda: service.say(channel, rng.choice(words)), args.samples)
+    result['say_author'], _ = await measure_say(lambda: service.say(channel, author=author), args.samples)
+
+    # peak memory of the workers is accounted once they are joined
+    service.executor.shutdown()
+
+    # ru_maxrss is in kilobytes on Linux
+    result['rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result['workers_rss_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    return result
+
+
+def run_size(args: argparse.Namespace, messages: int, connection) -> None:
+    '''Entry point of the process benchmarking a single size, so its peak memory is not affected by other sizes.'''
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection.send(asyncio.run(benchmark_size(args, messages, directory)))
+
+
+def report(result: dict) -> None:
+    print(f'{result["messages"]:,} messages')
+    print(f'  learn    {result["learn_per_second"]:10,.0f} messages/s in {result["learn_seconds"]:.1f} s '
+          f'(history alone {result["history_per_second"]:,.0f} messages/s)')
+    print(f'  rss      {result["rss_mb"]:10.1f} MB peak, workers {result["workers_rss_mb"]:.1f} MB')
+    print(f'  grammar  {result["transitions"]:10,} transitions, {result["inputs"]:,} inputs, '
+          f'{result["sentence_starts"]:,} starts, {result["authors"]:,} authors, {result["model_mb"]:.1f} MB, '
+          f'files {result["files_mb"]:.1f} MB')
+    print(f'  load     {result["load_seconds"] * 1000:10.1f} ms')
+
+    for name in ('say', 'say_word', 'say_author'):
+        latency = result[name]
+        print(f'  {name:<10} p50 {latency["p50"]:8.3f} ms   p95 {latency["p95"]:8.3f} ms   '
+              f'p99 {latency["p99"]:8.3f} ms')
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    '''Returns descriptions of metrics that regressed by more than the tolerance relative to the baseline.'''
+
+    # metrics where higher is better, and where lower is better
+    higher = [ 'learn_per_second' ]
+    lower = [ 'rss_mb', 'model_mb', 'files_mb', 'load_seconds' ]
+    lower += [ f'{name}.{percentile}' for name in ('say', 'say_word', 'say_author') for percentile in ('p50', 'p95') ]
+
+    def get(result: dict, metric: str) -> float:
+        for key in metric.split('.'):
+            result = result[key]
+
+        return result
+
+    baseline_by_size = { result['messages']: result for result in baseline }
+    regressions = []
+
+    for result in results:
+        previous = baseline_by_size.get(result['messages'])
+
+        if previous is None:
+            continue
+
+        for metric in higher + lower:
+            old, new = get(previous, metric), get(result, metric)
+            regressed = new < old * (1 - tolerance) if metric in higher else new > old * (1 + tolerance)
+
+            if regressed:
+                regressions.append(f'{result["messages"]:,} messages: {metric} {old:.3f} -> {new:.3f}')
+
+    return regressions
+
+
+def parse_size(size: str) -> int:
+    multipliers = { 'k': 1_000, 'm': 1_000_000 }
+    suffix = size[-1].lower()
+
+    return int(float(size[:-1]) * multipliers[suffix]) if suffix in multipliers else int(size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=[ 10_000, 1_000_000, 10_000_000 ])
+    parser.add_argument('--authors', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=30_000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--memory-budget', type=int, default=64, help='in megabytes')
+    parser.add_argument('--gram-orders', type=int, nargs='+', default=[ 2 ])
+    parser.add_argument('--samples', type=int, default=200, help='say calls measured per variant')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write the results to, as JSON')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    for messages in args.sizes:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=run_size, args=(args, messages, sender))
+        process.start()
+        sender.close()
+
+        try:
+            result = receiver.recv()
+
+        except EOFError:
+            sys.exit(f'benchmark of {messages:,} messages failed')
+
+        process.join()
+
+        report(result)
+        results.append(result)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+
+        for regression in regressions:
+            print(f'regression: {regression}')
+
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
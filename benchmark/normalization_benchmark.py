@@ -0,0 +1,137 @@
+'''Benchmark of filtering and normalizing texts learned by the Markov chain model.
+
+Compares MarkovNormalizer with the previous implementation, which built the table of Polish letters and substituted
+every letter with a separate regular expression on every call, and filtered messages in two passes. Run from the
+repository root:
+
+    python benchmark/normalization_benchmark.py --messages 100000
+'''
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.markov.markov_normalizer import MarkovNormalizer
+
+
+WORDS = [
+    'zażółć', 'gęślą', 'jaźń', 'Łódź', 'świetnie', 'dzień', 'dobry', 'kot', 'pies', 'ŻÓŁW', 'no', 'i', 'co', 'teraz',
+    'xD', 'lol', 'gg', 'ok', 'Ąę', '2137', 'kek', 'jutro', 'wczoraj', 'może', 'chyba', 'nie', 'tak', 'źle', 'ćma'
+]
+
+DECORATIONS = [ '!play', 'https://example.com/a?b=c', '<@123456789>', '<:emote:987654321>', ':)', '...', '?!' ]
+
+
+def normalize_input(input: str) -> str:
+    input = input.lower()
+
+    conversion_dict = {
+        'ą': 'a',
+        'ć': 'c',
+        'ę': 'e',
+        'ł': 'l',
+        'ń': 'n',
+        'ó': 'o',
+        'ś': 's',
+        'ź': 'z',
+        'ż': 'z'
+    }
+
+    for k, v in conversion_dict.items():
+        input = re.sub(rf'{k}', v, input)
+
+    input = re.sub(r'[^a-zA-Z0-9\s]', '@', input)
+
+    return input
+
+
+def filter_messages(messages: list[str]) -> list[str]:
+    messages = [ re.sub(r'(?:https?|ftp)\:\/\/.*?(?:$|\s)', '', msg)      for msg in messages ]
+    messages = [ re.sub(r'(?:^|\s)[!<$%^&*\-\+=\?\/\.\,][^\s]+', '', msg) for msg in messages ]
+
+    return messages
+
+
+def generate_messages(count: int, rng: random.Random) -> list[str]:
+    messages = []
+
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(1, 20))
+
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(DECORATIONS))
+
+        messages.append(' '.join(words))
+
+    return messages
+
+
+def previous(messages: list[str]) -> int:
+    '''Filters and tokenizes messages, and normalizes the input of every bigram, as learning used to.'''
+
+    inputs = 0
+
+    for msg in filter_messages(messages):
+        tokens = [ m for m in msg.split(' ') if m != '' ]
+
+        for token in tokens[:-1]:
+            normalize_input(token)
+            inputs += 1
+
+    return inputs
+
+
+def current(messages: list[str], normalizer: MarkovNormalizer) -> int:
+    '''Filters and normalizes messages in batches, and tokenizes both forms, as learning does now.'''
+
+    inputs = 0
+    filtered = normalizer.filter(messages)
+
+    for msg, normalized in zip(filtered, normalizer.normalize_batch(filtered)):
+        tokens = [ m for m in msg.split(' ') if m != '' ]
+        normalized_tokens = [ m for m in normalized.split(' ') if m != '' ]
+
+        inputs += len(normalized_tokens[:len(tokens) - 1])
+
+    return inputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    messages = generate_messages(args.messages, random.Random(args.seed))
+    normalizer = MarkovNormalizer()
+
+    for name, run in [ ('previous', lambda: previous(messages)), ('current', lambda: current(messages, normalizer)) ]:
+        begin = time.perf_counter()
+        inputs = run()
+        elapsed = time.perf_counter() - begin
+
+        print(f'{name:>8}: {elapsed:6.2f} s, {args.messages / elapsed:10.0f} messages/s, {inputs} inputs')
+
+    begin = time.perf_counter()
+
+    for _ in range(100_000):
+        normalizer.normalize('Zażółć')
+
+    single = (time.perf_counter() - begin) / 100_000
+    begin = time.perf_counter()
+
+    for _ in range(100_000):
+        normalize_input('Zażółć')
+
+    single_previous = (time.perf_counter() - begin) / 100_000
+
+    print(f'single input, as in say: previous {single_previous * 1e6:.2f} us, current {single * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    main()
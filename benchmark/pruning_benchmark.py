@@ -0,0 +1,143 @@
+'''Measures the memory and accuracy trade-offs of pruning and approximate counting of Markov chain models.
+
+A synthetic corpus is generated by a bigram process over Zipf-distributed words, and learned in chunks, as the learn
+command does. Every variant is compared with the exact model: accuracy is the total variation distance between the
+distributions of outputs of the variant and of the exact model, averaged over inputs weighted by their occurrences
+(0 means identical, 1 means disjoint; missing inputs count as 1). Run from the repository root:
+
+    python benchmark/pruning_benchmark.py --transitions 2000000
+
+Results for the default arguments (2M transitions, 20k words, Zipf exponent 1.2):
+
+    variant                       transitions    memory   distance
+    exact                             1032791   22.2 MB      0.000
+    prune min_count=2                  210683   11.2 MB      0.411
+    prune min_count=3                  118738   10.1 MB      0.503
+    prune min_input_count=100          250460    5.9 MB      0.696
+    max_row_size=16                    320000   12.5 MB      0.436
+    max_row_size=64                    976227   21.5 MB      0.047
+    max_row_size=256                  1010438   22.0 MB      0.018
+
+Four in five distinct transitions are seen once, so pruning them removes most transitions, but they carry two fifths
+of the probability mass, and about half of the remaining memory is taken by rows and tokens rather than transitions.
+Pruning rare inputs saves the most memory, at the cost of every message that would pass through them. Capping rows
+bounds the memory of every input, and its error falls quickly once the cap exceeds the number of transitions that
+matter in a typical row.
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.markov.markov_grammar import MarkovGrammar
+
+
+def generate_chunks(words: int, transitions: int, chunk_size: int, exponent: float, rng: random.Random):
+    '''Yields chunks of transitions of a bigram process, in which both words and their successors follow Zipf's
+    law.'''
+
+    weights = [ 1 / rank ** exponent for rank in range(1, words + 1) ]
+    current = 0
+
+    for _ in range(transitions // chunk_size):
+        chunk = Counter()
+        ranks = rng.choices(range(words), weights, k=chunk_size)
+        restarts = rng.choices(range(words), weights, k=chunk_size)
+
+        for rank, restart in zip(ranks, restarts):
+            following = (current * 7919 + rank) % words
+
+            chunk[(f'w{current}', f'w{current} w{following}')] += 1
+
+            # end the message every now and then, starting the next one with a frequent word
+            current = restart if rng.random() < 0.1 else following
+
+        yield chunk
+
+
+def get_rows(grammar: MarkovGrammar) -> dict[str, dict[str, int]]:
+    return {
+        input: { grammar._get_output(key): count for key, count in zip(keys, counts) }
+        for input, keys, counts in zip(grammar.input_vocabulary.tokens, grammar.row_keys, grammar.row_counts)
+    }
+
+
+def get_distance(exact: dict[str, dict[str, int]], variant: dict[str, dict[str, int]]) -> float:
+    total = sum(sum(row.values()) for row in exact.values())
+    distance = 0
+
+    for input, row in exact.items():
+        weight = sum(row.values())
+        other = variant.get(input)
+
+        if other is None:
+            distance += weight
+
+            continue
+
+        other_weight = sum(other.values())
+        outputs = row.keys() | other.keys()
+        row_distance = sum(abs(row.get(output, 0) / weight - other.get(output, 0) / other_weight) for output in outputs)
+
+        distance += weight * row_distance / 2
+
+    return distance / total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=20_000)
+    parser.add_argument('--transitions', type=int, default=2_000_000)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--exponent', type=float, default=1.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = list(generate_chunks(args.words, args.transitions, args.chunk_size, args.exponent, random.Random(args.seed)))
+
+    exact = MarkovGrammar()
+
+    for chunk in chunks:
+        exact.update(chunk)
+
+    exact_rows = get_rows(exact)
+
+    variants = []
+
+    for min_count, min_input_count in [ (2, 1), (3, 1), (1, 100) ]:
+        pruned = MarkovGrammar()
+
+        for chunk in chunks:
+            pruned.update(chunk)
+
+        pruned.prune(min_count, min_input_count)
+
+        name = f'prune min_count={min_count}' if min_count > 1 else f'prune min_input_count={min_input_count}'
+        variants.append((name, pruned))
+
+    for max_row_size in [ 16, 64, 256 ]:
+        begin = time.perf_counter()
+        capped = MarkovGrammar(max_row_size=max_row_size)
+
+        for chunk in chunks:
+            capped.update(chunk)
+
+        print(f'learned max_row_size={max_row_size} in {time.perf_counter() - begin:.1f} s', file=sys.stderr)
+        variants.append((f'max_row_size={max_row_size}', capped))
+
+    print(f'{"variant":<28} {"transitions":>12} {"memory":>9} {"distance":>10}')
+    print(f'{"exact":<28} {len(exact):>12} {exact.memory_size() / 1e6:>6.1f} MB {0:>10.3f}')
+
+    for name, grammar in variants:
+        distance = get_distance(exact_rows, get_rows(grammar))
+
+        print(f'{name:<28} {len(grammar):>12} {grammar.memory_size() / 1e6:>6.1f} MB {distance:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+'''Micro-benchmark of generating messages from a large Markov chain model.
+
+Compares MarkovGenerator with rebuilding the whole message on every step, as MarkovService.say did before, and the
+throughput of generating all messages at once with MarkovBatchGenerator. Run from the repository root:
+
+    python benchmark/say_benchmark.py --transitions 1000000 --max-length 500
+'''
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.markov.markov_batch_generator import MarkovBatchGenerator
+from model.markov.markov_generator import MarkovGenerator
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.markov_normalizer import MarkovNormalizer
+
+
+def build_grammar(vocabulary_size: int, transitions: int, rng: random.Random) -> MarkovGrammar:
+    '''Builds a bigram grammar over random words, with word frequencies following Zipf's law.'''
+
+    words = [ ''.join(rng.choices('abcdefghijklmnopqrstuvwxyząćęłńóśźż', k=rng.randint(2, 9))) for _ in range(vocabulary_size) ]
+    weights = [ 1 / rank for rank in range(1, vocabulary_size + 1) ]
+    normalize = MarkovNormalizer().normalize
+
+    grammar = MarkovGrammar()
+    counts = {}
+
+    for _ in range(transitions // 10_000):
+        firsts = rng.choices(words, weights, k=10_000)
+        seconds = rng.choices(words, weights, k=10_000)
+
+        for first, second in zip(firsts, seconds):
+            key = (normalize(first), f'{first} {second}')
+            counts[key] = counts.get(key, 0) + 1
+
+    grammar.update(counts)
+
+    return grammar
+
+
+def generate_by_rebuilding(grammar: MarkovGrammar, normalize, max_length: int, start: str) -> str:
+    generated_message = start
+
+    try:
+        while len(generated_message) < max_length:
+            input = normalize(' '.join(generated_message.split(' ')[-1:]))
+            output = grammar[input]
+
+            generated_message = f'{" ".join(generated_message.split(" ")[:-1])} {output}'
+
+    finally:
+        return generated_message
+
+
+def measure(generate, starts: list[str]) -> list[float]:
+    latencies = []
+
+    for start in starts:
+        begin = time.perf_counter()
+        generate(start)
+        latencies.append(time.perf_counter() - begin)
+
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+
+    print(f'{name:>12}: p50 {quantiles[49] * 1000:8.3f} ms   p95 {quantiles[94] * 1000:8.3f} ms   '
+          f'mean {statistics.fmean(latencies) * 1000:8.3f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vocabulary', type=int, default=10_000)
+    parser.add_argument('--transitions', type=int, default=1_000_000)
+    parser.add_argument('--max-length', type=int, default=500)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    begin = time.perf_counter()
+    grammar = build_grammar(args.vocabulary, args.transitions, rng)
+    print(f'built grammar of {len(grammar.row_keys)} inputs in {time.perf_counter() - begin:.1f} s')
+
+    normalize = MarkovNormalizer().normalize
+    starts = rng.choices(grammar.input_vocabulary.tokens, k=args.messages)
+    generator = MarkovGenerator(grammar, [2], args.max_length, normalize)
+
+    # build cumulative occurrences of every row, so neither variant pays for it
+    for row in range(len(grammar.row_keys)):
+        grammar[grammar.input_vocabulary[row]]
+
+    lengths = [ len(' '.join(generator.generate(start))) for start in starts ]
+    print(f'mean message length {statistics.fmean(lengths):.0f} characters')
+
+    report('rebuilding', measure(lambda start: generate_by_rebuilding(grammar, normalize, args.max_length, start), starts))
+    report('generator', measure(lambda start: ' '.join(generator.generate(start)), starts))
+
+    begin = time.perf_counter()
+    batch_generator = MarkovBatchGenerator(grammar, 1, args.max_length, normalize)
+    print(f'built batch generator in {time.perf_counter() - begin:.1f} s')
+
+    looping = sum(measure(lambda start: ' '.join(generator.generate(start)), starts))
+    # the median of repeated batches, as the first one also pays for warming up NumPy
+    batch = statistics.median(measure(batch_generator.generate, [ starts ] * 11))
+    print(f'{"looping":>12}: {len(starts) / looping:10.0f} messages per second')
+    print(f'{"batch":>12}: {len(starts) / batch:10.0f} messages per second')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,5 @@
 import logging
 
-from composer import conf
-from factory.standard_discord_bot_factory import StandardDiscordBotFactory
-from runner.standard_discord_bot_runner import StandardDiscordBotRunner
-
 
 class App:
     '''Entry point of the program.'''
@@ -11,6 +7,12 @@ class App:
     def start(self) -> None:
         '''Starts the program.'''
 
+        # imported here rather than at the top of the module, as worker processes spawned for learning run this module
+        # again, and must not create the services of the bot
+        from composer import conf
+        from factory.standard_discord_bot_factory import StandardDiscordBotFactory
+        from runner.standard_discord_bot_runner import StandardDiscordBotRunner
+
         fac = StandardDiscordBotFactory(conf)
         StandardDiscordBotRunner(conf, fac).run()
 
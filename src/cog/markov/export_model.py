@@ -0,0 +1,117 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from functools import wraps
+from typing import BinaryIO, Callable, Type, Union
+
+import nextcord
+from nextcord.ext import commands
+
+from composer import conf, embed_sender_service, markov_service, user_management_service
+from messages import Messages
+from model.exception.bad_argument import BadArgument
+from model.exception.channel_not_learned import ChannelNotLearned
+from model.exception.in_server import InServer
+from model.exception.missing_argument import MissingArgument
+from model.exception.not_owner import NotOwner
+from service.api_wrapper_service import APIWrapperService
+from service.embed_sender_service import EmbedSenderService
+from service.markov_service import MarkovService
+from service.user_management_service import UserManagementService
+
+
+class ExportModelCog(commands.Cog):
+    '''Class representing the export model command. This sends the model learned from the specified channel as a file,
+    which can be imported by another instance of the bot. Models too large to be sent are saved in the directory of
+    models instead.'''
+
+    def __init__(
+            self,
+            aw: Type[APIWrapperService],
+            ess: EmbedSenderService,
+            ums: UserManagementService,
+            ms: MarkovService,
+            directory: str) -> None:
+        self.api_wrapper = aw
+        self.embed_sender_service = ess
+        self.user_management_service = ums
+        self.markov_service = ms
+        self.directory = directory
+
+    @staticmethod
+    def checker(func: Callable) -> Callable:
+        '''Decorator checking whether the export model command can be run.
+
+        The command can be run if invoked in the private chat, by the owner, and the user provided ID of a learned
+        channel.'''
+
+        @wraps(func)
+        async def decorator(self: 'ExportModelCog', ctx: commands.Context, *, channel: Union[int, str]) -> None:
+            api = self.api_wrapper(ctx)
+
+            try:
+                self.user_management_service.check_if_owner(api.get_author_id())
+
+                api.check_if_author_not_in_server()
+
+                if channel is ...:
+                    raise MissingArgument
+
+                if type(channel) is not int:
+                    raise BadArgument
+
+                await func(self, ctx, channel=channel)
+
+            except NotOwner:
+                pass
+
+            except InServer:
+                await self.embed_sender_service.send_error(ctx, Messages.AUTHOR_IN_SERVER)
+
+            except MissingArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MISSING_ARGUMENTS)
+
+            except BadArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MISSING_CHANNEL_ID)
+
+            except ChannelNotLearned:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_CHANNEL_NOT_LEARNED)
+
+        return decorator
+
+    @commands.command(name='exportmodel')
+    @checker
+    async def export_model_command(self, ctx: commands.Context, *, channel: Union[int, str] = ...) -> None:
+        '''Body of the command.'''
+
+        # the archive is streamed to a temporary file rather than built in memory, as models may be large
+        with tempfile.TemporaryFile() as f:
+            await self.markov_service.export_model(channel, f)
+
+            f.seek(0)
+
+            try:
+                await self.embed_sender_service.send_file(ctx, Messages.MARKOV_EXPORTED_MODEL, f, f'{channel}.kkma')
+
+            except nextcord.HTTPException as e:
+                if e.status != 413:
+                    raise
+
+                # the archive exceeds the size of attachments, so the owner is told where to fetch it from instead
+                path = os.path.abspath(os.path.join(self.directory, f'{channel}.kkma'))
+
+                f.seek(0)
+
+                await asyncio.to_thread(self._save, f, path)
+                await self.embed_sender_service.send_success(ctx, f'{Messages.MARKOV_EXPORTED_MODEL_TO_FILE}: {path}')
+
+    @staticmethod
+    def _save(file: BinaryIO, path: str) -> None:
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(file, f)
+
+
+def setup(bot: commands.Bot) -> None:
+    bot.add_cog(ExportModelCog(
+        APIWrapperService, embed_sender_service, user_management_service, markov_service, conf.markov_directory))
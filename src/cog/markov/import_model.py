@@ -0,0 +1,92 @@
+import tempfile
+from functools import wraps
+from typing import Callable, Type, Union
+
+from nextcord.ext import commands
+
+from composer import embed_sender_service, markov_service, user_management_service
+from messages import Messages
+from model.exception.bad_argument import BadArgument
+from model.exception.in_server import InServer
+from model.exception.invalid_model_archive import InvalidModelArchive
+from model.exception.missing_argument import MissingArgument
+from model.exception.not_owner import NotOwner
+from service.api_wrapper_service import APIWrapperService
+from service.embed_sender_service import EmbedSenderService
+from service.markov_service import MarkovService
+from service.user_management_service import UserManagementService
+
+
+class ImportModelCog(commands.Cog):
+    '''Class representing the import model command. This replaces the model of the specified channel with the model
+    from the attached file, exported by the export model command.'''
+
+    def __init__(
+            self,
+            aw: Type[APIWrapperService],
+            ess: EmbedSenderService,
+            ums: UserManagementService,
+            ms: MarkovService) -> None:
+        self.api_wrapper = aw
+        self.embed_sender_service = ess
+        self.user_management_service = ums
+        self.markov_service = ms
+
+    @staticmethod
+    def checker(func: Callable) -> Callable:
+        '''Decorator checking whether the import model command can be run.
+
+        The command can be run if invoked in the private chat, by the owner, and the user provided ID of the channel
+        and attached an exported model.'''
+
+        @wraps(func)
+        async def decorator(self: 'ImportModelCog', ctx: commands.Context, *, channel: Union[int, str]) -> None:
+            api = self.api_wrapper(ctx)
+
+            try:
+                self.user_management_service.check_if_owner(api.get_author_id())
+
+                api.check_if_author_not_in_server()
+
+                if channel is ... or len(api.get_attachments()) == 0:
+                    raise MissingArgument
+
+                if type(channel) is not int:
+                    raise BadArgument
+
+                await func(self, ctx, channel=channel)
+
+            except NotOwner:
+                pass
+
+            except InServer:
+                await self.embed_sender_service.send_error(ctx, Messages.AUTHOR_IN_SERVER)
+
+            except MissingArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MISSING_ARGUMENTS)
+
+            except BadArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MISSING_CHANNEL_ID)
+
+            except InvalidModelArchive:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_INVALID_MODEL_ARCHIVE)
+
+        return decorator
+
+    @commands.command(name='importmodel')
+    @checker
+    async def import_model_command(self, ctx: commands.Context, *, channel: Union[int, str] = ...) -> None:
+        '''Body of the command.'''
+
+        with tempfile.TemporaryFile() as f:
+            await self.api_wrapper(ctx).get_attachments()[0].save(f)
+
+            f.seek(0)
+
+            await self.markov_service.import_model(channel, f)
+
+        await self.embed_sender_service.send_success(ctx, Messages.MARKOV_IMPORTED_MODEL)
+
+
+def setup(bot: commands.Bot) -> None:
+    bot.add_cog(ImportModelCog(APIWrapperService, embed_sender_service, user_management_service, markov_service))
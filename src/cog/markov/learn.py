@@ -1,3 +1,4 @@
+import logging
 from functools import wraps
 from typing import Callable, Type, Union
 
@@ -8,6 +9,7 @@ from composer import embed_sender_service, markov_service, user_management_servi
 from messages import Messages
 from model.exception.bad_argument import BadArgument
 from model.exception.banned import Banned
+from model.exception.learning_cancelled import LearningCancelled
 from model.exception.missing_argument import MissingArgument
 from model.exception.no_new_messages import NoNewMessages
 from model.exception.not_in_server import NotInServer
@@ -18,8 +20,8 @@ from service.user_management_service import UserManagementService
 
 
 class LearnCog(commands.Cog):
-    '''Class representing the learn command. This starts the learning process on the specified channel,
-    or updates the model on new messages.'''
+    '''Class representing the learn command. This starts the learning process on the specified channel in the
+    background, or updates the model on new messages.'''
 
     def __init__(
             self,
@@ -36,8 +38,7 @@ class LearnCog(commands.Cog):
     def checker(func: Callable) -> Callable:
         '''Decorator checking whether the learn command can be run.
         
-        The command can be run if invoked in the server, the user provided a correct argument, and there are messages
-        the bot can learn from.'''
+        The command can be run if invoked in the server, and the user provided a correct argument.'''
 
         @wraps(func)
         async def decorator(self: 'LearnCog', ctx: commands.Context, *, channel: Union[TextChannel, str]):
@@ -67,9 +68,6 @@ class LearnCog(commands.Cog):
             
             except BadArgument:
                 await self.embed_sender_service.send_error(ctx, Messages.MARKOV_BAD_ARGUMENT)
-        
-            except NoNewMessages:
-                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_NO_NEW_MESSAGES)
 
         return decorator
 
@@ -78,9 +76,29 @@ class LearnCog(commands.Cog):
     async def learn_command(self, ctx: commands.Context, *, channel: Union[TextChannel, str] = ...) -> None:
         '''Body of the command.'''
 
-        number_of_messages = await self.markov_service.learn(channel)
+        async def on_finished(number_of_messages: int) -> None:
+            await self.embed_sender_service.send_success(ctx, Messages.FINISHED_LEARNING(number_of_messages))
+
+        async def on_failed(error: Exception) -> None:
+            if isinstance(error, NoNewMessages):
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_NO_NEW_MESSAGES)
+
+            elif isinstance(error, LearningCancelled):
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_LEARNING_CANCELLED)
+
+            else:
+                logging.error(f'learn_command has error: "{error}"')
+
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_LEARNING_FAILED)
+
+        job = self.markov_service.start_learning(channel, on_finished, on_failed)
+
+        # the job of a learning in progress, including a queued one, already has the listeners of its other callers
+        if len(job.listeners) > 1:
+            await self.embed_sender_service.send_success(ctx, Messages.JOINED_LEARNING)
 
-        await self.embed_sender_service.send_success(ctx, Messages.FINISHED_LEARNING(number_of_messages))
+        else:
+            await self.embed_sender_service.send_success(ctx, Messages.STARTED_LEARNING)
 
 
 def setup(bot: commands.Bot) -> None:
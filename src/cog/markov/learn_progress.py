@@ -0,0 +1,89 @@
+import datetime
+from functools import wraps
+from typing import Callable, Type, Union
+
+from nextcord import TextChannel
+from nextcord.ext import commands
+
+from composer import embed_sender_service, markov_service, user_management_service
+from messages import Messages
+from model.exception.bad_argument import BadArgument
+from model.exception.banned import Banned
+from model.exception.missing_argument import MissingArgument
+from model.exception.not_in_server import NotInServer
+from model.exception.not_learning import NotLearning
+from service.api_wrapper_service import APIWrapperService
+from service.embed_sender_service import EmbedSenderService
+from service.markov_service import MarkovService
+from service.user_management_service import UserManagementService
+
+
+class LearnProgressCog(commands.Cog):
+    '''Class representing the learn progress command. This shows the progress of learning from the specified channel
+    running in the background.'''
+
+    def __init__(
+            self,
+            aw: Type[APIWrapperService],
+            ess: EmbedSenderService,
+            ums: UserManagementService,
+            ms: MarkovService) -> None:
+        self.api_wrapper = aw
+        self.embed_sender_service = ess
+        self.user_management_service = ums
+        self.markov_service = ms
+
+    @staticmethod
+    def checker(func: Callable) -> Callable:
+        '''Decorator checking whether the learn progress command can be run.
+        
+        The command can be run if invoked in the server, the user provided a correct argument, and the bot is learning
+        from the channel.'''
+
+        @wraps(func)
+        async def decorator(self: 'LearnProgressCog', ctx: commands.Context, *, channel: Union[TextChannel, str]):
+            api = self.api_wrapper(ctx)
+
+            try:
+                await self.user_management_service.check_if_not_banned(api.get_author_id())
+
+                api.check_if_author_in_server()
+
+                if channel is ...:
+                    raise MissingArgument
+                
+                if type(channel) is not TextChannel:
+                    raise BadArgument
+
+                await func(self, ctx, channel=channel)
+
+            except Banned:
+                pass
+
+            except NotInServer:
+                await self.embed_sender_service.send_error(ctx, Messages.AUTHOR_NOT_IN_SERVER)
+
+            except MissingArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MISSING_ARGUMENTS)
+            
+            except BadArgument:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_BAD_ARGUMENT)
+            
+            except NotLearning:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_NOT_LEARNING)
+
+        return decorator
+
+    @commands.command(name='learnprogress')
+    @checker
+    async def learn_progress_command(self, ctx: commands.Context, *, channel: Union[TextChannel, str] = ...) -> None:
+        '''Body of the command.'''
+
+        job = self.markov_service.get_learn_job(channel.id)
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        await self.embed_sender_service.send_success(ctx, Messages.LEARNING_PROGRESS(job, now))
+
+
+def setup(bot: commands.Bot) -> None:
+    bot.add_cog(LearnProgressCog(APIWrapperService, embed_sender_service, user_management_service, markov_service))
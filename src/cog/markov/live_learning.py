@@ -0,0 +1,27 @@
+from nextcord import Message, TextChannel
+from nextcord.ext import commands
+
+from composer import conf, markov_service
+from service.markov_service import MarkovService
+
+
+class LiveLearningCog(commands.Cog):
+    '''Class representing the live learning listener. This feeds new messages sent in learned channels into the
+    model, so the model stays up to date without running the learn command again.'''
+
+    def __init__(self, ms: MarkovService) -> None:
+        self.markov_service = ms
+
+    @commands.Cog.listener()
+    async def on_message(self, message: Message) -> None:
+        '''Body of the listener.'''
+
+        if type(message.channel) is not TextChannel:
+            return
+
+        self.markov_service.learn_live_message(message)
+
+
+def setup(bot: commands.Bot) -> None:
+    if conf.markov_live_learning:
+        bot.add_cog(LiveLearningCog(markov_service))
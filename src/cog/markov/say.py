@@ -1,17 +1,19 @@
 from functools import wraps
-from typing import Callable, Type, Union
+from typing import Callable, Optional, Type, Union
 
-from nextcord import TextChannel
+from nextcord import Member, TextChannel
 from nextcord.ext import commands
 
 from composer import embed_sender_service, markov_service, user_management_service
 from messages import Messages
+from model.exception.author_not_learned import AuthorNotLearned
 from model.exception.bad_argument import BadArgument
 from model.exception.banned import Banned
 from model.exception.channel_not_learned import ChannelNotLearned
 from model.exception.missing_argument import MissingArgument
 from model.exception.not_enough_data import NotEnoughData
 from model.exception.not_in_server import NotInServer
+from model.exception.word_not_learned import WordNotLearned
 from service.api_wrapper_service import APIWrapperService
 from service.embed_sender_service import EmbedSenderService
 from service.markov_service import MarkovService
@@ -40,7 +42,13 @@ class SayCog(commands.Cog):
         The command can be run if invoked in the server, the user provided a correct argument, .'''
 
         @wraps(func)
-        async def decorator(self: 'SayCog', ctx: commands.Context, *, channel: Union[TextChannel, str]):
+        async def decorator(
+                self: 'SayCog',
+                ctx: commands.Context,
+                channel: Union[TextChannel, str],
+                author: Optional[Member],
+                *,
+                word: str):
             api = self.api_wrapper(ctx)
 
             try:
@@ -54,7 +62,7 @@ class SayCog(commands.Cog):
                 if type(channel) is not TextChannel:
                     raise BadArgument
 
-                await func(self, ctx, channel=channel)
+                await func(self, ctx, channel, author, word=word if word is not ... else None)
 
             except Banned:
                 pass
@@ -74,14 +82,26 @@ class SayCog(commands.Cog):
             except NotEnoughData:
                 await self.embed_sender_service.send_error(ctx, Messages.MARKOV_NOT_ENOUGH_DATA)
 
+            except WordNotLearned:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_WORD_NOT_LEARNED)
+
+            except AuthorNotLearned:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_AUTHOR_NOT_LEARNED)
+
         return decorator
 
     @commands.command(name='say')
     @checker
-    async def say_command(self, ctx: commands.Context, *, channel: Union[TextChannel, str] = ...) -> None:
+    async def say_command(
+            self,
+            ctx: commands.Context,
+            channel: Union[TextChannel, str] = ...,
+            author: Optional[Member] = None,
+            *,
+            word: str = ...) -> None:
         '''Body of the command.'''
 
-        msg = await self.markov_service.say(channel)
+        msg = await self.markov_service.say(channel, word, author)
 
         await self.embed_sender_service.send_success(ctx, msg)
 
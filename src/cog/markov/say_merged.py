@@ -0,0 +1,91 @@
+from functools import wraps
+from typing import Callable, Type
+
+from nextcord import TextChannel
+from nextcord.ext import commands
+
+from composer import embed_sender_service, markov_service, user_management_service
+from messages import Messages
+from model.exception.banned import Banned
+from model.exception.channel_not_learned import ChannelNotLearned
+from model.exception.not_enough_data import NotEnoughData
+from model.exception.not_in_server import NotInServer
+from model.exception.word_not_learned import WordNotLearned
+from service.api_wrapper_service import APIWrapperService
+from service.embed_sender_service import EmbedSenderService
+from service.markov_service import MarkovService
+from service.user_management_service import UserManagementService
+
+
+class SayMergedCog(commands.Cog):
+    '''Class representing the saymerged command. This generates a message based on previous messages sent on all the
+    specified channels together, or on all channels of the server, and sends it.'''
+
+    def __init__(
+            self,
+            aw: Type[APIWrapperService],
+            ess: EmbedSenderService,
+            ums: UserManagementService,
+            ms: MarkovService) -> None:
+        self.api_wrapper = aw
+        self.embed_sender_service = ess
+        self.user_management_service = ums
+        self.markov_service = ms
+
+    @staticmethod
+    def checker(func: Callable) -> Callable:
+        '''Decorator checking whether the saymerged command can be run.
+
+        The command can be run if invoked in the server.'''
+
+        @wraps(func)
+        async def decorator(self: 'SayMergedCog', ctx: commands.Context, channels: list[TextChannel], *, word: str):
+            api = self.api_wrapper(ctx)
+
+            try:
+                await self.user_management_service.check_if_not_banned(api.get_author_id())
+
+                api.check_if_author_in_server()
+
+                if len(channels) == 0:
+                    channels = api.get_server_text_channels()
+
+                await func(self, ctx, channels, word=word if word is not ... else None)
+
+            except Banned:
+                pass
+
+            except NotInServer:
+                await self.embed_sender_service.send_error(ctx, Messages.AUTHOR_NOT_IN_SERVER)
+
+            except ChannelNotLearned:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_CHANNELS_NOT_LEARNED)
+
+            except NotEnoughData:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_NOT_ENOUGH_DATA)
+
+            except WordNotLearned:
+                await self.embed_sender_service.send_error(ctx, Messages.MARKOV_WORD_NOT_LEARNED)
+
+        return decorator
+
+    @commands.command(name='saymerged')
+    @checker
+    async def say_merged_command(
+            self,
+            ctx: commands.Context,
+            channels: commands.Greedy[TextChannel],
+            *,
+            word: str = ...) -> None:
+        '''Body of the command.'''
+
+        msg, skipped = await self.markov_service.say_merged(channels, word)
+
+        if skipped > 0:
+            msg = f'{msg}\n\n{Messages.MARKOV_CHANNELS_SKIPPED}: {skipped}'
+
+        await self.embed_sender_service.send_success(ctx, msg)
+
+
+def setup(bot: commands.Bot) -> None:
+    bot.add_cog(SayMergedCog(APIWrapperService, embed_sender_service, user_management_service, markov_service))
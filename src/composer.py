@@ -1,5 +1,6 @@
 from config import Config
 from model.enum.emote_providers import EmoteProviders
+from repository.file_markov_repository import FileMarkovRepository
 from repository.mongo_database_repository import MongoDatabaseRepository
 from service.bttv_provider_service import BttvProviderService
 from service.convertor_service import ConvertorService
@@ -9,6 +10,7 @@ from service.embed_sender_service import EmbedSenderService
 from service.emote_downloading_service import EmoteDownloadingService
 from service.emote_service import EmoteService
 from service.gif_service import GifService
+from service.history_crawler_service import HistoryCrawlerService
 from service.markov_service import MarkovService
 from service.music_player_service import MusicPlayerService
 from service.seventv_provider_service import SeventvProviderService
@@ -20,9 +22,11 @@ conf = Config()
 convertor_service = ConvertorService()
 embed_sender_service = EmbedSenderService()
 emote_downloader = EmoteDownloadingService()
-markov_service = MarkovService()
 song_service = SongService()
 mongo_database_repository = MongoDatabaseRepository(conf)
+file_markov_repository = FileMarkovRepository(conf)
+history_crawler_service = HistoryCrawlerService(conf)
+markov_service = MarkovService(conf, file_markov_repository, convertor_service, history_crawler_service)
 emote_downloader = DistributedEmoteDownloadingService(conf)
 gif_service = GifService(conf)
 music_player_service = MusicPlayerService(song_service)
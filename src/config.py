@@ -35,3 +35,23 @@ class Config:
         self.database_authorized_user_collection_name = os.environ.get('DATABASE_AUTHORIZED_USER_COLLECTION_NAME', '')
 
         self.emote_downloader_url = os.environ.get('EMOTE_DOWNLOADER_URL', '')
+
+        self.markov_directory = os.environ.get('MARKOV_DIRECTORY', 'markov')
+        self.markov_learning_chunk_size = int(os.environ.get('MARKOV_LEARNING_CHUNK_SIZE', '1000'))
+        self.markov_learning_workers = int(os.environ.get('MARKOV_LEARNING_WORKERS', '1'))
+        self.markov_crawl_concurrency = int(os.environ.get('MARKOV_CRAWL_CONCURRENCY', '4'))
+        self.markov_crawl_windows = int(os.environ.get('MARKOV_CRAWL_WINDOWS', '16'))
+        self.markov_crawl_min_window_hours = float(os.environ.get('MARKOV_CRAWL_MIN_WINDOW_HOURS', '24'))
+        self.markov_log_compaction_ratio = float(os.environ.get('MARKOV_LOG_COMPACTION_RATIO', '1'))
+        self.markov_live_learning = os.environ.get('MARKOV_LIVE_LEARNING', 'false').lower() == 'true'
+        self.markov_live_learning_interval = float(os.environ.get('MARKOV_LIVE_LEARNING_INTERVAL', '60'))
+        self.markov_memory_budget = int(os.environ.get('MARKOV_MEMORY_BUDGET', '64')) * 1024 * 1024
+        self.markov_freeze_threshold = int(os.environ.get('MARKOV_FREEZE_THRESHOLD', '1000000'))
+        self.markov_prune_min_count = int(os.environ.get('MARKOV_PRUNE_MIN_COUNT', '1'))
+        self.markov_prune_min_input_count = int(os.environ.get('MARKOV_PRUNE_MIN_INPUT_COUNT', '1'))
+        self.markov_max_row_size = int(os.environ.get('MARKOV_MAX_ROW_SIZE', '0'))
+        self.markov_gram_orders = [ int(order) for order in os.environ.get('MARKOV_GRAM_ORDERS', '2').split(',') ]
+        self.markov_author_models = os.environ.get('MARKOV_AUTHOR_MODELS', 'true').lower() == 'true'
+        self.markov_weighted_sentence_starts = os.environ.get('MARKOV_WEIGHTED_SENTENCE_STARTS', 'false').lower() == 'true'
+        self.markov_pregenerated_messages = int(os.environ.get('MARKOV_PREGENERATED_MESSAGES', '20'))
+        self.markov_pregeneration_watermark = int(os.environ.get('MARKOV_PREGENERATION_WATERMARK', '5'))
@@ -37,7 +37,13 @@ class StandardDiscordBotFactory(IDiscordBotFactory):
             'cog.reaction.7tv',
             'cog.reaction.bttv',
             'cog.markov.learn',
+            'cog.markov.learn_progress',
+            'cog.markov.cancel_learn',
             'cog.markov.say',
+            'cog.markov.say_merged',
+            'cog.markov.live_learning',
+            'cog.markov.export_model',
+            'cog.markov.import_model',
             'cog.user.ban',
             'cog.user.unban',
             'cog.user.listbans',
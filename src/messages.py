@@ -1,7 +1,10 @@
+import datetime
 import textwrap
 
 from audio_source.i_pcm_source import IPCMSource
+from model.markov.learn_job import LearnJob
 from model.music.currently_playing import CurrentlyPlaying
+from model.music.duration import Duration
 
 
 class Messages:
@@ -36,13 +39,28 @@ class Messages:
     MARKOV_BAD_ARGUMENT = 'Specified argument is not a valid (or visible) text channel'
     MARKOV_NO_NEW_MESSAGES = 'No messages available for learning in the specified channel'
     MARKOV_CHANNEL_NOT_LEARNED = 'The bot must learn from the specified channel first'
+    MARKOV_CHANNELS_NOT_LEARNED = 'The bot must learn from at least one of the specified channels first'
+    MARKOV_CHANNELS_SKIPPED = 'Channels skipped, as the memory for models is full'
     MARKOV_NOT_ENOUGH_DATA = 'The bot has not gained enough knowledge from the channel to be able to generate a message'
+    MARKOV_WORD_NOT_LEARNED = 'The bot has not learned the specified word from the channel'
+    MARKOV_AUTHOR_NOT_LEARNED = 'The bot has not learned any messages of the specified user from the channel'
+    MARKOV_NOT_LEARNING = 'The bot is not learning from the specified channel'
+    MARKOV_LEARNING_FAILED = 'There was an error learning from the specified channel'
+    STARTED_LEARNING = 'Started learning, the result will be sent once finished'
+    JOINED_LEARNING = 'The bot is already learning from the specified channel, the result will be sent once finished'
+    CANCELLED_LEARNING = 'Cancelled learning, the messages learned so far have been kept'
+    MARKOV_LEARNING_CANCELLED = 'Learning from the specified channel was cancelled, the messages learned so far have been kept'
+    MARKOV_INVALID_MODEL_ARCHIVE = 'Attached file is not a model exported by a compatible version of the bot'
+    MARKOV_EXPORTED_MODEL = 'Exported the model of the channel'
+    MARKOV_EXPORTED_MODEL_TO_FILE = 'The model is too large to be sent, so it was saved on the host of the bot'
+    MARKOV_IMPORTED_MODEL = 'Imported the model of the channel'
     USER_NOT_BANNABLE = 'User cannot be banned'
     USER_NOT_BANNED = 'Specified user is not banned'
     USER_BANNED = 'Specified user is already banned'
     USER_NOT_AUTHORIZED = 'Specified user is not authorized'
     USER_AUTHORIZED = 'Specified user is already authorized'
     MISSING_USER_ID = 'Provide ID of the user'
+    MISSING_CHANNEL_ID = 'Provide ID of the channel'
     USER_SUCCESSFULLY_UNBANNED = 'Successfully unbanned the user'
     USER_SUCCESSFULLY_UNAUTHORIZED = 'Successfully unauthorized the user'
     USER_SUCCESSFULLY_BANNED = 'Successfully banned the user'
@@ -103,6 +121,19 @@ class Messages:
     def FINISHED_LEARNING(number_of_messages: int) -> str:
         return f'Finished learning from {number_of_messages} message(s)'
 
+    @staticmethod
+    def LEARNING_PROGRESS(job: LearnJob, now: datetime.datetime) -> str:
+        eta = job.eta(now)
+        eta_str = Duration(int(eta.total_seconds())).as_timestamp() if eta is not None else 'unknown'
+
+        msg = f'''\
+            Learned from {job.processed_messages} message(s) ({job.progress():.0%} of the channel's history)
+            Rate: {job.rate(now):.1f} message(s) per second
+            Time left: {eta_str}
+            '''
+
+        return textwrap.dedent(msg)
+
     @staticmethod
     def LIST_BANNED_USERS(banned_users: list[int]) -> str:
         if len(banned_users) == 0:
@@ -135,7 +166,10 @@ class Messages:
             (f"```{prefix}7tv [Option] <Query>```", "Posts an emote from 7TV based on **Query**. If option **--raw** is passed, **Query** is interpreted as-is (the emote's name matches it exactly). Otherwise, an emote is selected based on the most probable intention of the author."),
             (f"```{prefix}bttv [Option] <Query>```", "Posts an emote from BTTV based on **Query**. If option **--raw** is passed, **Query** is interpreted as-is (the emote's name matches it exactly). Otherwise, an emote is selected based on the most probable intention of the author."),
             (f"```{prefix}learn <TextChannel>```", "Learns from messages sent in **TextChannel** to generate new, random messages. **TextChannel** must be a mention of the specified text channel."),
-            (f"```{prefix}say <TextChannel>```", "Generates a random message based on messages sent in **TextChannel**. **Learn** command must be used on **TextChannel** first. **TextChannel** must be a mention of the specified text channel.")
+            (f"```{prefix}learnprogress <TextChannel>```", "Shows the progress of learning from **TextChannel**. **TextChannel** must be a mention of the specified text channel."),
+            (f"```{prefix}cancellearn <TextChannel>```", "Cancels learning from **TextChannel**. Messages learned so far are kept, and the next **Learn** continues after them. **TextChannel** must be a mention of the specified text channel."),
+            (f"```{prefix}say <TextChannel> [User] [Word]```", "Generates a random message based on messages sent in **TextChannel**. If **User** is passed, the message imitates messages sent by **User**. If **Word** is passed, the message contains it. **Learn** command must be used on **TextChannel** first. **TextChannel** must be a mention of the specified text channel."),
+            (f"```{prefix}saymerged [TextChannels] [Word]```", "Generates a random message based on messages sent in all **TextChannels** together. If no **TextChannels** are passed, all text channels of the server are used. Channels the **Learn** command was not used on are skipped. Channels whose models are not loaded are skipped while the memory for models is full. If **Word** is passed, the message contains it. **TextChannels** must be mentions of the specified text channels.")
         ]
 
         return commands
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class MarkovDeltaEntity:
+    '''Entity representing changes to the Markov chain model of a channel learned from a chunk of messages, logged
+    after the snapshot of the model.'''
+
+    VERSION = 1
+
+    channel_id: int
+    transitions: dict
+    reverse_transitions: dict
+    sentence_starts: dict
+    newest_message: int
+    author_transitions: dict[int, dict] = field(default_factory=dict)
+    author_sentence_starts: dict[int, dict] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        '''Returns a dict that can be stored in the repository.'''
+
+        entity_dict = dict(self.__dict__)
+
+        entity_dict['version'] = self.VERSION
+
+        return entity_dict
+
+    @classmethod
+    def is_compatible(cls, dict: dict) -> bool:
+        '''Returns True if the dictionary was created by the current version of the entity, False otherwise.'''
+
+        return dict.get('version') == cls.VERSION
+
+    @classmethod
+    def from_dict(cls, dict: dict) -> MarkovDeltaEntity:
+        '''Creates an instance of MarkovDeltaEntity based on a dictionary.'''
+
+        return cls(
+            channel_id=dict['channel_id'],
+            transitions=dict['transitions'],
+            reverse_transitions=dict['reverse_transitions'],
+            sentence_starts=dict['sentence_starts'],
+            newest_message=dict['newest_message'],
+            author_transitions=dict['author_transitions'],
+            author_sentence_starts=dict['author_sentence_starts']
+        )
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class MarkovModelEntity:
+    '''Entity representing a snapshot of the Markov chain model learned from a channel.'''
+
+    VERSION = 7
+
+    channel_id: int
+    grammar: dict
+    reverse_grammar: dict
+    sentence_starts: dict
+    newest_message: int
+    author_grammars: dict[int, dict] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        '''Returns a dict that can be stored in the repository.'''
+
+        entity_dict = dict(self.__dict__)
+
+        entity_dict['version'] = self.VERSION
+
+        return entity_dict
+    
+    @classmethod
+    def is_compatible(cls, dict: dict) -> bool:
+        '''Returns True if the dictionary was created by the current version of the entity, False otherwise.'''
+
+        return dict.get('version') == cls.VERSION
+
+    @classmethod
+    def from_dict(cls, dict: dict) -> MarkovModelEntity:
+        '''Creates an instance of MarkovModelEntity based on a dictionary.'''
+
+        return cls(
+            channel_id=dict['channel_id'],
+            grammar=dict['grammar'],
+            reverse_grammar=dict['reverse_grammar'],
+            sentence_starts=dict['sentence_starts'],
+            newest_message=dict['newest_message'],
+            author_grammars=dict['author_grammars']
+        )
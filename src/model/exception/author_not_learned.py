@@ -0,0 +1,2 @@
+class AuthorNotLearned(Exception):
+    '''Exception stating that the bot has not learned messages of the specified author from the channel.'''
@@ -0,0 +1,2 @@
+class InvalidModelArchive(Exception):
+    '''Exception stating that the specified file is not a model exported by a compatible version of the bot.'''
@@ -0,0 +1,2 @@
+class LearningCancelled(Exception):
+    '''Exception stating that learning from the channel was cancelled.'''
@@ -0,0 +1,2 @@
+class NotLearning(Exception):
+    '''Exception stating that the bot is not learning from the channel.'''
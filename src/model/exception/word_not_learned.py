@@ -0,0 +1,2 @@
+class WordNotLearned(Exception):
+    '''Exception stating that the bot has not learned the specified word from the channel.'''
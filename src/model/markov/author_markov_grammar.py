@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import collections.abc
+import heapq
+import random
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.prefix_table import PrefixTable
+from model.markov.sentence_starts import SentenceStarts
+
+
+class AuthorMarkovGrammar:
+    '''Class representing transitions of the Markov chain learned from messages of a single author in a channel, as a
+    sparse subset of the grammar of the channel.
+
+    Transitions are identified by ids assigned by the grammar of the channel, the id of the input and the key of the
+    output, which are kept in flat arrays sorted by both, along with occurrences. The author has no vocabulary and no
+    rows of its own, so a transition takes 16 bytes, and authors of few messages take almost no memory. Looking up an
+    input takes O(log n) for n transitions of the author.
+
+    Merging new transitions rebuilds the arrays, so transitions are buffered until they are a fraction of the merged
+    ones, which makes the cost of merging amortized O(log n) per transition.'''
+
+    # merge once the buffered transitions are at least this fraction of the merged ones
+    MERGE_FRACTION = 0.25
+
+    def __init__(self, grammar: MarkovGrammar, sentence_starts: SentenceStarts | None = None) -> None:
+        self.grammar = grammar
+        self.sentence_starts = sentence_starts if sentence_starts is not None else SentenceStarts()
+        self.inputs = array('I')
+        self.keys = array('Q')
+        self.counts = array('I')
+        self.pending: Counter[tuple[int, int]] = Counter()
+
+        # the model may be converted for persisting in another thread while messages are generated from it
+        self.merge_lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, dict: dict, grammar: MarkovGrammar) -> AuthorMarkovGrammar:
+        '''Creates an instance of AuthorMarkovGrammar based on a dictionary created by to_dict, referencing the grammar
+        of the channel.'''
+
+        author_grammar = cls(grammar, SentenceStarts.from_dict(dict['sentence_starts']))
+        author_grammar.inputs = dict['inputs']
+        author_grammar.keys = dict['keys']
+        author_grammar.counts = dict['counts']
+
+        return author_grammar
+
+    def to_dict(self) -> dict:
+        '''Returns a dict that can be persisted along with the grammar of the channel.'''
+
+        self._merge()
+
+        return {
+            'inputs': self.inputs,
+            'keys': self.keys,
+            'counts': self.counts,
+            'sentence_starts': self.sentence_starts.to_dict()
+        }
+
+    def __len__(self) -> int:
+        '''Returns the number of distinct transitions.'''
+
+        self._merge()
+
+        return len(self.keys)
+
+    def __getitem__(self, input: str) -> str:
+        start, end = self._find_row(input)
+
+        if start == end:
+            raise InputNotPresent
+
+        cumulative = list(accumulate(self.counts[start:end]))
+        position = bisect_right(cumulative, random.randrange(cumulative[-1]))
+
+        return self.grammar.get_transition_output(self.keys[start + position])
+
+    def find_inputs(self, token: str) -> list[str]:
+        '''Returns inputs containing the token.'''
+
+        inputs = []
+
+        for input in self.grammar.find_inputs(token):
+            start, end = self._find_row(input)
+
+            if start < end:
+                inputs.append(input)
+
+        return inputs
+
+    def update(self, transitions: collections.abc.Mapping[tuple[str, str], int]) -> None:
+        '''Adds occurrences of transitions, mapped from pairs of an input and an output. The transitions must be added
+        to the grammar of the channel first.'''
+
+        for (input, output), count in transitions.items():
+            self.pending[self.grammar.get_transition(input, output)] += count
+
+        if len(self.pending) >= len(self.keys) * self.MERGE_FRACTION:
+            self._merge()
+
+    def remap(self, input_ids: array, token_ids: array, link_ids: array) -> None:
+        '''Follows ids reassigned by pruning the grammar of the channel in place, as returned by its prune method.
+        Transitions and sentence starts removed from the grammar of the channel are removed as well.'''
+
+        remapped = self.remapped(self.grammar, input_ids, token_ids, link_ids)
+
+        self.inputs, self.keys, self.counts = remapped.inputs, remapped.keys, remapped.counts
+        self.sentence_starts = remapped.sentence_starts
+
+    def remapped(
+            self,
+            grammar: MarkovGrammar,
+            input_ids: array,
+            token_ids: array,
+            link_ids: array) -> AuthorMarkovGrammar:
+        '''Returns a copy of the grammar of the author referencing the pruned copy of the grammar of the channel,
+        following ids reassigned by its pruned method, without transitions and sentence starts removed from it.'''
+
+        self._merge()
+
+        transitions = []
+
+        for input, key, count in zip(self.inputs, self.keys, self.counts):
+            input, last = input_ids[input], token_ids[key & 0xFFFFFFFF]
+            prefix = PrefixTable.map_id(key >> 32, token_ids, link_ids)
+
+            if input == -1 or prefix == -1 or last == -1:
+                continue
+
+            key = prefix << 32 | last
+            row = grammar.row_keys[input]
+            position = bisect_left(row, key)
+
+            if position < len(row) and row[position] == key:
+                transitions.append((input, key, count))
+
+        transitions.sort()
+
+        sentence_starts = self.sentence_starts.filter(grammar.input_vocabulary.__contains__)
+        author_grammar = AuthorMarkovGrammar(grammar, sentence_starts)
+        author_grammar.inputs = array('I', [ input for input, _, _ in transitions ])
+        author_grammar.keys = array('Q', [ key for _, key, _ in transitions ])
+        author_grammar.counts = array('I', [ count for _, _, count in transitions ])
+
+        return author_grammar
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the grammar of the author, not counting the grammar of the
+        channel.'''
+
+        size = sys.getsizeof(self.inputs) + sys.getsizeof(self.keys) + sys.getsizeof(self.counts)
+        size += sys.getsizeof(self.pending) + self.sentence_starts.memory_size()
+
+        return size
+
+    def _find_row(self, input: str) -> tuple[int, int]:
+        '''Returns the range of transitions from the input.'''
+
+        self._merge()
+
+        input_id = self.grammar.input_vocabulary.get_id(input)
+
+        if input_id is None:
+            return 0, 0
+
+        return bisect_left(self.inputs, input_id), bisect_right(self.inputs, input_id)
+
+    def _merge(self) -> None:
+        '''Merges buffered transitions into the arrays, in a single pass over both.'''
+
+        with self.merge_lock:
+            if len(self.pending) == 0:
+                return
+
+            pending = sorted((input, key, count) for (input, key), count in self.pending.items())
+            inputs = array('I')
+            keys = array('Q')
+            counts = array('I')
+
+            for input, key, count in heapq.merge(zip(self.inputs, self.keys, self.counts), pending):
+                if len(keys) > 0 and keys[-1] == key and inputs[-1] == input:
+                    counts[-1] += count
+
+                else:
+                    inputs.append(input)
+                    keys.append(key)
+                    counts.append(count)
+
+            self.inputs = inputs
+            self.keys = keys
+            self.counts = counts
+            self.pending.clear()
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import random
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.prefix_table import PrefixTable
+from model.markov.sentence_starts import SentenceStarts
+
+
+class FrozenMarkovGrammar:
+    '''Class representing a read-only Markov chain model, served directly from a binary buffer such as a memory-mapped
+    file, without deserializing it into Python objects.
+
+    The buffer starts with a header, followed by flat sections: the table of output tokens, the links of prefixes of
+    several tokens, as in PrefixTable, the table of inputs sorted
+    by their UTF-8 encoding, the offsets of rows, the transition keys and the cumulative occurrences of every row, the
+    table of sentence starts with their occurrences, the inverted index from tokens to rows of inputs containing them,
+    and the frozen reverse grammar. Tables consist of the offsets of strings followed by the strings. Numbers are
+    unsigned 64-bit integers in the native byte order. Sentence starts and the newest learned message are stored as
+    well, so the buffer is the whole model required to generate messages, including messages containing a word.
+
+    Looking up an input takes O(log n) for n inputs, and sampling its output O(log k) for a row of k transitions, the
+    same as in MarkovGrammar, with the same outcome for the same state of the random generator.'''
+
+    MAGIC = b'KKMV'
+    VERSION = 5
+
+    # magic, version, the newest learned message, numbers of tokens, links, inputs, transitions, sentence starts and
+    # indexed tokens, followed by offsets of the sections
+    HEADER = struct.Struct('<4sIQQQQQQQ16Q')
+
+    def __init__(self, buffer: bytes | memoryview) -> None:
+        self.buffer = memoryview(buffer)
+
+        _, _, self.newest_message, tokens, links, inputs, transitions, starts, indexed, *sections = \
+            self.HEADER.unpack_from(buffer)
+        (token_offsets, token_blob, link_offsets, input_offsets, input_blob, row_offsets, keys, cumulative,
+         start_offsets, start_blob, start_counts, index_offsets, index_blob, posting_offsets, postings,
+         reverse) = sections
+
+        self.token_offsets = self._get_array(token_offsets, tokens + 1)
+        self.token_blob = token_blob
+        self.links = self._get_array(link_offsets, links)
+        self.input_offsets = self._get_array(input_offsets, inputs + 1)
+        self.input_blob = input_blob
+        self.row_offsets = self._get_array(row_offsets, inputs + 1)
+        self.keys = self._get_array(keys, transitions)
+        self.cumulative = self._get_array(cumulative, transitions)
+        self.index_offsets = self._get_array(index_offsets, indexed + 1)
+        self.index_blob = index_blob
+        self.posting_offsets = self._get_array(posting_offsets, indexed + 1)
+        self.postings = self._get_array(postings, self.posting_offsets[-1])
+
+        # the reverse grammar is the last section, frozen in the same format, and shares the buffer
+        self.reverse_grammar = FrozenMarkovGrammar(self.buffer[reverse:]) if reverse < len(self.buffer) else None
+
+        # sentence starts are sampled from an indexable structure, so they are copied out of the buffer
+        start_table = self._get_array(start_offsets, starts + 1)
+        self.sentence_starts = SentenceStarts(
+            [ self._get_string(start_blob, start_table, i) for i in range(starts) ],
+            array('I', self._get_array(start_counts, starts))
+        )
+
+    @classmethod
+    def is_compatible(cls, buffer: bytes | memoryview) -> bool:
+        '''Checks whether the buffer was frozen by the current version of the format.'''
+
+        if len(buffer) < cls.HEADER.size:
+            return False
+
+        magic, version = struct.unpack_from('<4sI', buffer)
+
+        return magic == cls.MAGIC and version == cls.VERSION
+
+    @classmethod
+    def freeze(
+            cls,
+            grammar: MarkovGrammar,
+            sentence_starts: SentenceStarts,
+            newest_message: int,
+            reverse_grammar: MarkovGrammar | None = None) -> bytes:
+        '''Converts a grammar, with the rest of the model, into the frozen format.'''
+
+        inputs = sorted(range(len(grammar.input_vocabulary)), key=lambda id: grammar.input_vocabulary[id].encode())
+
+        row_offsets = array('Q', [0])
+        keys = array('Q')
+        cumulative = array('Q')
+        rows = array('Q', bytes(8 * len(inputs)))
+
+        for row, id in enumerate(inputs):
+            keys.extend(grammar.row_keys[id])
+            cumulative.extend(accumulate(grammar.row_counts[id]))
+            row_offsets.append(len(keys))
+            rows[id] = row
+
+        # the inverted index of the grammar is translated from ids of inputs to their rows
+        indexed = sorted(grammar.token_inputs, key=str.encode)
+        postings = [ sorted(rows[id] for id in cls._get_ids(grammar.token_inputs[token])) for token in indexed ]
+
+        sections = [
+            *cls._get_table(grammar.vocabulary.tokens),
+            grammar.prefixes.links.tobytes(),
+            *cls._get_table([ grammar.input_vocabulary[id] for id in inputs ]),
+            row_offsets.tobytes(),
+            keys.tobytes(),
+            cumulative.tobytes(),
+            *cls._get_table(sentence_starts.vocabulary.tokens),
+            array('Q', sentence_starts.counts).tobytes(),
+            *cls._get_table(indexed),
+            array('Q', accumulate(map(len, postings), initial=0)).tobytes(),
+            array('Q', chain.from_iterable(postings)).tobytes(),
+            cls.freeze(reverse_grammar, SentenceStarts(), newest_message) if reverse_grammar is not None else b''
+        ]
+
+        offsets = list(accumulate([ cls.HEADER.size ] + [ len(section) for section in sections[:-1] ]))
+
+        header = cls.HEADER.pack(
+            cls.MAGIC,
+            cls.VERSION,
+            newest_message,
+            len(grammar.vocabulary),
+            len(grammar.prefixes),
+            len(inputs),
+            len(keys),
+            len(sentence_starts),
+            len(indexed),
+            *offsets
+        )
+
+        return b''.join([ header, *sections ])
+
+    def __getitem__(self, input: str) -> str:
+        row = self._find_input(input.encode())
+
+        if row is None:
+            raise InputNotPresent
+
+        return self._get_output(row, random.randrange(self.cumulative[self.row_offsets[row + 1] - 1]))
+
+    def get_occurrences(self, input: str) -> int:
+        '''Returns the total number of occurrences of transitions from the input, or 0 if the input is not present.'''
+
+        row = self._find_input(input.encode())
+
+        return self.cumulative[self.row_offsets[row + 1] - 1] if row is not None else 0
+
+    def get_output(self, input: str, position: int) -> str:
+        '''Returns the output at the position among occurrences of transitions from the input, so drawing the position
+        uniformly samples outputs proportionally to their occurrences.'''
+
+        row = self._find_input(input.encode())
+
+        if row is None:
+            raise InputNotPresent
+
+        return self._get_output(row, position)
+
+    def find_inputs(self, token: str) -> list[str]:
+        '''Returns inputs containing the token.'''
+
+        index = self._find(self.index_blob, self.index_offsets, token.encode())
+
+        if index is None:
+            return []
+
+        rows = self.postings[self.posting_offsets[index]:self.posting_offsets[index + 1]]
+
+        return [ self._get_string(self.input_blob, self.input_offsets, row) for row in rows ]
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the grammar, not counting sentence starts and the buffer.
+        Pages of a memory-mapped buffer belong to the page cache, which the system reclaims on its own.'''
+
+        return sys.getsizeof(self)
+
+    def _find_input(self, input: bytes) -> int | None:
+        return self._find(self.input_blob, self.input_offsets, input)
+
+    def _find(self, blob: int, offsets: memoryview, string: bytes) -> int | None:
+        low, high = 0, len(offsets) - 1
+
+        while low < high:
+            middle = (low + high) // 2
+            current = self._get_bytes(blob, offsets, middle)
+
+            if current == string:
+                return middle
+
+            if current < string:
+                low = middle + 1
+
+            else:
+                high = middle
+
+        return None
+
+    def _get_output(self, row: int, position: int) -> str:
+        start, end = self.row_offsets[row], self.row_offsets[row + 1]
+        key = self.keys[bisect_right(self.cumulative, position, start, end)]
+        tokens = [ self._get_string(self.token_blob, self.token_offsets, key & 0xFFFFFFFF) ]
+        prefix = key >> 32
+
+        while prefix & PrefixTable.LINK:
+            link = self.links[prefix ^ PrefixTable.LINK]
+            tokens.append(self._get_string(self.token_blob, self.token_offsets, link & 0xFFFFFFFF))
+            prefix = link >> 32
+
+        # outputs of a single token have the empty token as their prefix
+        first = self._get_string(self.token_blob, self.token_offsets, prefix)
+
+        if first:
+            tokens.append(first)
+
+        return ' '.join(reversed(tokens))
+
+    def _get_array(self, offset: int, length: int) -> memoryview:
+        return self.buffer[offset:offset + length * 8].cast('Q')
+
+    def _get_bytes(self, blob: int, offsets: memoryview, index: int) -> bytes:
+        return self.buffer[blob + offsets[index]:blob + offsets[index + 1]].tobytes()
+
+    def _get_string(self, blob: int, offsets: memoryview, index: int) -> str:
+        return self._get_bytes(blob, offsets, index).decode()
+
+    @staticmethod
+    def _get_ids(input_ids: int | array) -> array | tuple[int]:
+        return (input_ids,) if isinstance(input_ids, int) else input_ids
+
+    @staticmethod
+    def _get_table(strings: list[str]) -> tuple[bytes, bytes]:
+        '''Returns the offsets of strings and the strings, padded so the following section is aligned to 8 bytes.'''
+
+        encoded = [ string.encode() for string in strings ]
+        offsets = array('Q', accumulate([ len(string) for string in encoded ], initial=0))
+        blob = b''.join(encoded)
+
+        return offsets.tobytes(), blob + bytes(-len(blob) % 8)
@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass
+class LearnJob:
+    '''Dataclass representing learning from a channel running in the background.'''
+
+    channel_id: int
+    started_at: datetime.datetime
+    learned_from: datetime.datetime
+    task: asyncio.Task | None = None
+    listeners: list[tuple[Callable, Callable]] = field(default_factory=list)
+    processed_messages: int = 0
+    learned_until: datetime.datetime | None = None
+
+    def rate(self, now: datetime.datetime) -> float:
+        '''Returns the number of messages processed per second.'''
+
+        elapsed = (now - self.started_at).total_seconds()
+
+        return self.processed_messages / elapsed if elapsed > 0 else 0.0
+
+    def progress(self) -> float:
+        '''Returns the fraction of the history of the channel that was processed. Discord does not expose the number of
+        messages in a channel, so the progress is estimated based on the time the processed messages were sent.'''
+
+        if self.learned_until is None:
+            return 0.0
+
+        total = (self.started_at - self.learned_from).total_seconds()
+        processed = (self.learned_until - self.learned_from).total_seconds()
+
+        return min(max(processed / total, 0.0), 1.0) if total > 0 else 1.0
+
+    def eta(self, now: datetime.datetime) -> datetime.timedelta | None:
+        '''Returns the estimated time left until the end of learning, or None if it cannot be estimated yet.'''
+
+        progress = self.progress()
+
+        if progress == 0.0:
+            return None
+
+        return (now - self.started_at) * ((1 - progress) / progress)
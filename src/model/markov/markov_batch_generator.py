@@ -0,0 +1,169 @@
+import random
+from typing import Callable
+
+import numpy
+
+from model.markov.markov_grammar import MarkovGrammar
+
+
+class MarkovBatchGenerator:
+    '''Class generating many messages from the grammar at once, advancing every message by one token per step.
+
+    The grammar is frozen into a matrix in the compressed sparse row format: transition keys and occurrences
+    accumulated over the whole matrix, so the transitions of a row occupy a contiguous range of cumulative occurrences.
+    Every transition also stores the row of the input it leads to, and the length of the token it appends, so
+    advancing a message takes no string operations or dictionary lookups. Strings are built once generation ends.
+
+    Each step draws a position within the range of the row of every message, and finds the transitions with a single
+    search over the cumulative occurrences, all vectorised with NumPy. The matrix is built with NumPy as well, so only
+    distinct prefixes and windows of outputs are handled in Python. It does not follow updates of the grammar, so it
+    must be rebuilt once the grammar changes.
+
+    Only grammars of a single order are supported, as backing off to a lower order makes the next input depend on more
+    tokens than the last output.'''
+
+    def __init__(
+            self,
+            grammar: MarkovGrammar,
+            input_size: int,
+            max_length: int,
+            normalize: Callable[[str], str]) -> None:
+        self.grammar = grammar
+        self.input_size = input_size
+        self.max_length = max_length
+        self.normalize = normalize
+
+        self.keys = numpy.concatenate([ numpy.frombuffer(keys, dtype=numpy.uint64) for keys in grammar.row_keys ]
+                                      or [ numpy.empty(0, dtype=numpy.uint64) ])
+        counts = numpy.concatenate([ numpy.frombuffer(counts, dtype=numpy.uint32) for counts in grammar.row_counts ]
+                                   or [ numpy.empty(0, dtype=numpy.uint32) ])
+        row_sizes = numpy.fromiter(map(len, grammar.row_keys), dtype=numpy.int64, count=len(grammar.row_keys))
+        row_offsets = numpy.concatenate(([ 0 ], numpy.cumsum(row_sizes)))
+
+        # the range of cumulative occurrences of every row, which is empty for rows without transitions
+        self.cumulative = numpy.cumsum(counts, dtype=numpy.int64)
+        padded = numpy.concatenate(([ 0 ], self.cumulative))
+        self.row_lows = padded[row_offsets[:-1]]
+        self.row_spans = padded[row_offsets[1:]] - self.row_lows
+
+        # every output replaces the window, and the first token of its prefix leaves the window for good
+        prefix_ids, self.prefix_indices = numpy.unique(self.keys >> numpy.uint64(32), return_inverse=True)
+        token_ids = (self.keys & numpy.uint64(0xFFFFFFFF)).astype(numpy.int64)
+        self.first_tokens = []
+        tails: dict[str, int] = {}
+        self.prefix_tails = numpy.empty(len(prefix_ids), dtype=numpy.int64)
+
+        for index, prefix_id in enumerate(prefix_ids.tolist()):
+            tokens = grammar.prefixes[prefix_id].split(' ')
+            self.first_tokens.append(f'{tokens[0]} ')
+
+            # the tokens of the prefix staying in the window, along with the appended token
+            tail = ' '.join(tokens[max(len(tokens) - self.input_size + 1, 0):]) if self.input_size > 1 else ''
+            self.prefix_tails[index] = tails.setdefault(tail, len(tails))
+
+        self.first_lengths = numpy.fromiter(map(len, self.first_tokens), dtype=numpy.int64, count=len(prefix_ids))
+        self.prefix_indices = self.prefix_indices.astype(numpy.int32)
+
+        # outputs ending with the same tokens lead to the same input, so inputs are looked up once per window
+        windows, window_indices = numpy.unique(
+            self.prefix_tails[self.prefix_indices] << 32 | token_ids,
+            return_inverse=True
+        )
+        self.tails = list(tails)
+        window_rows = numpy.empty(len(windows), dtype=numpy.int64)
+
+        for index, window in enumerate(windows.tolist()):
+            tail, token = self.tails[window >> 32], grammar.vocabulary[window & 0xFFFFFFFF]
+            row = grammar.input_vocabulary.get_id(normalize(f'{tail} {token}' if tail else token))
+            window_rows[index] = self._get_row(row)
+
+        self.next_rows = window_rows[window_indices]
+
+        tokens, token_indices = numpy.unique(token_ids, return_inverse=True)
+        token_lengths = numpy.fromiter((len(grammar.vocabulary[token]) + 1 for token in tokens.tolist()),
+                                       dtype=numpy.int64, count=len(tokens))
+        self.appended_lengths = token_lengths[token_indices]
+
+    def generate(self, starts: list[str]) -> list[str]:
+        '''Returns messages generated from the sentence starts, one per start. Generation of a message stops when it
+        reaches the maximum length, or the grammar has no output for its last tokens, like in MarkovGenerator.'''
+
+        rows = numpy.fromiter((
+            self._get_row(self.grammar.input_vocabulary.get_id(
+                self.normalize(' '.join(start.split(' ')[-self.input_size:]))))
+            for start in starts
+        ), dtype=numpy.int64, count=len(starts))
+        lengths = numpy.fromiter(map(len, starts), dtype=numpy.int64, count=len(starts))
+
+        messages, transitions = self._advance(rows, lengths)
+
+        return self._get_messages(starts, messages, transitions)
+
+    def _get_row(self, row: int | None) -> int:
+        '''Returns the row of an input, or -1 if the input has no transitions.'''
+
+        return row if row is not None and self.row_spans[row] > 0 else -1
+
+    def _advance(self, rows: numpy.ndarray, lengths: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        '''Advances all messages together until every one of them ends. Returns the message of every step taken, and
+        the transition taken by it, grouped by message in the order they were taken.'''
+
+        rng = numpy.random.default_rng(random.getrandbits(64))
+        steps = []
+
+        # only messages still being generated are kept, so every step takes time proportional to their number
+        active = numpy.flatnonzero((rows >= 0) & (lengths < self.max_length))
+        rows, lengths = rows[active], lengths[active]
+
+        while active.size > 0:
+            # a product of a float below 1 and a span never rounds up to the span
+            positions = self.row_lows[rows] + (rng.random(rows.size) * self.row_spans[rows]).astype(numpy.int64)
+            taken = numpy.searchsorted(self.cumulative, positions, side='right')
+            steps.append((active, taken))
+
+            rows = self.next_rows[taken]
+            lengths += self.appended_lengths[taken]
+            going = (rows >= 0) & (lengths < self.max_length)
+
+            if not going.all():
+                active, rows, lengths = active[going], rows[going], lengths[going]
+
+        if len(steps) == 0:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64)
+
+        messages = numpy.concatenate([ active for active, _ in steps ])
+        order = numpy.argsort(messages, kind='stable')
+
+        return messages[order], numpy.concatenate([ taken for _, taken in steps ])[order]
+
+    def _get_messages(self, starts: list[str], messages: numpy.ndarray, transitions: numpy.ndarray) -> list[str]:
+        '''Builds the messages from the starts and the transitions taken from them. Like in MarkovGenerator, every
+        output replaces the tokens of its input with their original form, and appends a token.
+
+        Tokens leaving the window are joined for all messages at once, and every message takes a slice of them, followed
+        by the window of its last output.'''
+
+        prefixes = self.prefix_indices[transitions]
+        text = ''.join(map(self.first_tokens.__getitem__, prefixes.tolist()))
+        text_ends = numpy.cumsum(self.first_lengths[prefixes])
+
+        ends = numpy.cumsum(numpy.bincount(messages, minlength=len(starts)))
+        generating = numpy.flatnonzero(ends > numpy.concatenate(([ 0 ], ends[:-1]))).tolist()
+        last = ends[generating] - 1
+        text_ends = text_ends[last].tolist()
+        tails = self.prefix_tails[prefixes[last]].tolist()
+        tokens = (self.keys[transitions[last]] & numpy.uint64(0xFFFFFFFF)).tolist()
+
+        generated = starts.copy()
+        text_start = 0
+
+        for message, text_end, tail, token in zip(generating, text_ends, tails, tokens):
+            head = starts[message].rsplit(' ', self.input_size)
+            head = f'{head[0]} ' if len(head) > self.input_size else ''
+            tail = self.tails[tail]
+            window = f'{tail} {self.grammar.vocabulary[token]}' if tail else self.grammar.vocabulary[token]
+
+            generated[message] = head + text[text_start:text_end] + window
+            text_start = text_end
+
+        return generated
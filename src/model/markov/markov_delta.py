@@ -0,0 +1,13 @@
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+@dataclass
+class MarkovDelta:
+    '''Dataclass representing changes to the Markov chain model learned from a chunk of messages.'''
+
+    transitions: Counter[tuple[str, str]] = field(default_factory=Counter)
+    reverse_transitions: Counter[tuple[str, str]] = field(default_factory=Counter)
+    sentence_starts: Counter[str] = field(default_factory=Counter)
+    author_transitions: dict[int, Counter[tuple[str, str]]] = field(default_factory=dict)
+    author_sentence_starts: dict[int, Counter[str]] = field(default_factory=dict)
@@ -0,0 +1,94 @@
+from typing import Callable, Iterator
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.markov_grammar import MarkovGrammar
+
+
+class MarkovGenerator:
+    '''Class generating messages from the grammar, one token at a time.
+
+    The window consists of the last tokens of the message, one fewer than the highest order of n-grams. The longest
+    suffix of the window which the grammar learned as an input is used, backing off to lower orders, and its output
+    replaces the suffix and extends the message by one token. Only the window is joined and normalized to build the
+    next input, so each step takes time independent of the length of the message.'''
+
+    def __init__(
+            self,
+            grammar: MarkovGrammar,
+            gram_orders: list[int],
+            max_length: int,
+            normalize: Callable[[str], str],
+            reverse_grammar: MarkovGrammar | None = None) -> None:
+        self.grammar = grammar
+        self.reverse_grammar = reverse_grammar
+        self.gram_orders = gram_orders
+        self.input_sizes = sorted({ order - 1 for order in gram_orders }, reverse=True)
+        self.window_size = self.input_sizes[0]
+        self.max_length = max_length
+        self.normalize = normalize
+
+    def generate_around(self, window: str) -> list[str]:
+        '''Returns tokens of a message generated in both directions from the window, using the reverse grammar to the
+        left, if there is one. Each direction may use half of the maximum length.'''
+
+        window_tokens = window.split(' ')
+        left = window_tokens
+
+        # the reverse grammar learned messages with their tokens reversed, so generating from it extends to the left
+        if self.reverse_grammar is not None:
+            reverse = MarkovGenerator(self.reverse_grammar, self.gram_orders, self.max_length // 2, self.normalize)
+            left = list(reverse.generate(' '.join(reversed(window_tokens))))[::-1]
+
+        prefix = left[:-len(window_tokens)]
+
+        max_length = self.max_length - len(' '.join(prefix))
+        right = list(MarkovGenerator(self.grammar, self.gram_orders, max_length, self.normalize).generate(window))
+
+        # both directions replace the normalized window with its original form, unless they could not extend it
+        return prefix + (right if right != window_tokens else left[-len(window_tokens):])
+
+    def generate(self, start: str) -> Iterator[str]:
+        '''Yields tokens of a message generated from the sentence start. A token is yielded as soon as it leaves the
+        window, as the following outputs cannot change it anymore. Generation stops when the message reaches the
+        maximum length, or the grammar has no output for any suffix of the window.'''
+
+        window = start.split(' ')
+
+        # length of the message as a string, where every generated token is preceded by a space
+        length = len(start)
+        window_length = len(start)
+
+        while length < self.max_length:
+            output = self._get_output(window)
+
+            if output is None:
+                break
+
+            # the output replaces the suffix of the window it was sampled for, which is one token shorter
+            output = window[:len(window) - len(output) + 1] + output
+            committed = output[:-self.window_size]
+            window = output[-self.window_size:]
+
+            length -= window_length
+            window_length = sum(len(token) + 1 for token in window)
+            length += sum(len(token) + 1 for token in committed) + window_length
+
+            yield from committed
+
+        yield from window
+
+    def _get_output(self, window: list[str]) -> list[str] | None:
+        '''Returns tokens of the output of the longest suffix of the window learned by the grammar, which replace the
+        suffix, or None if there is no such suffix.'''
+
+        for size in self.input_sizes:
+            if size > len(window):
+                continue
+
+            try:
+                return self.grammar[self.normalize(' '.join(window[len(window) - size:]))].split(' ')
+
+            except InputNotPresent:
+                continue
+
+        return None
@@ -1,52 +1,393 @@
+from __future__ import annotations
+
 import collections.abc
 import random
-from functools import reduce
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, compress
 
 from model.exception.bad_operand import BadOperand
 from model.exception.input_not_present import InputNotPresent
+from model.markov.prefix_table import PrefixTable
+from model.markov.token_vocabulary import TokenVocabulary
 
 
 class MarkovGrammar:
-    def __init__(self) -> None:
-        self.occ_matrix: dict[str, dict[str, int]] = {}
-        self.freq_matrix: dict[str, dict[str, float]] = {}
-        self.utd_matrix: dict[str, bool] = {}
+    '''Class representing transitions of the Markov chain, from an input to the output n-gram.
+
+    Inputs, as well as the last token and the remaining prefix of every output, are interned into integer ids, with
+    prefixes of several tokens stored as sequences of ids of single tokens, so only single tokens are strings. Each
+    input has a row consisting of two arrays: sorted transition keys (the prefix id and the last token id packed into
+    a single 64-bit integer) and the number of occurrences of each transition. No Python object is allocated per
+    transition, so a transition takes 12 bytes.
+
+    Sampling uses cumulative occurrences of the row, cached until the row changes, and takes O(log k) for a row of k
+    transitions.
+
+    If max_row_size is set, occurrences are counted approximately: a full row replaces its least occurring transition
+    with a new one, which inherits its occurrences (the Space-Saving algorithm). Memory is bounded by max_row_size
+    transitions per input, and every transition occurring more than 1 / max_row_size of the time of its input is kept,
+    with its occurrences overestimated by at most that fraction of the occurrences of the input. Keys of the least
+    occurring transitions of a full row are cached, so replacing one does not scan the row until all of them are
+    replaced or occur again.
+
+    If prunable is set, transitions added since the last pruning are remembered, and the next pruning keeps them
+    however rare they are, so transitions learned in small increments can occur enough times before being judged.
+
+    The number of transitions and the memory taken by rows are counted as they change, so measuring the grammar takes
+    O(1), however large it is.'''
+
+    # bytes taken by an array without items
+    ARRAY_SIZE = sys.getsizeof(array('Q'))
+
+    def __init__(
+        self,
+        vocabulary: TokenVocabulary | None = None,
+        max_row_size: int = 0,
+        prunable: bool = False
+    ) -> None:
+        self.vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        self.prefixes = PrefixTable(self.vocabulary)
+        self.max_row_size = max_row_size
+        self.prunable = prunable
+        self.input_vocabulary = TokenVocabulary()
+        self.row_keys: list[array] = []
+        self.row_counts: list[array] = []
+        self.row_cumulative: list[array] = []
+        self.utd_matrix = bytearray()
+        self.transitions = 0
+        self.cumulative_items = 0
+
+        # input ids and keys of transitions added since the last pruning, if prunable
+        self.new_inputs = array('I')
+        self.new_keys = array('Q')
+
+        # inverted index from tokens to ids of inputs containing them, updated as inputs are added, and the bytes
+        # taken by its arrays
+        self.token_inputs: dict[str, int | array] = {}
+        self.index_size = 0
+
+        # the least occurrences of transitions of full rows, and keys of transitions which occurred that many times
+        # when cached, along with the bytes taken by the arrays of keys
+        self.row_minimums: dict[int, tuple[int, array]] = {}
+        self.minimums_size = 0
+
+    @classmethod
+    def from_dict(cls, dict: dict, vocabulary: TokenVocabulary | None = None) -> MarkovGrammar:
+        '''Creates an instance of MarkovGrammar based on a dictionary created by to_dict.'''
+
+        grammar = cls(vocabulary if vocabulary is not None else TokenVocabulary(dict['tokens']))
+        grammar.prefixes = PrefixTable(grammar.vocabulary, dict['prefixes'], dict['prefix_order'])
+        grammar.input_vocabulary = TokenVocabulary(dict['inputs'])
 
-    def __iadd__(self, other: list[str]) -> None:
+        offsets, keys, counts = dict['row_offsets'], dict['row_keys'], dict['row_counts']
+
+        for start, end in zip(offsets, offsets[1:]):
+            grammar.row_keys.append(keys[start:end])
+            grammar.row_counts.append(counts[start:end])
+            grammar.row_cumulative.append(array('Q'))
+
+        for input_id, input in enumerate(grammar.input_vocabulary.tokens):
+            grammar._index(input, input_id)
+
+        grammar.utd_matrix = bytearray(len(grammar.row_keys))
+        grammar.transitions = len(keys)
+
+        return grammar
+
+    def to_dict(self) -> dict:
+        '''Returns a dict that can be persisted. Rows are flattened, so the dict consists of a small number of flat
+        arrays regardless of the size of the grammar.'''
+
+        offsets = array('Q', [0])
+        keys = array('Q')
+        counts = array('I')
+
+        for row_keys, row_counts in zip(self.row_keys, self.row_counts):
+            keys.extend(row_keys)
+            counts.extend(row_counts)
+            offsets.append(len(keys))
+
+        return {
+            'tokens': self.vocabulary.tokens,
+            'prefixes': self.prefixes.links,
+            'prefix_order': self.prefixes.get_order(),
+            'inputs': self.input_vocabulary.tokens,
+            'row_offsets': offsets,
+            'row_keys': keys,
+            'row_counts': counts
+        }
+
+    def __iadd__(self, other: list[str]) -> MarkovGrammar:
         if not isinstance(other, collections.abc.Sequence) or len(other) != 2:
             raise BadOperand
 
         input, output = other
-        
-        if input not in self.occ_matrix:
-            self.occ_matrix[input] = {}
 
-        if output not in self.occ_matrix[input]:
-            self.occ_matrix[input][output] = 1
-        
-        else:
-            self.occ_matrix[input][output] += 1
-        
-        self.utd_matrix[input] = False
+        self._add(input, output, 1)
 
         return self
 
+    def __len__(self) -> int:
+        '''Returns the number of distinct transitions.'''
+
+        return self.transitions
+
     def __getitem__(self, input: str) -> str:
-        if input not in self.occ_matrix:
+        input_id = self.input_vocabulary.get_id(input)
+
+        if input_id is None:
+            raise InputNotPresent
+
+        cumulative = self._get_cumulative(input_id)
+
+        return self._get_output(self.row_keys[input_id][bisect_right(cumulative, random.randrange(cumulative[-1]))])
+
+    def get_occurrences(self, input: str) -> int:
+        '''Returns the total number of occurrences of transitions from the input, or 0 if the input is not present.'''
+
+        input_id = self.input_vocabulary.get_id(input)
+
+        return self._get_cumulative(input_id)[-1] if input_id is not None else 0
+
+    def get_output(self, input: str, position: int) -> str:
+        '''Returns the output at the position among occurrences of transitions from the input, so drawing the position
+        uniformly samples outputs proportionally to their occurrences.'''
+
+        input_id = self.input_vocabulary.get_id(input)
+
+        if input_id is None:
             raise InputNotPresent
-        
-        if not self.utd_matrix[input]:
-            total_occ = reduce((lambda acc, x: acc + x), [*self.occ_matrix[input].values()])
-            self.freq_matrix[input] = { k: v / total_occ for k, v in self.occ_matrix[input].items() }
 
-            self.utd_matrix[input] = True
+        return self._get_output(self.row_keys[input_id][bisect_right(self._get_cumulative(input_id), position)])
+
+    def find_inputs(self, token: str) -> list[str]:
+        '''Returns inputs containing the token.'''
+
+        input_ids = self.token_inputs.get(token, ())
+
+        if isinstance(input_ids, int):
+            input_ids = (input_ids,)
+
+        return [ self.input_vocabulary[input_id] for input_id in input_ids ]
+
+    def update(self, transitions: collections.abc.Mapping[tuple[str, str], int]) -> None:
+        '''Adds occurrences of transitions, mapped from pairs of an input and an output.'''
+
+        for (input, output), count in transitions.items():
+            self._add(input, output, count)
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the grammar.'''
+
+        size = self.vocabulary.memory_size() + self.prefixes.memory_size() + self.input_vocabulary.memory_size()
+        size += sys.getsizeof(self.utd_matrix)
+
+        # every input has a row of keys, counts and cumulative counts - keys and cumulative counts take 8 bytes per
+        # item, and counts 4 bytes
+        size += 3 * (sys.getsizeof(self.row_keys) + len(self.row_keys) * self.ARRAY_SIZE)
+        size += self.transitions * 12 + self.cumulative_items * 8
+
+        size += self.new_inputs.itemsize * len(self.new_inputs) + self.new_keys.itemsize * len(self.new_keys)
+
+        size += sys.getsizeof(self.token_inputs) + self.index_size
+        size += sys.getsizeof(self.row_minimums) + self.minimums_size
+
+        return size
+
+    def get_transition(self, input: str, output: str) -> tuple[int, int]:
+        '''Returns the id of the input and the key of the output of a transition present in the grammar.'''
+
+        return self.input_vocabulary.get_id(input), self._get_key(output)
 
-        return random.choices(
-            population=[*self.freq_matrix[input].keys()],
-            weights=[*self.freq_matrix[input].values()]
-        )[0]
+    def get_transition_output(self, key: int) -> str:
+        '''Returns the output of a transition with the key.'''
+
+        return self._get_output(key)
+
+    def prune(self, min_count: int, min_input_count: int) -> tuple[array, array, array]:
+        '''Removes transitions occurring less than min_count times, and inputs occurring less than min_input_count
+        times in total, like pruned, replacing the grammar with its pruned copy. Returns arrays mapping previous ids of
+        inputs, tokens and links of prefixes to the reassigned ones, or to -1 if removed.'''
+
+        pruned, input_ids, token_ids, link_ids = self.pruned(min_count, min_input_count)
+        self.__dict__.update(vars(pruned))
+
+        return input_ids, token_ids, link_ids
+
+    def pruned(self, min_count: int, min_input_count: int) -> tuple[MarkovGrammar, array, array, array]:
+        '''Returns a copy of the grammar without transitions occurring less than min_count times, and inputs occurring
+        less than min_input_count times in total. Transitions added since the last pruning of a prunable grammar are
+        kept, along with their inputs. Ids of the remaining inputs, tokens and prefixes are reassigned, so removed ones
+        take no memory.
+
+        The grammar is only read, so it can be pruned in another thread while messages are generated from it. Returns
+        the copy, and arrays mapping previous ids of inputs, tokens and links of prefixes to the reassigned ones, or to
+        -1 if removed.'''
+
+        inputs = TokenVocabulary()
+        vocabulary = TokenVocabulary()
+        prefixes = PrefixTable(vocabulary)
+        row_keys: list[array] = []
+        row_counts: list[array] = []
+        new_inputs = set(self.new_inputs)
+        new_transitions = { input_id << 64 | key for input_id, key in zip(self.new_inputs, self.new_keys) }
+
+        rows = zip(self.input_vocabulary.tokens, self.row_keys, self.row_counts)
+
+        for input_id, (input, keys, counts) in enumerate(rows):
+            if sum(counts) < min_input_count and input_id not in new_inputs:
+                continue
+
+            kept = sorted(
+                (self._get_key(self._get_output(key), prefixes), count)
+                for key, count in zip(keys, counts)
+                if count >= min_count or input_id << 64 | key in new_transitions
+            )
+
+            if len(kept) == 0:
+                continue
+
+            inputs.intern(input)
+            row_keys.append(array('Q', [ key for key, _ in kept ]))
+            row_counts.append(array('I', [ count for _, count in kept ]))
+
+        input_ids = self._map_ids(self.input_vocabulary, inputs)
+        token_ids = self._map_ids(self.vocabulary, vocabulary)
+        link_ids = array('q', [ -1 ] * len(self.prefixes))
+
+        for link in range(len(self.prefixes)):
+            id = prefixes.get_id(self.prefixes[link | PrefixTable.LINK])
+            link_ids[link] = id if id is not None else -1
+
+        grammar = MarkovGrammar(vocabulary, self.max_row_size, self.prunable)
+        grammar.prefixes = prefixes
+        grammar.input_vocabulary = inputs
+        grammar.row_keys = row_keys
+        grammar.row_counts = row_counts
+        grammar.row_cumulative = [ array('Q') for _ in row_keys ]
+        grammar.utd_matrix = bytearray(len(row_keys))
+        grammar.transitions = sum(len(keys) for keys in row_keys)
+
+        for input_id, input in enumerate(inputs.tokens):
+            grammar._index(input, input_id)
+
+        return grammar, input_ids, token_ids, link_ids
 
     def print_matrixes(self):
-        print(self.occ_matrix)
-        print(self.freq_matrix)
-        print(self.utd_matrix)
+        for input, keys, counts in zip(self.input_vocabulary.tokens, self.row_keys, self.row_counts):
+            print(input, { self._get_output(key): count for key, count in zip(keys, counts) })
+
+    def _add(self, input: str, output: str, count: int) -> None:
+        input_id = self.input_vocabulary.intern(input)
+
+        if input_id == len(self.row_keys):
+            self.row_keys.append(array('Q'))
+            self.row_counts.append(array('I'))
+            self.row_cumulative.append(array('Q'))
+            self.utd_matrix.append(False)
+            self._index(input, input_id)
+
+        key = self._get_key(output)
+        keys = self.row_keys[input_id]
+        counts = self.row_counts[input_id]
+        position = bisect_left(keys, key)
+
+        if position < len(keys) and keys[position] == key:
+            counts[position] += count
+
+        elif self.max_row_size > 0 and len(keys) >= self.max_row_size:
+            # replace the least occurring transition, overestimating the occurrences of the new one
+            replaced = self._pop_least_occurring(input_id)
+            count += counts[replaced]
+
+            del keys[replaced]
+            del counts[replaced]
+
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            counts.insert(position, count)
+
+        else:
+            keys.insert(position, key)
+            counts.insert(position, count)
+
+            self.transitions += 1
+
+            # the new transition may occur less than the cached ones, if the row was full with a smaller maximum
+            if input_id in self.row_minimums:
+                _, candidates = self.row_minimums.pop(input_id)
+                self.minimums_size -= candidates.itemsize * len(candidates)
+
+            if self.prunable:
+                self.new_inputs.append(input_id)
+                self.new_keys.append(key)
+
+        self.utd_matrix[input_id] = False
+
+    def _pop_least_occurring(self, input_id: int) -> int:
+        '''Returns the position of a least occurring transition of a row, taking it from the cached keys. Cached keys
+        which occurred again since are skipped, and the keys are cached again once none is left.'''
+
+        keys = self.row_keys[input_id]
+        counts = self.row_counts[input_id]
+        minimum, candidates = self.row_minimums.get(input_id, (0, array('Q')))
+
+        while len(candidates) > 0:
+            position = bisect_left(keys, candidates.pop())
+            self.minimums_size -= candidates.itemsize
+
+            if position < len(keys) and counts[position] == minimum:
+                return position
+
+        # transitions are compared in C, so caching the keys takes no Python code per transition
+        minimum = min(counts)
+        candidates = array('Q', compress(keys, map(minimum.__eq__, counts)))
+        self.minimums_size += candidates.itemsize * (len(candidates) - 1)
+        self.row_minimums[input_id] = (minimum, candidates)
+
+        return bisect_left(keys, candidates.pop())
+
+    def _get_cumulative(self, input_id: int) -> array:
+        if not self.utd_matrix[input_id]:
+            cumulative = array('Q', accumulate(self.row_counts[input_id]))
+            self.cumulative_items += len(cumulative) - len(self.row_cumulative[input_id])
+            self.row_cumulative[input_id] = cumulative
+            self.utd_matrix[input_id] = True
+
+        return self.row_cumulative[input_id]
+
+    def _index(self, input: str, input_id: int) -> None:
+        # most tokens are contained in a single input, so its id is stored without allocating an array
+        for token in set(input.split(' ')):
+            input_ids = self.token_inputs.get(token)
+
+            if input_ids is None:
+                self.token_inputs[token] = input_id
+
+            elif isinstance(input_ids, int):
+                self.token_inputs[token] = array('I', [ input_ids, input_id ])
+                self.index_size += sys.getsizeof(self.token_inputs[token])
+
+            else:
+                input_ids.append(input_id)
+                self.index_size += input_ids.itemsize
+
+    @staticmethod
+    def _map_ids(previous: TokenVocabulary, current: TokenVocabulary) -> array:
+        ids = (current.get_id(token) for token in previous.tokens)
+
+        return array('q', [ id if id is not None else -1 for id in ids ])
+
+    def _get_key(self, output: str, prefixes: PrefixTable | None = None) -> int:
+        prefixes = prefixes if prefixes is not None else self.prefixes
+        prefix, _, last = output.rpartition(' ')
+
+        return prefixes.intern(prefix) << 32 | prefixes.vocabulary.intern(last)
+
+    def _get_output(self, key: int) -> str:
+        prefix = self.prefixes[key >> 32]
+        last = self.vocabulary[key & 0xFFFFFFFF]
+
+        return f'{prefix} {last}' if prefix else last
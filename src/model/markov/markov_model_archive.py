@@ -0,0 +1,253 @@
+import gzip
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, pairwise
+from typing import BinaryIO, Iterable
+
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.exception.invalid_model_archive import InvalidModelArchive
+from model.markov.prefix_table import PrefixTable
+
+
+class MarkovModelArchive:
+    '''Class converting the Markov chain model of a channel to and from a portable binary archive, so the model can be
+    moved between instances of the bot, or backed up, without relearning it.
+
+    The archive starts with a header, followed by a gzip stream of flat sections: the grammar and the reverse grammar,
+    each as the table of tokens, the links of prefixes and their sorted order, the table of inputs, the offsets of rows,
+    the transition keys and the occurrences,
+    then the table of sentence starts with their occurrences, and the transitions and sentence starts of every author.
+    Tables consist of the lengths of UTF-8 encoded strings followed by the strings, and arrays of their length followed
+    by little-endian integers. Sections are compressed and written one at a time, and read back the same way, so the
+    archive is never held in memory as a whole, and no code is executed when reading an untrusted archive.
+
+    Every id read is checked to be in range, and every array looked up by bisection to be sorted, so a damaged archive
+    is rejected when it is read, rather than failing once messages are generated from the imported model.'''
+
+    MAGIC = b'KKMA'
+    VERSION = 2
+
+    # magic, version, the newest learned message
+    HEADER = struct.Struct('<4sIQ')
+    LENGTH = struct.Struct('<Q')
+
+    # most of the archive are ids and counts, which compress poorly, so faster compression loses little
+    COMPRESSION_LEVEL = 1
+
+    @classmethod
+    def write(cls, model: MarkovModelEntity, file: BinaryIO) -> None:
+        '''Writes the model to the binary file. Blocks until the whole model is written, so it should run in another
+        thread than the event loop, and the model must not be modified meanwhile.'''
+
+        file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, model.newest_message))
+
+        with gzip.GzipFile(fileobj=file, mode='wb', compresslevel=cls.COMPRESSION_LEVEL, mtime=0) as stream:
+            cls._write_grammar(stream, model.grammar)
+            cls._write_grammar(stream, model.reverse_grammar)
+            cls._write_table(stream, model.sentence_starts['starts'])
+            cls._write_array(stream, 'I', model.sentence_starts['counts'])
+
+            stream.write(cls.LENGTH.pack(len(model.author_grammars)))
+
+            for author_id, author_grammar in model.author_grammars.items():
+                stream.write(cls.LENGTH.pack(author_id))
+                cls._write_array(stream, 'I', author_grammar['inputs'])
+                cls._write_array(stream, 'Q', author_grammar['keys'])
+                cls._write_array(stream, 'I', author_grammar['counts'])
+                cls._write_table(stream, author_grammar['sentence_starts']['starts'])
+                cls._write_array(stream, 'I', author_grammar['sentence_starts']['counts'])
+
+    @classmethod
+    def read(cls, file: BinaryIO, channel_id: int) -> MarkovModelEntity:
+        '''Reads a model written by the write method from the binary file, as the model of the channel. Throws
+        InvalidModelArchive exception if the file is not an archive of a compatible version, or is damaged.'''
+
+        header = file.read(cls.HEADER.size)
+
+        if len(header) < cls.HEADER.size:
+            raise InvalidModelArchive
+
+        magic, version, newest_message = cls.HEADER.unpack(header)
+
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise InvalidModelArchive
+
+        try:
+            with gzip.GzipFile(fileobj=file, mode='rb') as stream:
+                grammar = cls._read_grammar(stream)
+                reverse_grammar = cls._read_grammar(stream)
+                sentence_starts = cls._read_starts(stream)
+                author_grammars = {}
+
+                for _ in range(cls._read_length(stream)):
+                    author_id = cls._read_length(stream)
+                    inputs = cls._read_array(stream, 'I')
+                    keys = cls._read_array(stream, 'Q')
+                    counts = cls._read_array(stream, 'I')
+
+                    if not len(inputs) == len(keys) == len(counts):
+                        raise InvalidModelArchive
+
+                    cls._check_author_transitions(grammar, inputs, keys)
+
+                    author_grammars[author_id] = {
+                        'inputs': inputs,
+                        'keys': keys,
+                        'counts': counts,
+                        'sentence_starts': cls._read_starts(stream)
+                    }
+
+        except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+            raise InvalidModelArchive from e
+
+        return MarkovModelEntity(channel_id, grammar, reverse_grammar, sentence_starts, newest_message, author_grammars)
+
+    @classmethod
+    def _write_grammar(cls, stream: BinaryIO, grammar: dict) -> None:
+        cls._write_table(stream, grammar['tokens'])
+        cls._write_array(stream, 'Q', grammar['prefixes'])
+        cls._write_array(stream, 'I', grammar['prefix_order'])
+        cls._write_table(stream, grammar['inputs'])
+        cls._write_array(stream, 'Q', grammar['row_offsets'])
+        cls._write_array(stream, 'Q', grammar['row_keys'])
+        cls._write_array(stream, 'I', grammar['row_counts'])
+
+    @classmethod
+    def _read_grammar(cls, stream: BinaryIO) -> dict:
+        grammar = {
+            'tokens': cls._read_table(stream),
+            'prefixes': cls._read_array(stream, 'Q'),
+            'prefix_order': cls._read_array(stream, 'I'),
+            'inputs': cls._read_table(stream),
+            'row_offsets': cls._read_array(stream, 'Q'),
+            'row_keys': cls._read_array(stream, 'Q'),
+            'row_counts': cls._read_array(stream, 'I')
+        }
+
+        offsets, keys = grammar['row_offsets'], grammar['row_keys']
+
+        # rows are sliced by their offsets, so they must cover the transitions exactly
+        if len(offsets) != len(grammar['inputs']) + 1 or offsets[0] != 0 or offsets[-1] != len(keys):
+            raise InvalidModelArchive
+
+        if any(start > end for start, end in pairwise(offsets)):
+            raise InvalidModelArchive
+
+        if len(grammar['row_counts']) != len(grammar['row_keys']):
+            raise InvalidModelArchive
+
+        # prefixes are followed link by link, so every link must lead to an earlier one, or to a token
+        for id, link in enumerate(grammar['prefixes']):
+            prefix, last = link >> 32, link & 0xFFFFFFFF
+            earlier = prefix ^ PrefixTable.LINK < id if prefix & PrefixTable.LINK else prefix < len(grammar['tokens'])
+
+            if not earlier or last >= len(grammar['tokens']):
+                raise InvalidModelArchive
+
+        if sorted(grammar['prefix_order']) != list(range(len(grammar['prefixes']))):
+            raise InvalidModelArchive
+
+        # links are looked up by bisection in their sorted order, and transitions in their rows
+        if not cls._is_sorted(map(grammar['prefixes'].__getitem__, grammar['prefix_order'])):
+            raise InvalidModelArchive
+
+        for start, end in pairwise(offsets):
+            if not cls._is_sorted(keys[start:end]):
+                raise InvalidModelArchive
+
+        for key in keys:
+            prefix, last = key >> 32, key & 0xFFFFFFFF
+            in_range = prefix ^ PrefixTable.LINK < len(grammar['prefixes']) if prefix & PrefixTable.LINK \
+                else prefix < len(grammar['tokens'])
+
+            if not in_range or last >= len(grammar['tokens']):
+                raise InvalidModelArchive
+
+        return grammar
+
+    @classmethod
+    def _check_author_transitions(cls, grammar: dict, inputs: array, keys: array) -> None:
+        '''Throws InvalidModelArchive exception unless transitions of an author are sorted, and are transitions of
+        the grammar of the channel.'''
+
+        if not cls._is_sorted(zip(inputs, keys)):
+            raise InvalidModelArchive
+
+        offsets, row_keys = grammar['row_offsets'], grammar['row_keys']
+
+        for input, key in zip(inputs, keys):
+            if input >= len(grammar['inputs']):
+                raise InvalidModelArchive
+
+            position = bisect_left(row_keys, key, offsets[input], offsets[input + 1])
+
+            if position == offsets[input + 1] or row_keys[position] != key:
+                raise InvalidModelArchive
+
+    @staticmethod
+    def _is_sorted(values: Iterable) -> bool:
+        '''Returns whether the values are strictly increasing.'''
+
+        return all(previous < value for previous, value in pairwise(values))
+
+    @classmethod
+    def _read_starts(cls, stream: BinaryIO) -> dict:
+        starts = cls._read_table(stream)
+        counts = cls._read_array(stream, 'I')
+
+        if len(starts) != len(counts):
+            raise InvalidModelArchive
+
+        return { 'starts': starts, 'counts': counts }
+
+    @classmethod
+    def _write_table(cls, stream: BinaryIO, strings: list[str]) -> None:
+        encoded = [ string.encode() for string in strings ]
+
+        cls._write_array(stream, 'I', array('I', [ len(string) for string in encoded ]))
+        stream.write(b''.join(encoded))
+
+    @classmethod
+    def _read_table(cls, stream: BinaryIO) -> list[str]:
+        lengths = cls._read_array(stream, 'I')
+        blob = cls._read_exactly(stream, sum(lengths))
+        offsets = list(accumulate(lengths, initial=0))
+
+        return [ blob[start:end].decode() for start, end in zip(offsets, offsets[1:]) ]
+
+    @classmethod
+    def _write_array(cls, stream: BinaryIO, typecode: str, values: array) -> None:
+        if values.typecode != typecode or sys.byteorder != 'little':
+            values = array(typecode, values)
+
+            if sys.byteorder != 'little':
+                values.byteswap()
+
+        stream.write(cls.LENGTH.pack(len(values)))
+        stream.write(memoryview(values).cast('B'))
+
+    @classmethod
+    def _read_array(cls, stream: BinaryIO, typecode: str) -> array:
+        values = array(typecode)
+        values.frombytes(cls._read_exactly(stream, cls._read_length(stream) * values.itemsize))
+
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        return values
+
+    @classmethod
+    def _read_length(cls, stream: BinaryIO) -> int:
+        return cls.LENGTH.unpack(cls._read_exactly(stream, cls.LENGTH.size))[0]
+
+    @staticmethod
+    def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+        data = stream.read(size)
+
+        if len(data) < size:
+            raise InvalidModelArchive
+
+        return data
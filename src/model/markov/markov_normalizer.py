@@ -0,0 +1,75 @@
+import re
+import string
+import unicodedata
+
+
+class FoldingTable(dict):
+    '''Translation table folding characters into lowercase ASCII letters and digits. Whitespace is kept, and other
+    characters are masked with @. Characters missing from the table are folded on first use and cached.'''
+
+    ALLOWED = frozenset(string.ascii_lowercase + string.digits)
+
+    # letters which Unicode does not decompose into a base letter and diacritics
+    UNDECOMPOSABLE = {
+        'ł': 'l',
+        'đ': 'd',
+        'ð': 'd',
+        'ħ': 'h',
+        'ı': 'i',
+        'ø': 'o',
+        'œ': 'oe',
+        'æ': 'ae',
+        'þ': 'th'
+    }
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+
+        if char.isspace():
+            folded = char
+
+        else:
+            folded = ''.join(self.UNDECOMPOSABLE.get(c, c) for c in char.casefold())
+            folded = ''.join(c for c in unicodedata.normalize('NFKD', folded) if not unicodedata.combining(c))
+
+            if folded == '' or not self.ALLOWED.issuperset(folded):
+                folded = '@'
+
+        self[code] = folded
+
+        return folded
+
+
+class MarkovNormalizer:
+    '''Class normalizing texts learned by the Markov chain model. Patterns and the translation table are built once,
+    and every text is processed in a single pass of each.
+
+    Normalization folds letters with diacritics into their base letters, for any script decomposable by Unicode, and
+    maps every character separately, so tokens of a normalized text correspond to tokens of the original one.'''
+
+    # hyperlinks, and command invokations, mentions, tags etc along with the preceding whitespace
+    FILTERED = re.compile(r'(?:https?|ftp)://\S*|(?:^|\s)[!<$%^&*\-+=?/.,]\S+')
+
+    def __init__(self) -> None:
+        self.table = FoldingTable()
+
+        # build the table for Latin scripts at startup, other characters are folded on first use
+        for code in range(0x250):
+            self.table[code]
+
+    def filter(self, texts: list[str]) -> list[str]:
+        '''Returns texts without hyperlinks, command invokations, mentions, tags etc.'''
+
+        return [ self.FILTERED.sub('', text) for text in texts ]
+
+    def normalize(self, text: str) -> str:
+        '''Returns the text in the normalized form.'''
+
+        return text.translate(self.table)
+
+    def normalize_batch(self, texts: list[str]) -> list[str]:
+        '''Returns texts in the normalized form.'''
+
+        table = self.table
+
+        return [ text.translate(table) for text in texts ]
@@ -0,0 +1,39 @@
+import random
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+
+
+class MergedMarkovGrammar:
+    '''Class representing a read-only Markov chain model merged from models of several channels, such as all channels
+    of a server.
+
+    The merged model references the grammars of channels instead of copying their transitions, so the occurrences of
+    every channel are stored once, however many merged models include it, and whatever the channels learn is merged
+    immediately. An output is sampled from the summed occurrences of transitions in two steps: a grammar is chosen
+    proportionally to the occurrences of the input in it, and the output is sampled from that grammar. Sampling looks
+    the input up in each of m grammars, so it takes about m times as long as in a single grammar.'''
+
+    def __init__(self, grammars: list[MarkovGrammar | FrozenMarkovGrammar]) -> None:
+        self.grammars = grammars
+
+    def __getitem__(self, input: str) -> str:
+        occurrences = [ grammar.get_occurrences(input) for grammar in self.grammars ]
+        total = sum(occurrences)
+
+        if total == 0:
+            raise InputNotPresent
+
+        position = random.randrange(total)
+
+        for grammar, grammar_occurrences in zip(self.grammars, occurrences):
+            if position < grammar_occurrences:
+                return grammar.get_output(input, position)
+
+            position -= grammar_occurrences
+
+    def find_inputs(self, token: str) -> list[str]:
+        '''Returns inputs containing the token in any of the merged grammars.'''
+
+        return list(dict.fromkeys(input for grammar in self.grammars for input in grammar.find_inputs(token)))
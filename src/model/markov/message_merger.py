@@ -0,0 +1,51 @@
+import datetime
+
+from nextcord import Message
+
+from model.markov.message_run import MessageRun
+
+
+class MessageMerger:
+    '''Class merging consecutive messages sent by the same author in a short period of time into runs. Messages must
+    be pushed from the oldest one, and a run is returned as soon as a message not belonging to it arrives, so only the
+    currently open run is kept in memory.'''
+
+    def __init__(self, max_gap: datetime.timedelta = datetime.timedelta(minutes=5)) -> None:
+        self.max_gap = max_gap
+        self.first_message: Message | None = None
+        self.run: MessageRun | None = None
+
+    def push(self, message: Message) -> MessageRun | None:
+        '''Adds the message to the open run. Returns the previous run if the message starts a new one.'''
+
+        finished_run = None
+
+        # check if same author and created at the same time as the first message of the run
+        if self.first_message is None \
+                or message.author != self.first_message.author \
+                or message.created_at - self.first_message.created_at > self.max_gap:
+            finished_run = self.run
+
+            self.first_message = message
+            self.run = MessageRun(message.author.id, [], message.id)
+
+        self.run.contents.append(message.content)
+        self.run.newest_message = message.id
+
+        return finished_run
+
+    def is_closed(self, now: datetime.datetime) -> bool:
+        '''Returns True if there is an open run and no message sent after the specified time can be merged into it,
+        False otherwise.'''
+
+        return self.first_message is not None and now - self.first_message.created_at > self.max_gap
+
+    def flush(self) -> MessageRun | None:
+        '''Closes and returns the open run, if there is one.'''
+
+        finished_run = self.run
+
+        self.first_message = None
+        self.run = None
+
+        return finished_run
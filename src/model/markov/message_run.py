@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class MessageRun:
+    '''Dataclass representing consecutive messages sent by the same author in a short period of time.'''
+
+    author_id: int
+    contents: list[str]
+    newest_message: int
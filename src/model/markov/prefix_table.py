@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import heapq
+import sys
+from array import array
+from bisect import bisect_left
+
+from model.markov.token_vocabulary import TokenVocabulary
+
+
+class PrefixTable:
+    '''Class interning prefixes of outputs, sequences of tokens separated by spaces, into integer ids, so only single
+    tokens are stored as strings.
+
+    A prefix of a single token, or an empty one, is identified by the id of the token in the vocabulary. A longer
+    prefix is a link: the id of the prefix without its last token packed with the id of the last token into a 64-bit
+    integer, so a prefix takes 8 bytes however many tokens it has. Ids of links have the highest bit set, so they are
+    told apart from ids of tokens.
+
+    Links are looked up in a sorted array of links, along with the ids they are stored at, in O(log n) for n links.
+    Links added since are buffered until they are a fraction of the sorted ones, which makes the cost of sorting
+    amortized O(log n) per link.'''
+
+    # ids of links have this bit set, so ids of tokens must stay below it
+    LINK = 1 << 31
+
+    # sort once the buffered links are at least this fraction of the sorted ones
+    MERGE_FRACTION = 0.25
+
+    def __init__(self, vocabulary: TokenVocabulary, links: array | None = None, order: array | None = None) -> None:
+        self.vocabulary = vocabulary
+        self.links = links if links is not None else array('Q')
+
+        # ids of links sorted by the links, and the sorted links, built from the order if it is known
+        self.order = order
+        self.sorted_links: array | None = None
+        self.pending: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        '''Returns the number of prefixes of more than one token.'''
+
+        return len(self.links)
+
+    def __getitem__(self, id: int) -> str:
+        tokens = []
+
+        while id & self.LINK:
+            link = self.links[id ^ self.LINK]
+            tokens.append(self.vocabulary[link & 0xFFFFFFFF])
+            id = link >> 32
+
+        tokens.append(self.vocabulary[id])
+
+        return ' '.join(reversed(tokens))
+
+    def intern(self, prefix: str) -> int:
+        '''Returns the id of the prefix, assigning new ids to the prefix and its shorter prefixes if they were not seen
+        before.'''
+
+        first, *tokens = prefix.split(' ')
+        id = self.vocabulary.intern(first)
+
+        for token in tokens:
+            link = id << 32 | self.vocabulary.intern(token)
+            id = self._find(link)
+
+            if id is None:
+                id = self.pending[link] = len(self.links) | self.LINK
+                self.links.append(link)
+
+        return id
+
+    def get_id(self, prefix: str) -> int | None:
+        '''Returns the id of the prefix, or None if the prefix was not seen before.'''
+
+        first, *tokens = prefix.split(' ')
+        id = self.vocabulary.get_id(first)
+
+        for token in tokens:
+            token_id = self.vocabulary.get_id(token)
+
+            if id is None or token_id is None:
+                return None
+
+            id = self._find(id << 32 | token_id)
+
+        return id
+
+    @classmethod
+    def map_id(cls, id: int, token_ids: array, link_ids: array) -> int:
+        '''Returns the id of a prefix reassigned by pruning, given arrays mapping previous ids of tokens and links to
+        the reassigned ones, or -1 if the prefix was removed.'''
+
+        return link_ids[id ^ cls.LINK] if id & cls.LINK else token_ids[id]
+
+    def get_order(self) -> array:
+        '''Returns ids of links sorted by the links, which can be persisted, so the links are not sorted again once
+        they are restored.'''
+
+        self._merge()
+
+        return self.order
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the prefixes, not counting the vocabulary.'''
+
+        size = sys.getsizeof(self.links) + sys.getsizeof(self.pending)
+
+        if self.order is not None:
+            size += sys.getsizeof(self.order)
+
+        if self.sorted_links is not None:
+            size += sys.getsizeof(self.sorted_links)
+
+        return size
+
+    def _find(self, link: int) -> int | None:
+        id = self.pending.get(link)
+
+        if id is not None:
+            return id
+
+        if self.sorted_links is None or len(self.pending) >= len(self.links) * self.MERGE_FRACTION:
+            self._merge()
+
+        position = bisect_left(self.sorted_links, link)
+
+        if position < len(self.sorted_links) and self.sorted_links[position] == link:
+            return self.order[position] | self.LINK
+
+        return None
+
+    def _merge(self) -> None:
+        '''Merges buffered links into the sorted ones, in a single pass over both.'''
+
+        if self.order is None:
+            self.order = array('I', sorted(range(len(self.links) - len(self.pending)), key=self.links.__getitem__))
+
+        if self.sorted_links is None:
+            self.sorted_links = array('Q', map(self.links.__getitem__, self.order))
+
+        if len(self.pending) == 0:
+            return
+
+        pending = sorted((link, id ^ self.LINK) for link, id in self.pending.items())
+        merged = list(heapq.merge(zip(self.sorted_links, self.order), pending))
+
+        self.sorted_links = array('Q', [ link for link, _ in merged ])
+        self.order = array('I', [ id for _, id in merged ])
+        self.pending.clear()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import collections.abc
+import random
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Iterator
+
+from model.markov.token_vocabulary import TokenVocabulary
+
+
+class SentenceStarts:
+    '''Class representing sentence starts of the Markov chain model, along with the number of messages beginning with
+    each of them.
+
+    Starts are interned into consecutive ids, so they are deduplicated like in a set, and sampled by drawing an id,
+    without copying the starts. Uniform sampling takes O(1), and sampling proportionally to occurrences O(log n) for n
+    starts, using cumulative occurrences cached until the starts change.'''
+
+    def __init__(self, starts: list[str] | None = None, counts: array | None = None) -> None:
+        self.vocabulary = TokenVocabulary(starts)
+        self.counts = counts if counts is not None else array('I', [1] * len(self.vocabulary))
+        self.cumulative = array('Q')
+        self.utd = False
+
+    @classmethod
+    def from_dict(cls, dict: dict) -> SentenceStarts:
+        '''Creates an instance of SentenceStarts based on a dictionary created by to_dict.'''
+
+        return cls(dict['starts'], dict['counts'])
+
+    def to_dict(self) -> dict:
+        '''Returns a dict that can be persisted.'''
+
+        return {
+            'starts': self.vocabulary.tokens,
+            'counts': self.counts
+        }
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    def __contains__(self, start: str) -> bool:
+        return start in self.vocabulary
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.vocabulary.tokens)
+
+    def add(self, start: str, count: int = 1) -> None:
+        '''Adds occurrences of the start.'''
+
+        id = self.vocabulary.intern(start)
+
+        if id == len(self.counts):
+            self.counts.append(count)
+
+        else:
+            self.counts[id] += count
+
+        self.utd = False
+
+    def update(self, starts: collections.abc.Mapping[str, int]) -> None:
+        '''Adds occurrences of starts, mapped from the starts.'''
+
+        for start, count in starts.items():
+            self.add(start, count)
+
+    def sample(self, weighted: bool = False) -> str:
+        '''Returns a random start. If weighted is True, starts are sampled proportionally to their occurrences, and
+        uniformly otherwise.'''
+
+        if not weighted:
+            return random.choice(self.vocabulary.tokens)
+
+        cumulative = self._get_cumulative()
+
+        return self.vocabulary[bisect_right(cumulative, random.randrange(cumulative[-1]))]
+
+    def total(self, weighted: bool = False) -> int:
+        '''Returns the total number of occurrences of starts if weighted is True, and the number of starts otherwise.'''
+
+        if not weighted:
+            return len(self.vocabulary)
+
+        return self._get_cumulative()[-1] if len(self.counts) > 0 else 0
+
+    def filter(self, predicate: Callable[[str], bool]) -> SentenceStarts:
+        '''Returns the starts satisfying the predicate, along with their occurrences.'''
+
+        kept = [ id for id, start in enumerate(self.vocabulary.tokens) if predicate(start) ]
+
+        return SentenceStarts([ self.vocabulary[id] for id in kept ], array('I', [ self.counts[id] for id in kept ]))
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the starts.'''
+
+        return self.vocabulary.memory_size() + sys.getsizeof(self.counts) + sys.getsizeof(self.cumulative)
+
+    def _get_cumulative(self) -> array:
+        if not self.utd:
+            self.cumulative = array('Q', accumulate(self.counts))
+            self.utd = True
+
+        return self.cumulative
@@ -0,0 +1,42 @@
+import sys
+
+
+class TokenVocabulary:
+    '''Class interning tokens into consecutive integer ids, so every distinct token is stored only once. The memory
+    taken by the tokens is counted as they are interned, so measuring the vocabulary takes O(1).'''
+
+    def __init__(self, tokens: list[str] | None = None) -> None:
+        self.tokens: list[str] = tokens if tokens is not None else []
+        self.token_ids: dict[str, int] = { token: id for id, token in enumerate(self.tokens) }
+        self.tokens_size = sum(sys.getsizeof(token) for token in self.tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.token_ids
+
+    def __getitem__(self, id: int) -> str:
+        return self.tokens[id]
+
+    def intern(self, token: str) -> int:
+        '''Returns the id of the token, assigning a new one if the token was not seen before.'''
+
+        id = self.token_ids.get(token)
+
+        if id is None:
+            id = self.token_ids[token] = len(self.tokens)
+            self.tokens.append(token)
+            self.tokens_size += sys.getsizeof(token)
+
+        return id
+
+    def get_id(self, token: str) -> int | None:
+        '''Returns the id of the token, or None if the token was not seen before.'''
+
+        return self.token_ids.get(token)
+
+    def memory_size(self) -> int:
+        '''Returns the approximate number of bytes taken by the vocabulary.'''
+
+        return sys.getsizeof(self.tokens) + sys.getsizeof(self.token_ids) + self.tokens_size
@@ -0,0 +1,176 @@
+import asyncio
+import mmap
+import os
+import pickle
+
+from config import Config
+from model.entity.markov_delta_entity import MarkovDeltaEntity
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+from repository.i_markov_repository import IMarkovRepository
+
+
+class FileMarkovRepository(IMarkovRepository):
+    '''Class responsible for persisting the learned Markov chain models in the local filesystem. Every channel is
+    stored in a separate file, so saving a model does not rewrite the models of other channels.
+
+    Changes to a model are appended to a log file of the channel, next to the snapshot of the model, so logging a small
+    change writes only the change. The log is replayed onto the snapshot when the model is loaded, and deleted once a
+    newer snapshot contains it.
+
+    The directory is created on the first write, so the repository can be created before the directory is writable,
+    such as before a volume is mounted.'''
+
+    def __init__(self, config: Config) -> None:
+        self.directory = config.markov_directory
+
+    async def get_model(self, channel_id: int) -> MarkovModelEntity | None:
+        '''Returns the model of a channel from its file, or None if the channel has no compatible file.'''
+
+        model_dict = await asyncio.to_thread(self._read, self._get_path(channel_id))
+
+        # snapshots written by an incompatible version of the bot cannot be restored, and the channel must be relearned
+        if model_dict is None or not MarkovModelEntity.is_compatible(model_dict):
+            return None
+
+        model = MarkovModelEntity.from_dict(model_dict)
+
+        return model
+
+    async def save_model(self, model: MarkovModelEntity) -> MarkovModelEntity:
+        '''Saves the model of a channel in its file. Returns the saved model.'''
+
+        # callers hold the lock of the channel, so the model is not modified while it is serialized in another thread
+        data = await asyncio.to_thread(pickle.dumps, model.to_dict(), pickle.HIGHEST_PROTOCOL)
+
+        await asyncio.to_thread(self._write, self._get_path(model.channel_id), data)
+
+        return model
+
+    async def append_delta(self, delta: MarkovDeltaEntity) -> None:
+        '''Appends changes to the model of a channel to its log file.'''
+
+        data = pickle.dumps(delta.to_dict(), protocol=pickle.HIGHEST_PROTOCOL)
+
+        await asyncio.to_thread(self._append, self._get_path(delta.channel_id, 'log'), data)
+
+    async def get_deltas(self, channel_id: int) -> list[MarkovDeltaEntity]:
+        '''Returns changes logged for the model of a channel, in the order they were appended. Changes logged by an
+        incompatible version of the bot are skipped.'''
+
+        delta_dicts = await asyncio.to_thread(self._read_all, self._get_path(channel_id, 'log'))
+
+        return [ MarkovDeltaEntity.from_dict(d) for d in delta_dicts if MarkovDeltaEntity.is_compatible(d) ]
+
+    async def delete_deltas(self, channel_id: int) -> None:
+        '''Deletes the log file of a channel, if there is one.'''
+
+        await asyncio.to_thread(self._delete, self._get_path(channel_id, 'log'))
+
+    async def get_frozen_grammar(self, channel_id: int) -> FrozenMarkovGrammar | None:
+        '''Returns the frozen model of a channel, mapped into memory from its file, or None if the channel has no
+        compatible frozen file. Frozen models cannot replay logged changes, so None is returned as well if the channel
+        has a log file.'''
+
+        if await asyncio.to_thread(os.path.exists, self._get_path(channel_id, 'log')):
+            return None
+
+        buffer = await asyncio.to_thread(self._map, self._get_path(channel_id, 'frozen'))
+
+        if buffer is None or not FrozenMarkovGrammar.is_compatible(buffer):
+            return None
+
+        return FrozenMarkovGrammar(buffer)
+
+    async def save_frozen_grammar(
+            self,
+            channel_id: int,
+            grammar: MarkovGrammar,
+            reverse_grammar: MarkovGrammar,
+            sentence_starts: SentenceStarts,
+            newest_message: int) -> None:
+        '''Freezes the model of a channel, including its reverse grammar, and saves it in its frozen file.'''
+
+        # callers hold the lock of the channel, so the model is not modified while it is frozen in another thread
+        data = await asyncio.to_thread(
+            FrozenMarkovGrammar.freeze,
+            grammar,
+            sentence_starts,
+            newest_message,
+            reverse_grammar
+        )
+
+        await asyncio.to_thread(self._write, self._get_path(channel_id, 'frozen'), data)
+
+    async def delete_frozen_grammar(self, channel_id: int) -> None:
+        '''Deletes the frozen file of a channel, if there is one.'''
+
+        await asyncio.to_thread(self._delete, self._get_path(channel_id, 'frozen'))
+
+    def _get_path(self, channel_id: int, extension: str = 'pickle') -> str:
+        return os.path.join(self.directory, f'{channel_id}.{extension}')
+
+    def _read(self, path: str) -> dict | None:
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+        except FileNotFoundError:
+            return None
+
+    def _read_all(self, path: str) -> list[dict]:
+        records = []
+
+        try:
+            with open(path, 'r+b') as f:
+                end = 0
+
+                try:
+                    while True:
+                        records.append(pickle.load(f))
+                        end = f.tell()
+
+                # a record cut short by a crash while it was being appended is dropped, so records appended after it
+                # can be read
+                except (EOFError, pickle.UnpicklingError):
+                    f.truncate(end)
+
+        except FileNotFoundError:
+            pass
+
+        return records
+
+    def _map(self, path: str) -> mmap.mmap | None:
+        try:
+            with open(path, 'rb') as f:
+                # the mapping stays valid after closing the file, and after the file is replaced by a newer one
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        # write to a temporary file first, so a crash during the write never corrupts the previous snapshot
+        temporary_path = f'{path}.tmp'
+
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+
+        os.replace(temporary_path, path)
+
+    def _append(self, path: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(path, 'ab') as f:
+            f.write(data)
+
+    def _delete(self, path: str) -> None:
+        try:
+            os.remove(path)
+
+        except FileNotFoundError:
+            pass
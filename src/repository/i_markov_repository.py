@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+
+from model.entity.markov_delta_entity import MarkovDeltaEntity
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+
+
+class IMarkovRepository(ABC):
+    '''Class responsible for persisting the learned Markov chain models.'''
+
+    @abstractmethod
+    async def get_model(self, channel_id: int) -> MarkovModelEntity | None:
+        '''Gets the model of a channel. Returns MarkovModelEntity if the model was found, None otherwise.'''
+
+    @abstractmethod
+    async def save_model(self, model: MarkovModelEntity) -> MarkovModelEntity:
+        '''Saves the model of a channel, replacing the previous one. Returns the saved model.'''
+
+    @abstractmethod
+    async def append_delta(self, delta: MarkovDeltaEntity) -> None:
+        '''Appends changes to the model of a channel to its log, without saving the whole model.'''
+
+    @abstractmethod
+    async def get_deltas(self, channel_id: int) -> list[MarkovDeltaEntity]:
+        '''Gets changes logged for the model of a channel, in the order they were appended.'''
+
+    @abstractmethod
+    async def delete_deltas(self, channel_id: int) -> None:
+        '''Deletes changes logged for the model of a channel, once they are contained in its saved model.'''
+
+    @abstractmethod
+    async def get_frozen_grammar(self, channel_id: int) -> FrozenMarkovGrammar | None:
+        '''Gets the frozen model of a channel. Returns FrozenMarkovGrammar if the frozen model was found and no changes
+        were logged after it, None otherwise.'''
+
+    @abstractmethod
+    async def save_frozen_grammar(
+            self,
+            channel_id: int,
+            grammar: MarkovGrammar,
+            reverse_grammar: MarkovGrammar,
+            sentence_starts: SentenceStarts,
+            newest_message: int) -> None:
+        '''Freezes the model of a channel, including its reverse grammar, and saves it, replacing the previous frozen
+        model.'''
+
+    @abstractmethod
+    async def delete_frozen_grammar(self, channel_id: int) -> None:
+        '''Deletes the frozen model of a channel, if there is one.'''
@@ -1,4 +1,4 @@
-from nextcord import VoiceChannel
+from nextcord import Attachment, TextChannel, VoiceChannel
 from nextcord.ext import commands
 from model.exception.in_server import InServer
 
@@ -42,6 +42,16 @@ class APIWrapperService:
 
         return self.ctx.message.guild.id
 
+    def get_server_text_channels(self) -> list[TextChannel]:
+        '''Returns text channels of a server.'''
+
+        return self.ctx.message.guild.text_channels
+
+    def get_attachments(self) -> list[Attachment]:
+        '''Returns files attached to the message.'''
+
+        return self.ctx.message.attachments
+
     def get_author_vc(self) -> VoiceChannel:
         '''Returns a reference to the author's voice channel.'''
 
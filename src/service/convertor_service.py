@@ -1,6 +1,14 @@
+from collections import Counter
+
 from model.entity.emote_entity import EmoteEntity
+from model.entity.markov_delta_entity import MarkovDeltaEntity
+from model.entity.markov_model_entity import MarkovModelEntity
 from model.entity.user_entity import UserEntity
 from model.enum.emote_providers import EmoteProviders
+from model.markov.author_markov_grammar import AuthorMarkovGrammar
+from model.markov.markov_delta import MarkovDelta
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
 from model.reaction.online_emote import OnlineEmote
 from model.reaction.emote import Emote
 
@@ -28,3 +36,69 @@ class ConvertorService:
         entity = UserEntity(id)
 
         return entity
+
+    def markov_data_to_entity(
+            self,
+            channel_id: int,
+            grammar: MarkovGrammar,
+            reverse_grammar: MarkovGrammar,
+            sentence_starts: SentenceStarts,
+            newest_message: int,
+            author_grammars: dict[int, AuthorMarkovGrammar]) -> MarkovModelEntity:
+        '''Converts MarkovGrammar with additional arguments to MarkovModelEntity.'''
+
+        entity = MarkovModelEntity(
+            channel_id,
+            grammar.to_dict(),
+            reverse_grammar.to_dict(),
+            sentence_starts.to_dict(),
+            newest_message,
+            { author: author_grammar.to_dict() for author, author_grammar in author_grammars.items() }
+        )
+
+        return entity
+
+    def markov_entity_to_data(
+            self,
+            entity: MarkovModelEntity
+            ) -> tuple[MarkovGrammar, MarkovGrammar, SentenceStarts, int, dict[int, AuthorMarkovGrammar]]:
+        '''Converts MarkovModelEntity to a tuple containing in order: MarkovGrammar, reverse MarkovGrammar,
+        SentenceStarts, the newest learned message, AuthorMarkovGrammar of every author.'''
+
+        grammar = MarkovGrammar.from_dict(entity.grammar)
+        reverse_grammar = MarkovGrammar.from_dict(entity.reverse_grammar)
+        sentence_starts = SentenceStarts.from_dict(entity.sentence_starts)
+        author_grammars = {
+            author: AuthorMarkovGrammar.from_dict(author_grammar, grammar)
+            for author, author_grammar in entity.author_grammars.items()
+        }
+
+        return grammar, reverse_grammar, sentence_starts, entity.newest_message, author_grammars
+
+    def markov_delta_to_entity(self, channel_id: int, delta: MarkovDelta, newest_message: int) -> MarkovDeltaEntity:
+        '''Converts MarkovDelta with additional arguments to MarkovDeltaEntity.'''
+
+        entity = MarkovDeltaEntity(
+            channel_id,
+            dict(delta.transitions),
+            dict(delta.reverse_transitions),
+            dict(delta.sentence_starts),
+            newest_message,
+            { author: dict(transitions) for author, transitions in delta.author_transitions.items() },
+            { author: dict(starts) for author, starts in delta.author_sentence_starts.items() }
+        )
+
+        return entity
+
+    def markov_entity_to_delta(self, entity: MarkovDeltaEntity) -> tuple[MarkovDelta, int]:
+        '''Converts MarkovDeltaEntity to a tuple containing in order: MarkovDelta, the newest message of the chunk.'''
+
+        delta = MarkovDelta(
+            Counter(entity.transitions),
+            Counter(entity.reverse_transitions),
+            Counter(entity.sentence_starts),
+            { author: Counter(transitions) for author, transitions in entity.author_transitions.items() },
+            { author: Counter(starts) for author, starts in entity.author_sentence_starts.items() }
+        )
+
+        return delta, entity.newest_message
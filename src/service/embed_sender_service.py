@@ -1,4 +1,5 @@
 import os
+from typing import BinaryIO
 
 import nextcord
 from nextcord.ext import commands
@@ -31,6 +32,14 @@ class EmbedSenderService:
 
         await ctx.send(content=None, embed=embed)
 
+    async def send_file(self, ctx: commands.Context, message: str, file: BinaryIO, filename: str) -> None:
+        '''Sends an embed indicating a success, with the file attached.'''
+
+        embed = (nextcord.Embed(colour=nextcord.Colour.from_rgb(*Colours.SUCCESS))
+                .add_field(name=EmbedTitles.OK, value=f'**{message}**'))
+
+        await ctx.send(content=None, embed=embed, file=nextcord.File(file, filename))
+
     async def send_help(self, ctx: commands.Context, commands: list[tuple[str, str]]) -> None:
         '''Sends an embed representing a help message.'''
 
@@ -0,0 +1,103 @@
+import asyncio
+import datetime
+from typing import AsyncIterator
+
+from nextcord import Message, Object, TextChannel
+from nextcord.utils import snowflake_time, time_snowflake
+
+from config import Config
+
+
+class HistoryCrawlerService:
+    '''Class responsible for crawling the message history of channels.
+
+    The crawled period is split into time windows bounded by snowflake ids, and the windows are fetched concurrently,
+    as Discord serves a single history request chain one page at a time. Messages are still yielded from the oldest
+    one, so the consumer sees the same order as with a single request chain.
+
+    Windows span at least a minimum period, up to a maximum number of windows, so crawling a short period, like
+    catching up on messages sent since the last learning, takes a single request chain.'''
+
+    def __init__(self, conf: Config) -> None:
+        self.concurrency = conf.markov_crawl_concurrency
+        self.windows = conf.markov_crawl_windows
+        self.min_window_span = datetime.timedelta(hours=conf.markov_crawl_min_window_hours)
+        self.buffer_size = conf.markov_learning_chunk_size
+
+    async def crawl(self, channel: TextChannel, after: int | None) -> AsyncIterator[Message]:
+        '''Yields messages sent in the channel after the message with the specified id (or all messages, if None is
+        specified), from the oldest one.'''
+
+        bounds = self._get_window_bounds(channel, after)
+
+        if self.concurrency <= 1 or len(bounds) <= 1:
+            history = channel.history(oldest_first=True, limit=None, after=Object(after) if after is not None else None)
+
+            async for msg in history:
+                yield msg
+
+            return
+
+        queues: list[asyncio.Queue] = [ asyncio.Queue(self.buffer_size) for _ in bounds ]
+        tasks: list[asyncio.Task] = []
+
+        try:
+            for i in range(len(bounds)):
+                # keep at most concurrency windows fetching, starting from the window being consumed, so a window is
+                # never waiting for a fetch slot taken by later windows with full buffers
+                while len(tasks) < min(i + self.concurrency, len(bounds)):
+                    j = len(tasks)
+                    tasks.append(asyncio.create_task(self._fetch_window(channel, *bounds[j], queues[j])))
+
+                while True:
+                    msg = await queues[i].get()
+
+                    if msg is None:
+                        break
+
+                    if isinstance(msg, Exception):
+                        raise msg
+
+                    yield msg
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _get_window_bounds(self, channel: TextChannel, after: int | None) -> list[tuple[int | None, int | None]]:
+        '''Returns pairs of exclusive snowflake bounds of every window. The last window is not bounded from above, so
+        it includes messages sent while crawling.'''
+
+        start = snowflake_time(after) if after is not None else channel.created_at
+        end = datetime.datetime.now(datetime.timezone.utc)
+        windows = max(min(self.windows, int((end - start) / self.min_window_span)), 1)
+        step = (end - start) / windows
+
+        bounds = [ time_snowflake(start + step * i) for i in range(1, windows) ]
+
+        afters = [ after ] + [ bound - 1 for bound in bounds ]
+        befores = bounds + [ None ]
+
+        return list(zip(afters, befores))
+
+    async def _fetch_window(self, channel: TextChannel, after: int | None, before: int | None, queue: asyncio.Queue) -> None:
+        '''Puts messages of a window into the queue, followed by None, or the exception that stopped fetching.'''
+
+        try:
+            history = channel.history(
+                oldest_first=True,
+                limit=None,
+                after=Object(after) if after is not None else None,
+                before=Object(before) if before is not None else None
+            )
+
+            async for msg in history:
+                await queue.put(msg)
+
+            await queue.put(None)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            await queue.put(e)
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from model.markov.markov_delta import MarkovDelta
+from model.markov.markov_normalizer import MarkovNormalizer
+
+
+class MarkovPreprocessingService:
+    '''Class responsible for the CPU-bound preprocessing of messages learned by the Markov chain model. It holds no
+    state other than its configuration, so it can be sent to and run in worker processes.'''
+
+    def __init__(self, gram_orders: list[int]) -> None:
+        self.gram_orders = sorted(set(gram_orders))
+
+        # orders whose inputs can start a message, from the highest one
+        self.start_orders = [ order for order in reversed(self.gram_orders) if order >= 2 ]
+        self.normalizer = MarkovNormalizer()
+
+    def preprocess(self, runs: list[list[str]], authors: list[int] | None = None) -> MarkovDelta:
+        '''Converts runs of merged messages into changes to the model: occurrences of transitions and sentence
+        starts. If authors of the runs are specified, occurrences are counted for every author as well.'''
+
+        authors = authors if authors is not None else [ None ] * len(runs)
+
+        delta = MarkovDelta()
+
+        for run, author in zip(runs, authors):
+            author_transitions = delta.author_transitions.setdefault(author, Counter()) if author is not None else None
+
+            # 1. filter messages - command invokations, hyperlinks, mentions etc - and tokenize them, along with their
+            # normalized form, once per message - the filtered patterns never span whitespace, and normalization maps
+            # every character separately, so tokens of the merged run are tokens of its messages put together
+            filtered_messages = self.normalizer.filter(run)
+            normalized_messages = self._tokenize(self.normalizer.normalize_batch(filtered_messages))
+
+            tokens = [ token for message in self._tokenize(filtered_messages) for token in message ]
+            normalized_tokens = [ token for message in normalized_messages for token in message ]
+
+            # 2. count sentence starts of the original, unmerged messages - the start is the input of the highest order
+            # n-gram the message contains
+            for message in normalized_messages:
+                order = next((order for order in self.start_orders if len(message) >= order), None)
+
+                if order is None:
+                    continue
+
+                start = ' '.join(message[:order - 1])
+                delta.sentence_starts[start] += 1
+
+                if author is not None:
+                    delta.author_sentence_starts.setdefault(author, Counter())[start] += 1
+
+            # 3. count transitions of n-grams of every order in the merged run, as well as of n-grams with reversed
+            # tokens, for generating to the left - all orders are counted in the same pass over the tokens
+            for order in self.gram_orders:
+                for i in range(len(tokens) - order + 1):
+                    input = ' '.join(normalized_tokens[i:i + order - 1])
+                    output = ' '.join(tokens[i:i + order])
+
+                    delta.transitions[(input, output)] += 1
+
+                    if author_transitions is not None:
+                        author_transitions[(input, output)] += 1
+
+                    reverse_input = ' '.join(reversed(normalized_tokens[i + 1:i + order]))
+                    reverse_output = ' '.join(reversed(tokens[i:i + order]))
+
+                    delta.reverse_transitions[(reverse_input, reverse_output)] += 1
+
+        return delta
+
+    def _tokenize(self, messages: list[str]) -> list[list[str]]:
+        return [ [ m for m in msg.split(' ') if m != '' ] for msg in messages ]
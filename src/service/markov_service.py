@@ -1,168 +1,936 @@
+import asyncio
 import datetime
+import logging
+import multiprocessing
 import random
-import re
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, BinaryIO, Callable
 
-from nextcord import TextChannel, Object, Message
+from nextcord import Member, Message, TextChannel
+from nextcord.utils import snowflake_time
 
+from config import Config
+from model.exception.author_not_learned import AuthorNotLearned
+from model.entity.markov_model_entity import MarkovModelEntity
 from model.exception.channel_not_learned import ChannelNotLearned
+from model.exception.learning_cancelled import LearningCancelled
 from model.exception.no_new_messages import NoNewMessages
 from model.exception.not_enough_data import NotEnoughData
+from model.exception.not_learning import NotLearning
+from model.exception.word_not_learned import WordNotLearned
+from model.markov.author_markov_grammar import AuthorMarkovGrammar
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.learn_job import LearnJob
+from model.markov.markov_batch_generator import MarkovBatchGenerator
+from model.markov.markov_delta import MarkovDelta
+from model.markov.markov_generator import MarkovGenerator
 from model.markov.markov_grammar import MarkovGrammar
+from model.markov.markov_model_archive import MarkovModelArchive
+from model.markov.merged_markov_grammar import MergedMarkovGrammar
+from model.markov.message_merger import MessageMerger
+from model.markov.message_run import MessageRun
+from model.markov.sentence_starts import SentenceStarts
+from repository.i_markov_repository import IMarkovRepository
+from service.convertor_service import ConvertorService
+from service.history_crawler_service import HistoryCrawlerService
+from service.markov_preprocessing_service import MarkovPreprocessingService
 
 
 class MarkovService:
     '''Class responsible for operating the Markov chain model.'''
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            conf: Config,
+            markov_repository: IMarkovRepository,
+            convertor_service: ConvertorService,
+            history_crawler_service: HistoryCrawlerService) -> None:
+        self.markov_repository = markov_repository
+        self.convertor_service = convertor_service
+        self.history_crawler_service = history_crawler_service
         self.grammars: dict[int, MarkovGrammar] = {}
-        self.sentence_starts: dict[int, set[str]] = {}
+        self.reverse_grammars: dict[int, MarkovGrammar | FrozenMarkovGrammar] = {}
+        self.author_grammars: dict[int, dict[int, AuthorMarkovGrammar]] = {}
+        self.sentence_starts: dict[int, SentenceStarts] = {}
         self.newest_message: dict[int, int] = {}
-        self.gram_n = 2
+        self.logged_transitions: dict[int, int] = {}
+        self.restorations: dict[int, asyncio.Task] = {}
+        self.model_sizes: OrderedDict[int, int] = OrderedDict()
+        self.memory_budget = conf.markov_memory_budget
+        self.freeze_threshold = conf.markov_freeze_threshold
+        self.prune_min_count = conf.markov_prune_min_count
+        self.prune_min_input_count = conf.markov_prune_min_input_count
+        self.pruning = self.prune_min_count > 1 or self.prune_min_input_count > 1
+        self.max_row_size = conf.markov_max_row_size
+        self.weighted_sentence_starts = conf.markov_weighted_sentence_starts
+        self.author_models = conf.markov_author_models
+        self.log_compaction_ratio = conf.markov_log_compaction_ratio
+        self.learnings: dict[int, asyncio.Task] = {}
+        self.locks: dict[int, asyncio.Lock] = {}
+        self.learn_jobs: dict[int, LearnJob] = {}
+        self.live_channels: set[int] = set()
+        self.live_mergers: dict[int, MessageMerger] = {}
+        self.live_runs: dict[int, list[MessageRun]] = {}
+        self.live_learning_task: asyncio.Task | None = None
+        self.live_learning_interval = conf.markov_live_learning_interval
+        self.pregenerated: dict[int, deque[str]] = {}
+        self.pregenerations: dict[int, asyncio.Task] = {}
+        self.batch_generators: dict[int, MarkovBatchGenerator] = {}
+        self.pregenerated_messages = conf.markov_pregenerated_messages
+        self.pregeneration_watermark = conf.markov_pregeneration_watermark
+        self.gram_orders = sorted(set(conf.markov_gram_orders))
         self.max_message_length = 500
+        self.learning_chunk_size = conf.markov_learning_chunk_size
+        self.learning_workers = conf.markov_learning_workers
+        self.preprocessing_service = MarkovPreprocessingService(self.gram_orders)
 
-    async def learn(self, channel: TextChannel) -> int:
-        '''Learns the model for a specified channel. Returns bool value indicating success or failure.'''
+        # spawned workers do not inherit the memory of the bot, including the learned models
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.learning_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
 
-        if channel.id in self.newest_message:
-            messages = [ msg async for msg in channel.history(oldest_first=False, limit=None, after=Object(self.newest_message[channel.id])) ]
-        
-        else:
-            messages = [ msg async for msg in channel.history(oldest_first=False, limit=None) ]
+    def start_learning(
+            self,
+            channel: TextChannel,
+            on_finished: Callable,
+            on_failed: Callable) -> LearnJob:
+        '''Starts learning the model for a specified channel in the background. Calls on_finished with the number of
+        learned messages once finished, or on_failed with the exception that stopped learning, which is
+        LearningCancelled if the learning was cancelled. If the bot is already learning from the channel, joins that
+        learning instead, which can be told by the job having more than one listener.'''
 
-        if len(messages) == 0:
-            raise NoNewMessages
+        if channel.id in self.learn_jobs:
+            job = self.learn_jobs[channel.id]
+            job.listeners.append((on_finished, on_failed))
 
-        # 0. merge messages from the same person occuring after each other in a short period of time
-        messages_content = self._merge_messages(messages)
-        
-        self.newest_message[channel.id] = messages[0].id
+            return job
 
-        # 1. filter messages - command invokations, hyperlinks, mentions etc
-        filtered_messages = self._filter_messages(messages_content)
+        job = LearnJob(channel.id, datetime.datetime.now(datetime.timezone.utc), channel.created_at)
+        job.listeners.append((on_finished, on_failed))
+        # the learning is started right away, so it can be cancelled before the job is first run
+        job.task = asyncio.create_task(self._run_learn_job(self._get_learning(channel, job), job))
 
-        # 2. tokenize messages
-        tokenized_messages = [ [ m for m in msg.split(' ') if m != '' ] for msg in filtered_messages ]
+        self.learn_jobs[channel.id] = job
 
-        # 2.1. generate n-grams
-        ngrams = self._generate_ngrams(tokenized_messages)
+        return job
+
+    def get_learn_job(self, channel_id: int) -> LearnJob:
+        '''Returns the learning running in the background for a specified channel. Throws NotLearning exception if
+        there is none.'''
+
+        if channel_id not in self.learn_jobs:
+            raise NotLearning
+
+        return self.learn_jobs[channel_id]
+
+    def cancel_learning(self, channel_id: int) -> None:
+        '''Cancels the learning running in the background for a specified channel. Messages learned so far are kept,
+        and the next learning continues after them. Throws NotLearning exception if there is no such learning.'''
+
+        # a job whose learning is over is only reporting its result
+        if channel_id not in self.learn_jobs or channel_id not in self.learnings:
+            raise NotLearning
+
+        self.learnings[channel_id].cancel()
+
+    async def learn(self, channel: TextChannel, job: LearnJob | None = None) -> int:
+        '''Learns the model for a specified channel. Returns the number of learned messages. Progress of learning is
+        reported in job, if specified.
+
+        The history is consumed as a stream, from the oldest new message, and the model is updated every chunk of
+        messages, so memory usage depends on the size of the chunk rather than on the size of the channel. Chunks are
+        preprocessed in worker processes, so the event loop stays responsive while learning. Every chunk is appended to
+        the log of the model once applied, and the whole model is saved only once the log outgrows it, so learning a
+        few new messages writes only what they changed.
+
+        Concurrent calls for the same channel join the learning in progress and return its result, instead of
+        crawling the history and counting the same messages again. Calls for different channels run in parallel.'''
+
+        # cancellation of a single caller must not cancel the learning other callers wait for
+        return await asyncio.shield(self._get_learning(channel, job))
+
+    def _get_learning(self, channel: TextChannel, job: LearnJob | None) -> asyncio.Task:
+        '''Returns the learning in progress for a channel, starting it if there is none.'''
+
+        if channel.id not in self.learnings:
+            learning = self.learnings[channel.id] = asyncio.create_task(self._learn_exclusively(channel, job))
+            learning.add_done_callback(lambda _: self.learnings.pop(channel.id))
+
+        return self.learnings[channel.id]
+
+    async def _learn_exclusively(self, channel: TextChannel, job: LearnJob | None) -> int:
+        try:
+            async with self._get_lock(channel.id):
+                # restore while holding the lock, so the model cannot be evicted before it is updated
+                await self._restore(channel.id, mutable=True)
+
+                try:
+                    return await self._learn(channel, job)
+
+                except asyncio.CancelledError:
+                    # the chunk being logged may or may not have been appended, so the log is replaced with a snapshot
+                    # of what was learned before the cancellation
+                    if channel.id in self.grammars:
+                        await self._compact(channel.id)
+
+                    raise
+
+        finally:
+            self._schedule_pregeneration(channel.id)
+
+    def learn_live_message(self, message: Message) -> None:
+        '''Buffers a new message sent in a channel for learning. Buffered messages are merged and learned periodically,
+        using the same rules as the learn method.
+
+        Only channels learned since the start of the bot are learned live, so that messages sent while the bot was not
+        running are not skipped.'''
+
+        channel_id = message.channel.id
+
+        # a channel learned while it had no messages has no newest message, so all of its messages are new
+        if channel_id not in self.live_channels or message.id <= self.newest_message.get(channel_id, 0):
+            return
+
+        if channel_id not in self.live_mergers:
+            self.live_mergers[channel_id] = MessageMerger()
+            self.live_runs[channel_id] = []
+
+        run = self.live_mergers[channel_id].push(message)
+
+        if run is not None:
+            self.live_runs[channel_id].append(run)
+
+        if self.live_learning_task is None:
+            self.live_learning_task = asyncio.create_task(self._learn_live_periodically())
+
+    async def _learn(self, channel: TextChannel, job: LearnJob | None) -> int:
+        history = self.history_crawler_service.crawl(channel, self.newest_message.get(channel.id))
+
+        if job is not None and channel.id in self.newest_message:
+            job.learned_from = snowflake_time(self.newest_message[channel.id])
+
+        number_of_messages = 0
+        merger = MessageMerger()
+        chunk: list[MessageRun] = []
+        chunk_size = 0
+        pending: deque[tuple[asyncio.Future, int]] = deque()
+
+        async for msg in history:
+            number_of_messages += 1
+            chunk_size += 1
+
+            if job is not None:
+                job.processed_messages = number_of_messages
+                job.learned_until = msg.created_at
+
+            # 0. merge messages from the same person occuring after each other in a short period of time
+            run = merger.push(msg)
+
+            if run is not None:
+                chunk.append(run)
+
+            if chunk_size >= self.learning_chunk_size and len(chunk) > 0:
+                # 1-4. filter, tokenize, generate n-grams and sentence starts in worker processes, while the next
+                # chunk is being fetched; at most one chunk per worker is pending, to bound memory usage
+                self._submit_chunk(chunk, pending)
+                await self._apply_chunks(channel.id, pending, self.learning_workers)
+
+                chunk = []
+                chunk_size = 0
+
+        # the model is up to date with the channel, so it can be kept up to date by learning live
+        self.live_channels.add(channel.id)
+
+        if number_of_messages == 0:
+            raise NoNewMessages
+
+        chunk.append(merger.flush())
+        self._submit_chunk(chunk, pending)
+        await self._apply_chunks(channel.id, pending, 0)
 
-        # 3. create and save grammar
-        if channel.id not in self.grammars:
-            self.grammars[channel.id] = MarkovGrammar()
-            self.sentence_starts[channel.id] = set()
-        
-        for n in ngrams:
-            for m in n:
-                splitted = m.split(' ')
-
-                input = ' '.join(splitted[:-1])
-                
-                input = self._normalize_input(input)
-                output = m
-
-                self.grammars[channel.id] += [input, output]
-
-        # 4. save sentence start - use original, unmerged messages
-        messages_original_content = [ msg.content for msg in messages ]
-        filtered_original_messages = self._filter_messages(messages_original_content)
-        tokenized_original_messages = [ [ m for m in msg.split(' ') if m != '' ] for msg in filtered_original_messages ]
-        original_ngrams = self._generate_ngrams(tokenized_original_messages)
-
-        for n in original_ngrams:
-            splitted_first_ngram = n[0].split(' ')
-
-            normalized_sentence_start = self._normalize_input(' '.join(splitted_first_ngram[:-1]))
-            self.sentence_starts[channel.id].add(normalized_sentence_start)
-        
         # 5. verify
         # self.grammars[channel.id].print_matrixes()
         # print(self.sentence_starts[channel.id])
 
-        return len(messages)
+        # 6. every chunk was logged, so the model survives restarts of the bot
+        self._account(channel.id)
+
+        return number_of_messages
     
-    async def say(self, channel: TextChannel) -> str:
+    async def say(self, channel: TextChannel, word: str | None = None, author: Member | None = None) -> str:
+        '''Generates a message from the model of a specified channel. If word is specified, the message contains it,
+        and is generated in both directions from it. Throws WordNotLearned exception if the word was not learned.
+
+        If author is specified, the message imitates messages of the author sent in the channel. Throws
+        AuthorNotLearned exception if no messages of the author were learned.'''
+
+        # models of authors reference ids of the mutable model, so the frozen model cannot be used for them
+        await self._restore(channel.id, mutable=author is not None)
+
         if channel.id not in self.grammars:
             raise ChannelNotLearned
 
         if len(self.sentence_starts[channel.id]) == 0:
             raise NotEnoughData
 
+        if author is not None:
+            return self._generate_as(channel.id, author.id, word)
+
+        if word is not None:
+            return self._generate_around(self.grammars[channel.id], self.reverse_grammars.get(channel.id), word)
+
+        # answer from the pool of pregenerated messages if possible, and refill it in the background
+        pool = self.pregenerated.get(channel.id)
+        message = pool.popleft() if pool else self._generate(channel.id)
+
+        if pool is None or len(pool) < self.pregeneration_watermark:
+            self._schedule_pregeneration(channel.id)
+
+        return message
+
+    async def say_merged(self, channels: list[TextChannel], word: str | None = None) -> tuple[str, int]:
+        '''Generates a message from the models of specified channels merged together, such as all channels of a
+        server. Channels which were not learned are skipped. If word is specified, the message contains it. Throws
+        ChannelNotLearned exception if none of the channels was learned, and WordNotLearned exception if the word was
+        not learned from any of them.
+
+        Models which are not in memory are restored only while the models in memory fit in the memory budget, so
+        merging more channels than fit does not evict and restore models on every call. Returns the message, and the
+        number of channels skipped because their models were not restored.'''
+
+        grammars: list[MarkovGrammar | FrozenMarkovGrammar] = []
+        reverse_grammars: list[MarkovGrammar | FrozenMarkovGrammar] = []
+        sentence_starts: list[SentenceStarts] = []
+        skipped = 0
+
+        # models are referenced rather than copied, and the references keep models restored first usable, even if the
+        # following ones evict them - models in memory are merged first, so restoring the others cannot evict them
+        for channel in sorted(channels, key=lambda channel: channel.id not in self.grammars):
+            full = sum(self.model_sizes.values()) >= self.memory_budget
+
+            if channel.id not in self.grammars and full and len(grammars) > 0:
+                skipped += 1
+
+                continue
+
+            await self._restore(channel.id)
+
+            if channel.id not in self.grammars:
+                continue
+
+            grammars.append(self.grammars[channel.id])
+            sentence_starts.append(self.sentence_starts[channel.id])
+
+            if channel.id in self.reverse_grammars:
+                reverse_grammars.append(self.reverse_grammars[channel.id])
+
+        if len(grammars) == 0:
+            raise ChannelNotLearned
+
+        if all(len(starts) == 0 for starts in sentence_starts):
+            raise NotEnoughData
+
+        grammar = MergedMarkovGrammar(grammars)
+
+        if word is not None:
+            return self._generate_around(grammar, MergedMarkovGrammar(reverse_grammars), word), skipped
+
+        # choose the channel proportionally to its starts, so the start is sampled as if the starts were merged as well
+        weights = [ starts.total(self.weighted_sentence_starts) for starts in sentence_starts ]
+        starting = random.choices(sentence_starts, weights)[0].sample(self.weighted_sentence_starts)
+
+        return self._generate_from(grammar, starting), skipped
+
+    async def export_model(self, channel_id: int, file: BinaryIO) -> None:
+        '''Writes the model of a specified channel to a binary file, as a compressed archive which can be imported by
+        another instance of the bot. Throws ChannelNotLearned exception if the channel was not learned.
+
+        The model is converted and the archive is written in other threads, while the model is locked, so the event
+        loop is not blocked, and the model is not updated until it is written.'''
+
+        async with self._get_lock(channel_id):
+            await self._restore(channel_id, mutable=True)
+
+            if channel_id not in self.grammars:
+                raise ChannelNotLearned
+
+            model = await asyncio.to_thread(
+                self.convertor_service.markov_data_to_entity,
+                channel_id,
+                self.grammars[channel_id],
+                self.reverse_grammars[channel_id],
+                self.sentence_starts[channel_id],
+                self.newest_message[channel_id],
+                self.author_grammars.get(channel_id, {})
+            )
+
+            await asyncio.to_thread(MarkovModelArchive.write, model, file)
+
+    async def import_model(self, channel_id: int, file: BinaryIO) -> None:
+        '''Replaces the model of a specified channel with the model read from a binary file written by export_model.
+        Throws InvalidModelArchive exception if the file is not such an archive.
+
+        The imported model may be outdated, so the channel is not learned live until it is learned again, which
+        continues after the newest message of the imported model.'''
+
+        model = await asyncio.to_thread(MarkovModelArchive.read, file, channel_id)
+        data = await asyncio.to_thread(self._convert_model, model)
+
+        async with self._get_lock(channel_id):
+            if channel_id in self.grammars:
+                self._evict(channel_id)
+
+            self._set_model(channel_id, data)
+
+            self.live_channels.discard(channel_id)
+            self.live_mergers.pop(channel_id, None)
+            self.live_runs.pop(channel_id, None)
+
+            # compacting replaces the frozen model of the replaced model, or deletes it if the imported one is small
+            await self._compact(channel_id, model)
+
+            self._account(channel_id)
+
+    def _generate(self, channel_id: int) -> str:
+        '''Generates a message from the model of a channel.'''
+
         # choose a starting ngram
-        starting = random.choice(tuple(self.sentence_starts[channel.id]))
+        starting = self.sentence_starts[channel_id].sample(self.weighted_sentence_starts)
+
+        return self._generate_from(self.grammars[channel_id], starting)
+
+    def _generate_as(self, channel_id: int, author_id: int, word: str | None) -> str:
+        '''Generates a message from the model of an author in a channel, containing the word if specified. Messages
+        are extended to the right only, as authors have no reverse models.'''
+
+        author_grammar = self.author_grammars.get(channel_id, {}).get(author_id)
+
+        if author_grammar is None or len(author_grammar.sentence_starts) == 0:
+            raise AuthorNotLearned
+
+        if word is not None:
+            return self._generate_around(author_grammar, None, word)
+
+        return self._generate_from(author_grammar, author_grammar.sentence_starts.sample(self.weighted_sentence_starts))
+
+    def _generate_from(
+            self,
+            grammar: MarkovGrammar | FrozenMarkovGrammar | MergedMarkovGrammar | AuthorMarkovGrammar,
+            starting: str) -> str:
+        '''Generates a message from the grammar, beginning with the start.'''
 
         # generate a poem
-        generated_message = starting
+        generator = MarkovGenerator(
+            grammar,
+            self.gram_orders,
+            self.max_message_length,
+            self.preprocessing_service.normalizer.normalize
+        )
+
+        return ' '.join(generator.generate(starting))
+
+    def _generate_around(
+            self,
+            grammar: MarkovGrammar | FrozenMarkovGrammar | MergedMarkovGrammar | AuthorMarkovGrammar,
+            reverse_grammar: MarkovGrammar | FrozenMarkovGrammar | MergedMarkovGrammar | None,
+            word: str) -> str:
+        '''Generates a message containing a word from the grammar, extended to the left with the reverse grammar.'''
+
+        token = self.preprocessing_service.normalizer.normalize(word)
+
+        # inputs of the reverse grammar contain the following tokens of words never followed by anything
+        windows = set(grammar.find_inputs(token))
+
+        if reverse_grammar is not None:
+            windows.update(' '.join(reversed(input.split(' '))) for input in reverse_grammar.find_inputs(token))
+
+        if len(windows) == 0:
+            raise WordNotLearned
+
+        generator = MarkovGenerator(
+            grammar,
+            self.gram_orders,
+            self.max_message_length,
+            self.preprocessing_service.normalizer.normalize,
+            reverse_grammar
+        )
+
+        return ' '.join(generator.generate_around(random.choice(tuple(windows))))
+
+    def _schedule_pregeneration(self, channel_id: int) -> None:
+        '''Starts filling the pool of pregenerated messages of a channel in the background, unless it is already being
+        filled.'''
+
+        if self.pregenerated_messages <= 0 or channel_id in self.pregenerations:
+            return
+
+        if channel_id not in self.grammars or len(self.sentence_starts[channel_id]) == 0:
+            return
+
+        pregeneration = self.pregenerations[channel_id] = asyncio.create_task(self._pregenerate(channel_id))
+        pregeneration.add_done_callback(lambda _: self.pregenerations.pop(channel_id))
+
+    async def _pregenerate(self, channel_id: int) -> None:
+        '''Fills the pool of pregenerated messages of a channel. Stops while the model is being updated, as it is
+        refilled once the update finishes.
+
+        Grammars of a single order generate all missing messages at once, in another thread, from a batch generator
+        built once per version of the model. Other grammars generate one message at a time, so other work of the bot
+        waits for the generation of at most a single message.'''
+
+        pool = self.pregenerated.setdefault(channel_id, deque())
+        lock = self._get_lock(channel_id)
+
+        while len(pool) < self.pregenerated_messages:
+            await asyncio.sleep(0)
+
+            if lock.locked() or channel_id not in self.grammars:
+                return
+
+            if len(self.gram_orders) > 1 or not isinstance(self.grammars[channel_id], MarkovGrammar):
+                pool.append(self._generate(channel_id))
+
+                continue
+
+            if channel_id not in self.batch_generators:
+                # the lock keeps the grammar from being updated while it is frozen into the batch generator
+                async with lock:
+                    if channel_id not in self.grammars:
+                        return
+
+                    self.batch_generators[channel_id] = await asyncio.to_thread(
+                        MarkovBatchGenerator,
+                        self.grammars[channel_id],
+                        self.gram_orders[0] - 1,
+                        self.max_message_length,
+                        self.preprocessing_service.normalizer.normalize
+                    )
+
+            generator = self.batch_generators[channel_id]
+            starts = self.sentence_starts[channel_id]
+            missing = self.pregenerated_messages - len(pool)
+            starting = [ starts.sample(self.weighted_sentence_starts) for _ in range(missing) ]
+            messages = await asyncio.to_thread(generator.generate, starting)
+
+            # messages generated from a model updated or evicted meanwhile are outdated
+            if self.batch_generators.get(channel_id) is generator:
+                pool.extend(messages)
+
+    async def _restore(self, channel_id: int, mutable: bool = False) -> None:
+        '''Loads the persisted model of a channel, if the channel was not accessed since the start of the bot or its
+        model was evicted. Concurrent calls for the same channel wait for the same load.
+
+        Frozen models are loaded if available, unless the model is going to be updated, as specified by mutable.'''
+
+        while True:
+            if channel_id not in self.restorations:
+                self.restorations[channel_id] = asyncio.create_task(self._load(channel_id, mutable))
+
+            restoration = self.restorations[channel_id]
+
+            try:
+                await asyncio.shield(restoration)
+
+            except Exception:
+                # let the next call retry a failed load
+                self.restorations.pop(channel_id, None)
+
+                raise
+
+            # loading another model may have evicted this one before this call resumed
+            if self.restorations.get(channel_id) is not restoration:
+                continue
+
+            # a frozen model cannot be updated, so it is replaced with the mutable one
+            if mutable and isinstance(self.grammars.get(channel_id), FrozenMarkovGrammar):
+                self._evict(channel_id)
+
+                continue
+
+            if channel_id in self.model_sizes:
+                self.model_sizes.move_to_end(channel_id)
+
+            return
+
+    async def _load(self, channel_id: int, mutable: bool) -> None:
+        # the model may have been set without being loaded, like an imported one
+        if channel_id in self.grammars:
+            return
+
+        if not mutable and self.freeze_threshold > 0:
+            frozen = await self.markov_repository.get_frozen_grammar(channel_id)
+
+            if frozen is not None and channel_id not in self.grammars:
+                self.grammars[channel_id] = frozen
+                self.sentence_starts[channel_id] = frozen.sentence_starts
+                self.newest_message[channel_id] = frozen.newest_message
+
+                # the reverse grammar is frozen along, so messages containing a word extend to the left as well
+                if frozen.reverse_grammar is not None:
+                    self.reverse_grammars[channel_id] = frozen.reverse_grammar
+
+                self._account(channel_id)
+
+                return
+
+        model = await self.markov_repository.get_model(channel_id)
+        deltas = await self.markov_repository.get_deltas(channel_id)
+
+        if (model is None and len(deltas) == 0) or channel_id in self.grammars:
+            return
+
+        if model is not None:
+            # the snapshot is converted in another thread, as converting a large model takes seconds
+            data = await asyncio.to_thread(self._convert_model, model)
+
+            # the model may have been imported meanwhile, as loading a model to generate from does not lock it
+            if channel_id in self.grammars:
+                return
+
+            self._set_model(channel_id, data)
+
+        self.logged_transitions[channel_id] = 0
+        replayed_until = model.newest_message if model is not None else 0
+
+        # changes are replayed in the order they were learned, so the model is the same as before it was unloaded
+        for delta_entity in deltas:
+            delta, newest_message = self.convertor_service.markov_entity_to_delta(delta_entity)
+
+            # the log may outlive the snapshot containing it, if the bot stopped before the log was deleted
+            if newest_message <= replayed_until:
+                continue
+
+            self._apply_delta(channel_id, delta, newest_message)
+            self.logged_transitions[channel_id] += len(delta.transitions)
+            replayed_until = newest_message
+
+        self._account(channel_id)
+
+    def _convert_model(
+            self,
+            model: MarkovModelEntity
+            ) -> tuple[MarkovGrammar, MarkovGrammar, SentenceStarts, int, dict[int, AuthorMarkovGrammar]]:
+        '''Converts the snapshot of a model to the model of a channel. This does not touch the models of channels, so
+        it is run in another thread.'''
+
+        data = self.convertor_service.markov_entity_to_data(model)
+
+        for grammar in data[:2]:
+            grammar.max_row_size = self.max_row_size
+            grammar.prunable = self.pruning
+
+        return data
+
+    def _set_model(
+            self,
+            channel_id: int,
+            data: tuple[MarkovGrammar, MarkovGrammar, SentenceStarts, int, dict[int, AuthorMarkovGrammar]]) -> None:
+        '''Makes a model converted by _convert_model the model of a channel.'''
+
+        grammar, reverse_grammar, sentence_starts, newest_message, author_grammars = data
+
+        self.grammars[channel_id] = grammar
+        self.reverse_grammars[channel_id] = reverse_grammar
+        self.author_grammars[channel_id] = author_grammars
+        self.sentence_starts[channel_id] = sentence_starts
+        self.newest_message[channel_id] = newest_message
+
+    def _account(self, channel_id: int) -> None:
+        '''Updates the memory taken by the model of a channel, and evicts least recently used models until all models
+        fit in the memory budget.
+
+        Evicted models are persisted already, as every update of a model is saved before the lock of the channel is
+        released, so they are loaded again on the next use. Models of channels being updated are not evicted, and
+        neither is the most recently used model, even if it does not fit in the budget alone.'''
+
+        size = self.grammars[channel_id].memory_size()
+
+        if channel_id in self.reverse_grammars:
+            size += self.reverse_grammars[channel_id].memory_size()
+
+        size += self.sentence_starts[channel_id].memory_size()
+
+        for author_grammar in self.author_grammars.get(channel_id, {}).values():
+            size += author_grammar.memory_size()
+
+        self.model_sizes[channel_id] = size
+        self.model_sizes.move_to_end(channel_id)
+
+        total = sum(self.model_sizes.values())
+
+        for evicted_id in list(self.model_sizes)[:-1]:
+            if total <= self.memory_budget:
+                break
+
+            if self._get_lock(evicted_id).locked():
+                continue
+
+            total -= self.model_sizes[evicted_id]
+            self._evict(evicted_id)
+
+    def _evict(self, channel_id: int) -> None:
+        '''Removes the model of a channel from memory. The newest learned message is kept, as live learning needs it
+        for every new message.'''
+
+        del self.grammars[channel_id]
+        del self.sentence_starts[channel_id]
+        self.reverse_grammars.pop(channel_id, None)
+        self.author_grammars.pop(channel_id, None)
+        self.model_sizes.pop(channel_id, None)
+        self.logged_transitions.pop(channel_id, None)
+        self.restorations.pop(channel_id, None)
+        self.pregenerated.pop(channel_id, None)
+        self.batch_generators.pop(channel_id, None)
+
+        if channel_id in self.pregenerations:
+            self.pregenerations[channel_id].cancel()
+
+        logging.info(f'_evict: evicted model of channel {channel_id}')
+
+    async def _prune(self, channel_id: int) -> None:
+        '''Removes rare transitions and inputs from the model of a channel, along with sentence starts that cannot be
+        continued anymore.
+
+        Pruned copies of the grammars are built in another thread, as the lock of the channel held by every caller
+        keeps the model from being updated meanwhile, and messages are generated from the previous model until the
+        copies replace it.'''
+
+        grammar, reverse_grammar, author_grammars = await asyncio.to_thread(
+            self._get_pruned,
+            self.grammars[channel_id],
+            self.reverse_grammars[channel_id],
+            self.author_grammars.get(channel_id, {})
+        )
+
+        self.grammars[channel_id] = grammar
+        self.reverse_grammars[channel_id] = reverse_grammar
+        self.author_grammars[channel_id] = author_grammars
+
+        starts = self.sentence_starts[channel_id]
+        self.sentence_starts[channel_id] = starts.filter(grammar.input_vocabulary.__contains__)
+
+        if channel_id in self.pregenerated:
+            self.pregenerated[channel_id].clear()
+
+        self.batch_generators.pop(channel_id, None)
+
+    def _get_pruned(
+            self,
+            grammar: MarkovGrammar,
+            reverse_grammar: MarkovGrammar,
+            author_grammars: dict[int, AuthorMarkovGrammar]
+            ) -> tuple[MarkovGrammar, MarkovGrammar, dict[int, AuthorMarkovGrammar]]:
+        '''Returns pruned copies of the grammars of a channel. This only reads the grammars, so it is run in another
+        thread.'''
+
+        grammar, input_ids, token_ids, link_ids = grammar.pruned(self.prune_min_count, self.prune_min_input_count)
+        reverse_grammar, _, _, _ = reverse_grammar.pruned(self.prune_min_count, self.prune_min_input_count)
+
+        author_grammars = {
+            author_id: author_grammar.remapped(grammar, input_ids, token_ids, link_ids)
+            for author_id, author_grammar in author_grammars.items()
+        }
+
+        return grammar, reverse_grammar, author_grammars
+
+    async def _compact_if_outgrown(self, channel_id: int) -> None:
+        '''Compacts the log of a channel, if it contains at least as many transitions as the compaction ratio of the
+        transitions of the model, so loading the model replays a log proportional to the model at most.'''
+
+        if self.logged_transitions[channel_id] >= self.log_compaction_ratio * len(self.grammars[channel_id]):
+            await self._compact(channel_id)
+
+    async def _compact(self, channel_id: int, model: MarkovModelEntity | None = None) -> None:
+        '''Persists the whole model of a channel, replacing its previous snapshot, and deletes its log, which the new
+        snapshot contains.
+
+        Rare transitions and inputs are pruned first, as removed transitions cannot be logged. Pruning spares
+        transitions learned since the previous compaction, so a transition is only removed if it is still rare once
+        the model has grown at least as much again, however small the learnings adding its occurrences are.
+
+        The model is converted and serialized in another thread, as the lock of the channel held by every caller keeps
+        it from being updated meanwhile. The snapshot the model was just set from is persisted as is if it is given,
+        so an imported model is neither pruned nor converted again.'''
+
+        # forget transitions and inputs too rare to matter, as they take most of the memory of large models
+        if model is None and self.pruning:
+            await self._prune(channel_id)
+
+        if model is None:
+            model = await asyncio.to_thread(
+                self.convertor_service.markov_data_to_entity,
+                channel_id,
+                self.grammars[channel_id],
+                self.reverse_grammars[channel_id],
+                self.sentence_starts[channel_id],
+                self.newest_message[channel_id],
+                self.author_grammars.get(channel_id, {})
+            )
+
+        await self.markov_repository.save_model(model)
+
+        # large models are frozen as well, so they are served from memory-mapped files once evicted or after a restart
+        if self.freeze_threshold > 0 and len(self.grammars[channel_id]) >= self.freeze_threshold:
+            await self.markov_repository.save_frozen_grammar(
+                channel_id,
+                self.grammars[channel_id],
+                self.reverse_grammars[channel_id],
+                self.sentence_starts[channel_id],
+                self.newest_message[channel_id]
+            )
+
+        # the model may not be large anymore, after pruning or raising the threshold, and its outdated frozen model
+        # must not be loaded
+        else:
+            await self.markov_repository.delete_frozen_grammar(channel_id)
+
+        # the log is deleted last, so a snapshot interrupted by a crash leaves the previous snapshot and the whole log
+        await self.markov_repository.delete_deltas(channel_id)
+
+        self.logged_transitions[channel_id] = 0
+
+    async def _run_learn_job(self, learning: asyncio.Task, job: LearnJob) -> None:
+        '''Waits for learning running in the background and reports its result to every listener of the job.'''
 
         try:
-            while len(generated_message) < self.max_message_length:
-                input = ' '.join(generated_message.split(' ')[1 - self.gram_n:])
-                
-                input = self._normalize_input(input)
-                output = self.grammars[channel.id][input]
-
-                generated_message = f'{" ".join(generated_message.split(" ")[:1 - self.gram_n])} {output}'
-        
+            number_of_messages = await asyncio.shield(learning)
+
+        except asyncio.CancelledError:
+            await self._report(job, lambda _, on_failed: on_failed(LearningCancelled()))
+
+        except Exception as e:
+            await self._report(job, lambda _, on_failed: on_failed(e))
+
+        else:
+            await self._report(job, lambda on_finished, _: on_finished(number_of_messages))
+
         finally:
-            return generated_message
-    
-    def _merge_messages(self, messages: list[Message]) -> list[str]:
-        messages_content = []
-        last_message = messages[-1]
-        message_content = messages[-1].content
+            del self.learn_jobs[job.channel_id]
+
+    async def _report(self, job: LearnJob, report: Callable[[Callable, Callable], Awaitable[None]]) -> None:
+        '''Reports the result of a job to every listener, given the pair of its callbacks. A listener failing, like
+        when its reply cannot be sent, does not keep the result from the remaining listeners.'''
+
+        for on_finished, on_failed in job.listeners:
+            try:
+                await report(on_finished, on_failed)
+
+            except Exception:
+                logging.exception(f'_report: failed to report the result of learning channel {job.channel_id}')
+
+    async def _learn_live_periodically(self) -> None:
+        '''Learns buffered live messages every interval.'''
+
+        while True:
+            await asyncio.sleep(self.live_learning_interval)
 
-        for msg in messages[-2::-1]:
-            # check if same author and created at the same time
-            if msg.author != last_message.author or msg.created_at - last_message.created_at > datetime.timedelta(minutes=5):
-                messages_content.append(message_content)
+            try:
+                await self._learn_live_runs()
 
-                last_message = msg
-                message_content = msg.content
+            except Exception:
+                logging.exception('_learn_live_periodically: failed to learn live messages')
 
+    async def _learn_live_runs(self) -> None:
+        '''Learns buffered runs of live messages, including open runs no new message can be merged into anymore.'''
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        for channel_id, merger in list(self.live_mergers.items()):
+            if merger.is_closed(now):
+                self.live_runs[channel_id].append(merger.flush())
+
+        for channel_id, runs in list(self.live_runs.items()):
+            if len(runs) == 0:
                 continue
-            
-            # else merge messages
-            message_content = f'{message_content} {msg.content}'
-        
-        messages_content.append(message_content)
 
-        return messages_content
+            self.live_runs[channel_id] = []
 
-    def _filter_messages(self, messages: list[str]) -> list[str]:
-        # remove hyperlinks
-        messages = [ re.sub(r'(?:https?|ftp)\:\/\/.*?(?:$|\s)', '', msg)      for msg in messages ]
+            async with self._get_lock(channel_id):
+                await self._restore(channel_id, mutable=True)
 
-        # remove command invokations, mentions, tags etc
-        messages = [ re.sub(r'(?:^|\s)[!<$%^&*\-\+=\?\/\.\,][^\s]+', '', msg) for msg in messages ]
+                # skip messages already learned by the learn method while the runs were buffered
+                runs = [ run for run in runs if run.newest_message > self.newest_message.get(channel_id, 0) ]
 
-        return messages
+                if len(runs) == 0:
+                    continue
 
+                pending: deque[tuple[asyncio.Future, int]] = deque()
+                self._submit_chunk(runs, pending)
+                await self._apply_chunks(channel_id, pending, 0)
+                self._account(channel_id)
 
-    def _generate_ngrams(self, tokenized_messages: list[list[str]]) -> list[list[str]]:
-        ngrams = [ zip(*[ tokenized[i:] for i in range(self.gram_n) ]) for tokenized in tokenized_messages ]
-        ngrams = [ [' '.join(ng) for ng in ngram] for ngram in ngrams ]
-        ngrams = [ ngram for ngram in ngrams if len(ngram) != 0 ]
+            self._schedule_pregeneration(channel_id)
 
-        return ngrams
+    def _get_lock(self, channel_id: int) -> asyncio.Lock:
+        '''Returns the lock guarding updates of the model of a channel.'''
 
+        if channel_id not in self.locks:
+            self.locks[channel_id] = asyncio.Lock()
 
-    def _normalize_input(self, input: str) -> str:
-        input = input.lower()
+        return self.locks[channel_id]
 
-        conversion_dict = {
-            'ą': 'a',
-            'ć': 'c',
-            'ę': 'e',
-            'ł': 'l',
-            'ń': 'n',
-            'ó': 'o',
-            'ś': 's',
-            'ź': 'z',
-            'ż': 'z'
-        }
+    def _submit_chunk(self, runs: list[MessageRun], pending: deque[tuple[asyncio.Future, int]]) -> None:
+        '''Starts preprocessing a chunk of merged messages in a worker process.'''
+
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            self.preprocessing_service.preprocess,
+            [ run.contents for run in runs ],
+            [ run.author_id for run in runs ] if self.author_models else None
+        )
+
+        pending.append((future, runs[-1].newest_message))
+
+    async def _apply_chunks(self, channel_id: int, pending: deque[tuple[asyncio.Future, int]], limit: int) -> None:
+        '''Waits for preprocessed chunks, in the order they were submitted, until at most limit chunks are pending,
+        applies them to the model of a channel, and appends them to its log, which is compacted once it outgrows the
+        model.'''
+
+        while len(pending) > limit:
+            future, newest_message = pending.popleft()
+            delta: MarkovDelta = await future
+
+            self._apply_delta(channel_id, delta, newest_message)
+
+            # appending the chunk costs time proportional to the chunk, however large the model is
+            await self.markov_repository.append_delta(
+                self.convertor_service.markov_delta_to_entity(channel_id, delta, newest_message)
+            )
+
+            self.logged_transitions[channel_id] = self.logged_transitions.get(channel_id, 0) + len(delta.transitions)
+
+            # compacting while a long learning is running bounds its log, and lets it be pruned as it grows
+            await self._compact_if_outgrown(channel_id)
+
+    def _apply_delta(self, channel_id: int, delta: MarkovDelta, newest_message: int) -> None:
+        '''Applies changes learned from a chunk of messages to the model of a channel.'''
+
+        if channel_id not in self.grammars:
+            self.grammars[channel_id] = MarkovGrammar(max_row_size=self.max_row_size, prunable=self.pruning)
+            self.reverse_grammars[channel_id] = MarkovGrammar(max_row_size=self.max_row_size, prunable=self.pruning)
+            self.sentence_starts[channel_id] = SentenceStarts()
+
+        self.grammars[channel_id].update(delta.transitions)
+        self.reverse_grammars[channel_id].update(delta.reverse_transitions)
+        self.sentence_starts[channel_id].update(delta.sentence_starts)
+
+        # transitions of authors reference ids of transitions of the channel, so they are added after them
+        author_grammars = self.author_grammars.setdefault(channel_id, {})
+
+        for author_id, transitions in delta.author_transitions.items():
+            if author_id not in author_grammars:
+                author_grammars[author_id] = AuthorMarkovGrammar(self.grammars[channel_id])
+
+            author_grammars[author_id].update(transitions)
+            author_grammars[author_id].sentence_starts.update(delta.author_sentence_starts.get(author_id, {}))
 
-        for k, v in conversion_dict.items():
-            input = re.sub(rf'{k}', v, input)
+        # messages generated from the outdated model are not served anymore
+        if channel_id in self.pregenerated:
+            self.pregenerated[channel_id].clear()
 
-        input = re.sub(r'[^a-zA-Z0-9\s]', '@', input)
+        self.batch_generators.pop(channel_id, None)
 
-        return input
+        # the model contains the chunk now, so the next learning can start after it
+        self.newest_message[channel_id] = newest_message
@@ -0,0 +1,78 @@
+import random
+from collections import Counter
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.author_markov_grammar import AuthorMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.author_markov_grammar'
+
+
+@tested_module(TEST_MODULE)
+class AuthorMarkovGrammarUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.grammar = MarkovGrammar()
+        self.obj = AuthorMarkovGrammar(self.grammar)
+
+    def learn(self, transitions: dict[tuple[str, str], int]) -> None:
+        self.grammar.update(transitions)
+        self.obj.update(transitions)
+
+    def test_getitem_throws_exception_if_input_not_learned_from_author(self) -> None:
+        self.grammar += ['a', 'a b']
+        self.learn({ ('b', 'b c'): 1 })
+
+        with self.assertRaises(InputNotPresent):
+            self.obj['a']
+
+    def test_getitem_returns_only_outputs_learned_from_author(self) -> None:
+        self.grammar.update({ ('a', 'a b'): 100 })
+        self.learn({ ('a', 'a c'): 1 })
+
+        ret = { self.obj['a'] for _ in range(50) }
+
+        self.assertSetEqual(ret, { 'a c' })
+
+    def test_getitem_samples_outputs_proportionally_to_occurrences_of_author(self) -> None:
+        self.learn({ ('a', 'a b'): 1, ('a', 'a c'): 1 })
+        self.learn({ ('a', 'a c'): 2 })
+        random.seed(0)
+
+        ret = Counter(self.obj['a'] for _ in range(4000))
+
+        self.assertAlmostEqual(ret['a c'] / 4000, 0.75, delta=0.03)
+
+    def test_update_merges_buffered_transitions(self) -> None:
+        for i in range(100):
+            self.learn({ (f'{i}', f'{i} x'): 1, ('a', 'a b'): 1 })
+
+        self.assertEqual(len(self.obj), 101)
+        self.assertEqual(self.obj.counts[self.obj.keys.index(self.grammar.get_transition('a', 'a b')[1])], 100)
+
+    def test_find_inputs_returns_inputs_learned_from_author(self) -> None:
+        self.grammar += ['a b', 'a b c']
+        self.learn({ ('b c', 'b c d'): 1 })
+
+        ret = self.obj.find_inputs('b')
+
+        self.assertListEqual(ret, ['b c'])
+
+    def test_remap_follows_ids_reassigned_by_pruning(self) -> None:
+        self.grammar.update({ ('x', 'x y'): 1 })
+        self.learn({ ('a', 'a b'): 2, ('a', 'a c'): 1 })
+
+        self.obj.remap(*self.grammar.prune(2, 1))
+
+        self.assertEqual(len(self.obj), 1)
+        self.assertEqual(self.obj['a'], 'a b')
+
+    def test_grammar_is_equal_after_restoring_from_dict(self) -> None:
+        self.learn({ ('a', 'a b'): 2 })
+        self.obj.sentence_starts.add('a')
+
+        ret = AuthorMarkovGrammar.from_dict(self.obj.to_dict(), self.grammar)
+
+        self.assertEqual(ret['a'], 'a b')
+        self.assertListEqual(list(ret.sentence_starts), ['a'])
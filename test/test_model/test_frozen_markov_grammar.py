@@ -0,0 +1,89 @@
+import random
+from array import array
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.frozen_markov_grammar'
+
+
+@tested_module(TEST_MODULE)
+class FrozenMarkovGrammarUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.grammar = MarkovGrammar()
+
+    def test_getitem_throws_exception_if_input_not_present(self) -> None:
+        self.grammar += ['a', 'a b']
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(['a']), 1))
+
+        with self.assertRaises(InputNotPresent):
+            obj['b']
+
+    def test_getitem_returns_the_same_outputs_as_grammar(self) -> None:
+        words = [ 'Ala', 'ma', 'kota', 'żółw', 'Łódź', 'c++', 'KOT' ]
+        rng = random.Random(0)
+
+        for _ in range(500):
+            first, second = rng.choice(words), rng.choice(words)
+            self.grammar += [ first.lower(), f'{first} {second}' ]
+
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(), 1))
+
+        for word in words:
+            random.seed(0)
+            expected = [ self.grammar[word.lower()] for _ in range(50) ]
+
+            random.seed(0)
+            ret = [ obj[word.lower()] for _ in range(50) ]
+
+            self.assertListEqual(ret, expected)
+
+    def test_getitem_returns_outputs_of_several_tokens(self) -> None:
+        self.grammar += ['a', 'b']
+        self.grammar += ['a b', 'A b c']
+        self.grammar += ['a b c', 'A b c d']
+
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(), 1))
+
+        self.assertListEqual([ obj['a'], obj['a b'], obj['a b c'] ], ['b', 'A b c', 'A b c d'])
+
+    def test_frozen_grammar_contains_the_rest_of_the_model(self) -> None:
+        self.grammar += ['a', 'a b']
+
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(['a', 'żółw'], array('I', [1, 3])), 123))
+
+        self.assertListEqual(list(obj.sentence_starts), ['a', 'żółw'])
+        self.assertListEqual(list(obj.sentence_starts.counts), [1, 3])
+        self.assertEqual(obj.newest_message, 123)
+
+    def test_find_inputs_returns_inputs_containing_the_token(self) -> None:
+        self.grammar += ['a b', 'a b c']
+        self.grammar += ['b c', 'b c d']
+        self.grammar += ['c d', 'c d e']
+
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(), 1))
+
+        self.assertListEqual(obj.find_inputs('c'), ['b c', 'c d'])
+        self.assertListEqual(obj.find_inputs('x'), [])
+
+    def test_frozen_grammar_contains_the_reverse_grammar(self) -> None:
+        self.grammar += ['a', 'a b']
+        reverse_grammar = MarkovGrammar()
+        reverse_grammar += ['b', 'b a']
+
+        obj = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(), 1, reverse_grammar))
+
+        self.assertEqual(obj.reverse_grammar['b'], 'b a')
+        self.assertListEqual(obj.reverse_grammar.find_inputs('b'), ['b'])
+        self.assertIsNone(obj.reverse_grammar.reverse_grammar)
+
+    def test_is_compatible_rejects_other_buffers(self) -> None:
+        frozen = FrozenMarkovGrammar.freeze(self.grammar, SentenceStarts(), 1)
+
+        self.assertTrue(FrozenMarkovGrammar.is_compatible(frozen))
+        self.assertFalse(FrozenMarkovGrammar.is_compatible(b'\x80\x05' + frozen))
+        self.assertFalse(FrozenMarkovGrammar.is_compatible(b''))
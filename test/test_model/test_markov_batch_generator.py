@@ -0,0 +1,94 @@
+import random
+from collections import Counter
+
+from model.markov.markov_batch_generator import MarkovBatchGenerator
+from model.markov.markov_generator import MarkovGenerator
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.markov_normalizer import MarkovNormalizer
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.markov_batch_generator'
+
+
+@tested_module(TEST_MODULE)
+class MarkovBatchGeneratorUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.grammar = MarkovGrammar()
+        self.normalize = MarkovNormalizer().normalize
+
+    def test_generate_returns_start_if_input_not_present(self) -> None:
+        self.grammar += ['ma', 'ma kota']
+        obj = MarkovBatchGenerator(self.grammar, 1, 500, self.normalize)
+
+        ret = obj.generate(['ala'])
+
+        self.assertListEqual(ret, ['ala'])
+
+    def test_generate_replaces_window_with_output(self) -> None:
+        self.grammar += ['ala', 'Ala ma']
+        self.grammar += ['ma', 'MA kota']
+        obj = MarkovBatchGenerator(self.grammar, 1, 500, self.normalize)
+
+        ret = obj.generate(['ala'])
+
+        self.assertListEqual(ret, ['Ala MA kota'])
+
+    def test_generate_returns_message_for_every_start(self) -> None:
+        self.grammar += ['ala', 'ala ma']
+        self.grammar += ['ma', 'ma kota']
+        self.grammar += ['psa', 'psa i']
+        obj = MarkovBatchGenerator(self.grammar, 1, 500, self.normalize)
+
+        ret = obj.generate(['ala', 'ma', 'psa', 'kot', 'ala'])
+
+        self.assertListEqual(ret, ['ala ma kota', 'ma kota', 'psa i', 'kot', 'ala ma kota'])
+
+    def test_generate_supports_higher_orders(self) -> None:
+        self.grammar += ['ala ma', 'Ala ma kota']
+        self.grammar += ['ma kota', 'ma kota i']
+        obj = MarkovBatchGenerator(self.grammar, 2, 500, self.normalize)
+
+        ret = obj.generate(['ala ma'])
+
+        self.assertListEqual(ret, ['Ala ma kota i'])
+
+    def test_generate_keeps_tokens_of_start_before_window(self) -> None:
+        self.grammar += ['ma', 'MA kota']
+        obj = MarkovBatchGenerator(self.grammar, 1, 500, self.normalize)
+
+        ret = obj.generate(['Ala ma', 'ala'])
+
+        self.assertListEqual(ret, ['Ala MA kota', 'ala'])
+
+    def test_generate_stops_at_max_length(self) -> None:
+        self.grammar += ['a', 'a a']
+        obj = MarkovBatchGenerator(self.grammar, 1, 10, self.normalize)
+
+        ret = obj.generate(['a'])
+
+        self.assertEqual(ret, ['a a a a a a'])
+
+    def test_generate_returns_the_same_messages_as_generator_for_deterministic_grammar(self) -> None:
+        words = [ 'Ala', 'ma', 'kota', 'żółw', 'Łódź', 'c++' ]
+
+        for first, second in zip(words, words[1:] + words[:1]):
+            self.grammar += [ self.normalize(first), f'{first} {second}' ]
+
+        obj = MarkovBatchGenerator(self.grammar, 1, 50, self.normalize)
+        generator = MarkovGenerator(self.grammar, [2], 50, self.normalize)
+
+        ret = obj.generate(words)
+
+        self.assertListEqual(ret, [ ' '.join(generator.generate(word)) for word in words ])
+
+    def test_generate_samples_outputs_proportionally_to_occurrences(self) -> None:
+        self.grammar += ['a', 'a b']
+        self.grammar.update({ ('a', 'a c'): 3 })
+        obj = MarkovBatchGenerator(self.grammar, 1, 500, self.normalize)
+        random.seed(0)
+
+        ret = Counter(obj.generate(['a'] * 4000))
+
+        self.assertSetEqual(set(ret), { 'a b', 'a c' })
+        self.assertAlmostEqual(ret['a c'] / 4000, 0.75, delta=0.03)
@@ -0,0 +1,111 @@
+import random
+
+from model.markov.markov_generator import MarkovGenerator
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.markov_normalizer import MarkovNormalizer
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.markov_generator'
+
+
+def generate_by_rebuilding(grammar: MarkovGrammar, gram_n: int, max_length: int, start: str) -> str:
+    '''Generates a message the way it was generated before MarkovGenerator, rebuilding the message on every step.'''
+
+    normalize = MarkovNormalizer().normalize
+    generated_message = start
+
+    try:
+        while len(generated_message) < max_length:
+            input = normalize(' '.join(generated_message.split(' ')[1 - gram_n:]))
+            output = grammar[input]
+
+            generated_message = f'{" ".join(generated_message.split(" ")[:1 - gram_n])} {output}'
+
+    finally:
+        return generated_message
+
+
+@tested_module(TEST_MODULE)
+class MarkovGeneratorUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.grammar = MarkovGrammar()
+        self.obj = MarkovGenerator(self.grammar, [2], 500, MarkovNormalizer().normalize)
+
+    def test_generate_yields_start_if_input_not_present(self) -> None:
+        ret = list(self.obj.generate('ala'))
+
+        self.assertListEqual(ret, ['ala'])
+
+    def test_generate_replaces_window_with_output(self) -> None:
+        self.grammar += ['ala', 'Ala ma']
+        self.grammar += ['ma', 'MA kota']
+
+        ret = list(self.obj.generate('ala'))
+
+        self.assertListEqual(ret, ['Ala', 'MA', 'kota'])
+
+    def test_generate_backs_off_to_lower_order_if_window_not_present(self) -> None:
+        self.grammar += ['ala ma', 'Ala ma kota']
+        self.grammar += ['kota', 'kota i']
+        obj = MarkovGenerator(self.grammar, [2, 3], 500, MarkovNormalizer().normalize)
+
+        ret = list(obj.generate('ala ma'))
+
+        self.assertListEqual(ret, ['Ala', 'ma', 'kota', 'i'])
+
+    def test_generate_prefers_the_highest_order(self) -> None:
+        self.grammar += ['ala ma', 'Ala ma kota']
+        self.grammar += ['ma', 'ma psa']
+        obj = MarkovGenerator(self.grammar, [2, 3], 500, MarkovNormalizer().normalize)
+
+        ret = list(obj.generate('ala ma'))
+
+        self.assertListEqual(ret, ['Ala', 'ma', 'kota'])
+
+    def test_generate_stops_at_maximum_length(self) -> None:
+        self.grammar += ['a', 'a a']
+
+        ret = ' '.join(self.obj.generate('a'))
+
+        self.assertEqual(len(ret), 499)
+
+    def test_generate_returns_the_same_message_as_rebuilding_it(self) -> None:
+        words = [ 'Ala', 'ma', 'kota', 'żółw', 'Łódź', 'c++', 'KOT' ]
+        rng = random.Random(0)
+
+        for _ in range(500):
+            first, second = rng.choice(words), rng.choice(words)
+            self.grammar += [ self.obj.normalize(first), f'{first} {second}' ]
+
+        for seed in range(20):
+            for max_length in [ 1, 10, 100, 500 ]:
+                start = self.obj.normalize(rng.choice(words))
+                self.obj.max_length = max_length
+
+                random.seed(seed)
+                expected = generate_by_rebuilding(self.grammar, 2, max_length, start)
+
+                random.seed(seed)
+                ret = ' '.join(self.obj.generate(start))
+
+                self.assertEqual(ret, expected.strip())
+
+    def test_generate_around_extends_window_in_both_directions(self) -> None:
+        reverse_grammar = MarkovGrammar()
+        reverse_grammar += ['ma', 'ma Ala']
+        self.grammar += ['ma', 'ma kota']
+        obj = MarkovGenerator(self.grammar, [2], 500, MarkovNormalizer().normalize, reverse_grammar)
+
+        ret = obj.generate_around('ma')
+
+        self.assertListEqual(ret, ['Ala', 'ma', 'kota'])
+
+    def test_generate_around_keeps_original_window_if_it_cannot_be_extended(self) -> None:
+        reverse_grammar = MarkovGrammar()
+        reverse_grammar += ['ma', 'MA Ala']
+        obj = MarkovGenerator(self.grammar, [2], 500, MarkovNormalizer().normalize, reverse_grammar)
+
+        ret = obj.generate_around('ma')
+
+        self.assertListEqual(ret, ['Ala', 'MA'])
@@ -0,0 +1,231 @@
+import sys
+
+from model.exception.bad_operand import BadOperand
+from model.exception.input_not_present import InputNotPresent
+from model.markov.markov_grammar import MarkovGrammar
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.markov_grammar'
+
+
+@tested_module(TEST_MODULE)
+class MarkovGrammarUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.obj = MarkovGrammar()
+
+    def test_iadd_throws_exception_if_operand_is_not_a_pair(self) -> None:
+        with self.assertRaises(BadOperand):
+            self.obj += ['a']
+
+    def test_getitem_throws_exception_if_input_not_present(self) -> None:
+        self.obj += ['a', 'a b']
+
+        with self.assertRaises(InputNotPresent):
+            self.obj['b']
+
+    def test_getitem_returns_output_of_the_input(self) -> None:
+        self.obj += ['a', 'A b']
+
+        self.assertEqual(self.obj['a'], 'A b')
+
+    def test_getitem_returns_outputs_only_of_the_input(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+        self.obj += ['b', 'b a']
+
+        outputs = { self.obj['a'] for _ in range(100) }
+
+        self.assertSetEqual(outputs, { 'a b', 'a c' })
+
+    def test_getitem_samples_outputs_proportionally_to_occurrences(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+        self.obj += ['a', 'a c']
+        self.obj += ['a', 'a c']
+        random_mock = self.patch('random')
+        outputs = []
+
+        for drawn in range(4):
+            random_mock.randrange.return_value = drawn
+            outputs.append(self.obj['a'])
+
+        random_mock.randrange.assert_called_with(4)
+        self.assertListEqual(outputs, ['a b', 'a c', 'a c', 'a c'])
+
+    def test_getitem_samples_outputs_added_after_previous_sampling(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj['a']
+        self.obj += ['a', 'a c']
+        random_mock = self.patch('random')
+        random_mock.randrange.return_value = 1
+
+        ret = self.obj['a']
+
+        random_mock.randrange.assert_called_with(2)
+        self.assertEqual(ret, 'a c')
+
+    def test_iadd_interns_repeated_tokens(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['b', 'b a']
+
+        self.assertListEqual(self.obj.vocabulary.tokens, ['a', 'b'])
+
+    def test_grammar_is_equal_after_restoring_from_dict(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a b']
+        self.obj += ['b', 'b c']
+
+        restored = MarkovGrammar.from_dict(self.obj.to_dict())
+        restored += ['a', 'a b']
+
+        self.assertEqual(restored['b'], 'b c')
+        self.assertListEqual([ list(counts) for counts in restored.row_counts ], [[3], [1]])
+
+    def test_get_output_returns_outputs_by_position_among_occurrences(self) -> None:
+        self.obj.update({ ('a', 'a b'): 2, ('a', 'a c'): 1 })
+
+        ret = [ self.obj.get_output('a', position) for position in range(self.obj.get_occurrences('a')) ]
+
+        self.assertListEqual(ret, ['a b', 'a b', 'a c'])
+        self.assertEqual(self.obj.get_occurrences('b'), 0)
+
+    def test_outputs_of_several_tokens_store_only_single_tokens_as_strings(self) -> None:
+        self.obj += ['a b', 'A b c']
+        self.obj += ['b c', 'b c d']
+
+        restored = MarkovGrammar.from_dict(self.obj.to_dict())
+
+        self.assertListEqual(self.obj.vocabulary.tokens, ['A', 'b', 'c', 'd'])
+        self.assertEqual(restored['a b'], 'A b c')
+        self.assertEqual(restored['b c'], 'b c d')
+
+    def test_find_inputs_returns_inputs_containing_the_token(self) -> None:
+        self.obj += ['a b', 'a b c']
+        self.obj += ['b c', 'b c d']
+        self.obj += ['c d', 'c d e']
+
+        ret = self.obj.find_inputs('c')
+
+        self.assertListEqual(ret, ['b c', 'c d'])
+
+    def test_find_inputs_returns_inputs_of_restored_grammar(self) -> None:
+        self.obj += ['a b', 'a b c']
+        self.obj += ['b c', 'b c d']
+
+        ret = MarkovGrammar.from_dict(self.obj.to_dict()).find_inputs('b')
+
+        self.assertListEqual(ret, ['a b', 'b c'])
+
+    def test_find_inputs_returns_inputs_of_pruned_grammar(self) -> None:
+        self.obj += ['a b', 'a b c']
+        self.obj += ['b c', 'b c d']
+        self.obj += ['b c', 'b c d']
+
+        self.obj.prune(2, 1)
+
+        self.assertListEqual(self.obj.find_inputs('b'), ['b c'])
+
+    def test_prune_removes_rare_transitions(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+
+        self.obj.prune(2, 1)
+
+        self.assertEqual(len(self.obj), 1)
+        self.assertEqual(self.obj['a'], 'a b')
+        self.assertListEqual(self.obj.vocabulary.tokens, ['a', 'b'])
+
+    def test_pruned_returns_pruned_copy_leaving_grammar_unchanged(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+
+        ret, _, _, _ = self.obj.pruned(2, 1)
+
+        self.assertEqual(len(ret), 1)
+        self.assertEqual(ret['a'], 'a b')
+        self.assertEqual(len(self.obj), 2)
+        self.assertListEqual(self.obj.vocabulary.tokens, ['a', 'b', 'c'])
+
+    def test_prune_removes_rare_inputs(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+        self.obj += ['b', 'b c']
+
+        self.obj.prune(1, 2)
+
+        self.assertListEqual(self.obj.input_vocabulary.tokens, ['a'])
+
+        with self.assertRaises(InputNotPresent):
+            self.obj['b']
+
+    def test_prune_keeps_transitions_added_since_the_last_pruning(self) -> None:
+        self.obj.prunable = True
+        self.obj += ['a', 'a b']
+        self.obj.prune(2, 2)
+        self.obj += ['a', 'a c']
+
+        self.obj.prune(2, 2)
+
+        self.assertEqual(self.obj['a'], 'a c')
+        self.assertEqual(len(self.obj), 1)
+
+    def test_prune_keeps_grammar_updatable(self) -> None:
+        self.obj += ['a', 'a b']
+        self.obj += ['b', 'b c']
+        self.obj += ['b', 'b c']
+
+        self.obj.prune(2, 1)
+        self.obj += ['c', 'c a']
+        self.obj += ['b', 'b c']
+
+        self.assertEqual(self.obj['c'], 'c a')
+        self.assertListEqual([ list(counts) for counts in self.obj.row_counts ], [[3], [1]])
+
+    def test_iadd_replaces_least_occurring_transition_of_full_row(self) -> None:
+        self.obj = MarkovGrammar(max_row_size=2)
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a c']
+
+        self.obj += ['a', 'a d']
+
+        outputs = { self.obj['a'] for _ in range(100) }
+        self.assertSetEqual(outputs, { 'a b', 'a d' })
+        self.assertListEqual(list(self.obj.row_counts[0]), [2, 2])
+
+    def test_iadd_does_not_replace_transition_occurring_again_since_least_occurring_were_found(self) -> None:
+        self.obj = MarkovGrammar(max_row_size=3)
+
+        for output in ['a b', 'a c', 'a d', 'a e', 'a c', 'a f']:
+            self.obj += ['a', output]
+
+        outputs = { self.obj['a'] for _ in range(200) }
+        self.assertSetEqual(outputs, { 'a c', 'a e', 'a f' })
+        self.assertListEqual(list(self.obj.row_counts[0]), [2, 2, 2])
+
+    def test_len_counts_distinct_transitions(self) -> None:
+        self.obj = MarkovGrammar(max_row_size=2)
+        self.obj.update({ ('a', 'a b'): 2, ('a', 'a c'): 1, ('b', 'b c'): 1 })
+        self.obj += ['a', 'a b']
+        self.obj += ['a', 'a d']
+
+        self.assertEqual(len(self.obj), 3)
+        self.assertEqual(len(MarkovGrammar.from_dict(self.obj.to_dict())), 3)
+
+        self.obj.prune(2, 1)
+
+        self.assertEqual(len(self.obj), 2)
+
+    def test_memory_size_approximates_the_memory_of_the_grammar(self) -> None:
+        self.obj.update({ (f'w{i % 300}', f'w{i % 300} w{i}'): 1 for i in range(3000) })
+        for i in range(300):
+            self.obj[f'w{i}']
+
+        measured = self.obj.vocabulary.memory_size() + self.obj.input_vocabulary.memory_size()
+        for rows in (self.obj.row_keys, self.obj.row_counts, self.obj.row_cumulative):
+            measured += sys.getsizeof(rows) + sum(sys.getsizeof(row) for row in rows)
+
+        self.assertAlmostEqual(self.obj.memory_size() / measured, 1, delta=0.2)
@@ -0,0 +1,124 @@
+import io
+from array import array
+
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.exception.invalid_model_archive import InvalidModelArchive
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.markov_model_archive import MarkovModelArchive
+from model.markov.prefix_table import PrefixTable
+from model.markov.sentence_starts import SentenceStarts
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.markov_model_archive'
+
+
+@tested_module(TEST_MODULE)
+class MarkovModelArchiveUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['ala', 'ala ma']
+        grammar += ['ma', 'ma żółwia']
+        grammar += ['ala ma', 'ala ma żółwia']
+        reverse_grammar = MarkovGrammar()
+        reverse_grammar += ['żółwia', 'żółwia ma']
+        author_grammar = {
+            'inputs': array('I', [0]),
+            'keys': array('Q', [1]),
+            'counts': array('I', [2]),
+            'sentence_starts': SentenceStarts(['ala']).to_dict()
+        }
+
+        self.model = MarkovModelEntity(
+            10,
+            grammar.to_dict(),
+            reverse_grammar.to_dict(),
+            SentenceStarts(['ala']).to_dict(),
+            123,
+            { 456: author_grammar }
+        )
+
+    def test_read_returns_written_model(self) -> None:
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+        f.seek(0)
+
+        ret = MarkovModelArchive.read(f, 10)
+
+        self.assertEqual(ret, self.model)
+
+    def test_read_returns_model_of_specified_channel(self) -> None:
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+        f.seek(0)
+
+        ret = MarkovModelArchive.read(f, 20)
+
+        self.assertEqual(ret.channel_id, 20)
+        self.assertEqual(ret.newest_message, 123)
+
+    def test_read_throws_exception_if_file_is_not_archive(self) -> None:
+        with self.assertRaises(InvalidModelArchive):
+            MarkovModelArchive.read(io.BytesIO(b'not an archive of a model'), 10)
+
+    def test_read_throws_exception_if_archive_is_truncated(self) -> None:
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+
+        with self.assertRaises(InvalidModelArchive):
+            MarkovModelArchive.read(io.BytesIO(f.getvalue()[:-20]), 10)
+
+    def test_read_throws_exception_if_archive_is_corrupted(self) -> None:
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+        data = bytearray(f.getvalue())
+        data[MarkovModelArchive.HEADER.size + 20] ^= 0xFF
+
+        with self.assertRaises(InvalidModelArchive):
+            MarkovModelArchive.read(io.BytesIO(bytes(data)), 10)
+
+    def test_read_throws_exception_if_prefixes_form_a_cycle(self) -> None:
+        self.model.grammar['prefixes'] = array('Q', [ PrefixTable.LINK << 32 | 0 ])
+        self.model.grammar['prefix_order'] = array('I', [0])
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+        f.seek(0)
+
+        with self.assertRaises(InvalidModelArchive):
+            MarkovModelArchive.read(f, 10)
+
+    def test_read_throws_exception_if_prefix_order_does_not_sort_prefixes(self) -> None:
+        self.model.grammar['prefixes'] = array('Q', [ 1 << 32 | 0, 0 << 32 | 1 ])
+        self.model.grammar['prefix_order'] = array('I', [0, 1])
+
+        self.assert_rejected()
+
+    def test_read_throws_exception_if_row_is_not_sorted(self) -> None:
+        keys = self.model.grammar['row_keys']
+        self.model.grammar['row_offsets'] = array('Q', [0, 2, 2, 3])
+        self.model.grammar['row_keys'] = array('Q', [ max(keys[:2]), min(keys[:2]), keys[2] ])
+
+        self.assert_rejected()
+
+    def test_read_throws_exception_if_offsets_decrease(self) -> None:
+        self.model.grammar['row_offsets'] = array('Q', [0, 2, 1, 3])
+
+        self.assert_rejected()
+
+    def test_read_throws_exception_if_token_id_is_out_of_range(self) -> None:
+        self.model.grammar['row_keys'][0] = 0 << 32 | 100
+
+        self.assert_rejected()
+
+    def test_read_throws_exception_if_transition_of_author_is_not_in_grammar(self) -> None:
+        self.model.author_grammars[456]['keys'] = array('Q', [0])
+
+        self.assert_rejected()
+
+    def assert_rejected(self) -> None:
+        f = io.BytesIO()
+        MarkovModelArchive.write(self.model, f)
+        f.seek(0)
+
+        with self.assertRaises(InvalidModelArchive):
+            MarkovModelArchive.read(f, 10)
@@ -0,0 +1,36 @@
+from model.markov.markov_normalizer import MarkovNormalizer
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.markov_normalizer'
+
+
+@tested_module(TEST_MODULE)
+class MarkovNormalizerUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.obj = MarkovNormalizer()
+
+    def test_normalize_folds_polish_letters_and_masks_other_characters(self) -> None:
+        ret = self.obj.normalize('Zażółć GĘŚLĄ jaźń!?')
+
+        self.assertEqual(ret, 'zazolc gesla jazn@@')
+
+    def test_normalize_folds_letters_of_other_languages(self) -> None:
+        ret = self.obj.normalize('Café Straße Øre ﬁne')
+
+        self.assertEqual(ret, 'cafe strasse ore fine')
+
+    def test_normalize_keeps_whitespace_and_masks_characters_folded_into_it(self) -> None:
+        ret = self.obj.normalize('a\nb c ¨ \U0001F600')
+
+        self.assertEqual(ret, 'a\nb c @ @')
+
+    def test_normalize_batch_normalizes_every_text(self) -> None:
+        ret = self.obj.normalize_batch(['Ala', 'ŻÓŁW'])
+
+        self.assertListEqual(ret, ['ala', 'zolw'])
+
+    def test_filter_removes_hyperlinks_and_command_invokations(self) -> None:
+        ret = self.obj.filter(['see https://example.com now', '!skip this', 'hi <@123> there', 'see http://a.b !skip'])
+
+        self.assertListEqual([ msg.split() for msg in ret ], [['see', 'now'], ['this'], ['hi', 'there'], ['see']])
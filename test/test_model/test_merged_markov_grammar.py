@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+from model.exception.input_not_present import InputNotPresent
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.merged_markov_grammar import MergedMarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.merged_markov_grammar'
+
+
+@tested_module(TEST_MODULE)
+class MergedMarkovGrammarUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.first = MarkovGrammar()
+        self.second = MarkovGrammar()
+        self.obj = MergedMarkovGrammar([ self.first, self.second ])
+
+    def test_getitem_throws_exception_if_input_not_present_in_any_grammar(self) -> None:
+        self.first += ['a', 'a b']
+
+        with self.assertRaises(InputNotPresent):
+            self.obj['b']
+
+    def test_getitem_returns_outputs_of_every_grammar(self) -> None:
+        self.first += ['a', 'a b']
+        self.second += ['c', 'c d']
+
+        self.assertEqual(self.obj['a'], 'a b')
+        self.assertEqual(self.obj['c'], 'c d')
+
+    def test_getitem_samples_outputs_proportionally_to_summed_occurrences(self) -> None:
+        self.first.update({ ('a', 'a b'): 1, ('a', 'a c'): 1 })
+        self.second.update({ ('a', 'a c'): 2 })
+        random.seed(0)
+
+        ret = Counter(self.obj['a'] for _ in range(4000))
+
+        self.assertAlmostEqual(ret['a c'] / 4000, 0.75, delta=0.03)
+
+    def test_getitem_samples_outputs_learned_after_merging(self) -> None:
+        self.first += ['a', 'a b']
+
+        self.second += ['b', 'b c']
+
+        self.assertEqual(self.obj['b'], 'b c')
+
+    def test_getitem_samples_outputs_of_frozen_grammars(self) -> None:
+        self.first += ['a', 'a b']
+        self.second += ['a', 'a b']
+        frozen = FrozenMarkovGrammar(FrozenMarkovGrammar.freeze(self.second, SentenceStarts(), 1))
+        obj = MergedMarkovGrammar([ self.first, frozen ])
+
+        self.assertEqual(obj['a'], 'a b')
+
+    def test_find_inputs_returns_distinct_inputs_of_every_grammar(self) -> None:
+        self.first += ['a', 'a b']
+        self.second += ['a', 'a c']
+        self.second += ['b a', 'b a c']
+
+        ret = self.obj.find_inputs('a')
+
+        self.assertListEqual(ret, ['a', 'b a'])
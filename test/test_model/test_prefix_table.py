@@ -0,0 +1,48 @@
+from array import array
+
+from model.markov.prefix_table import PrefixTable
+from model.markov.token_vocabulary import TokenVocabulary
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.prefix_table'
+
+
+@tested_module(TEST_MODULE)
+class PrefixTableUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.obj = PrefixTable(TokenVocabulary())
+
+    def test_intern_stores_only_single_tokens_as_strings(self) -> None:
+        self.obj.intern('ala ma kota')
+        self.obj.intern('ala ma')
+
+        self.assertListEqual(self.obj.vocabulary.tokens, ['ala', 'ma', 'kota'])
+        self.assertEqual(len(self.obj), 2)
+
+    def test_getitem_returns_interned_prefix(self) -> None:
+        ids = [ self.obj.intern(prefix) for prefix in ['', 'ala', 'ala ma', 'ala ma kota', 'ma ala'] ]
+
+        ret = [ self.obj[id] for id in ids ]
+
+        self.assertListEqual(ret, ['', 'ala', 'ala ma', 'ala ma kota', 'ma ala'])
+
+    def test_intern_returns_the_same_id_for_the_same_prefix(self) -> None:
+        prefixes = [ f'w{i % 7} w{i % 5} w{i % 3}' for i in range(200) ]
+        ids = [ self.obj.intern(prefix) for prefix in prefixes ]
+
+        ret = [ self.obj.intern(prefix) for prefix in prefixes ]
+
+        self.assertListEqual(ret, ids)
+        self.assertListEqual([ self.obj.get_id(prefix) for prefix in prefixes ], ids)
+        self.assertEqual(self.obj.get_id('w0 w6'), None)
+
+    def test_restored_table_finds_interned_prefixes(self) -> None:
+        id = self.obj.intern('ala ma kota')
+        self.obj.intern('kota ma ala')
+
+        ret = PrefixTable(self.obj.vocabulary, array('Q', self.obj.links), array('I', self.obj.get_order()))
+
+        self.assertEqual(ret.get_id('ala ma kota'), id)
+        self.assertEqual(ret.intern('ala ma kota'), id)
+        self.assertEqual(len(ret), 4)
@@ -0,0 +1,64 @@
+import random
+from array import array
+
+from model.markov.sentence_starts import SentenceStarts
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'model.markov.sentence_starts'
+
+
+@tested_module(TEST_MODULE)
+class SentenceStartsUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.obj = SentenceStarts()
+
+    def test_add_deduplicates_starts_and_counts_their_occurrences(self) -> None:
+        self.obj.add('a')
+        self.obj.add('b')
+        self.obj.add('a', 2)
+
+        self.assertListEqual(list(self.obj), ['a', 'b'])
+        self.assertListEqual(list(self.obj.counts), [3, 1])
+
+    def test_sample_returns_only_added_starts(self) -> None:
+        self.obj.update({ 'a': 1, 'b': 1 })
+
+        ret = { self.obj.sample() for _ in range(100) }
+
+        self.assertSetEqual(ret, { 'a', 'b' })
+
+    def test_weighted_sample_samples_starts_proportionally_to_occurrences(self) -> None:
+        self.obj.update({ 'a': 1, 'b': 3 })
+        random.seed(0)
+
+        ret = [ self.obj.sample(True) for _ in range(4000) ]
+
+        self.assertAlmostEqual(ret.count('b') / len(ret), 0.75, delta=0.03)
+
+    def test_weighted_sample_samples_starts_added_after_previous_sampling(self) -> None:
+        self.obj.add('a')
+        self.obj.sample(True)
+
+        self.obj.add('b', 1000)
+
+        ret = { self.obj.sample(True) for _ in range(100) }
+
+        self.assertIn('b', ret)
+
+    def test_filter_keeps_occurrences_of_remaining_starts(self) -> None:
+        self.obj.update({ 'a': 1, 'b': 2, 'c': 3 })
+
+        ret = self.obj.filter(lambda start: start != 'b')
+
+        self.assertListEqual(list(ret), ['a', 'c'])
+        self.assertListEqual(list(ret.counts), [1, 3])
+        self.assertNotIn('b', ret)
+
+    def test_starts_are_equal_after_restoring_from_dict(self) -> None:
+        self.obj.update({ 'a': 1, 'żółw': 2 })
+
+        ret = SentenceStarts.from_dict(self.obj.to_dict())
+
+        self.assertListEqual(list(ret), ['a', 'żółw'])
+        self.assertEqual(ret.counts, array('I', [1, 2]))
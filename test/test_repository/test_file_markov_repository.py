@@ -0,0 +1,153 @@
+import os
+import pickle
+import tempfile
+from unittest.mock import MagicMock
+
+from model.entity.markov_delta_entity import MarkovDeltaEntity
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+from repository.file_markov_repository import FileMarkovRepository
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'repository.file_markov_repository'
+
+
+@tested_module(TEST_MODULE)
+class FileMarkovRepositoryUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+        cfg = MagicMock()
+        cfg.markov_directory = self.directory.name
+
+        self.obj = FileMarkovRepository(cfg)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+
+        self.directory.cleanup()
+
+    async def test_get_model_returns_none_if_model_not_found(self) -> None:
+        ret = await self.obj.get_model(10)
+
+        self.assertEqual(ret, None)
+
+    async def test_get_model_returns_saved_model(self) -> None:
+        model = MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123)
+        await self.obj.save_model(model)
+
+        ret = await self.obj.get_model(10)
+
+        self.assertEqual(ret, MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+
+    async def test_save_model_creates_directory_on_first_write(self) -> None:
+        cfg = MagicMock()
+        cfg.markov_directory = os.path.join(self.directory.name, 'markov')
+        obj = FileMarkovRepository(cfg)
+
+        self.assertFalse(os.path.exists(cfg.markov_directory))
+
+        await obj.save_model(MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+        ret = await obj.get_model(10)
+
+        self.assertEqual(ret, MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+
+    async def test_save_model_replaces_previous_model(self) -> None:
+        await self.obj.save_model(MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+        await self.obj.save_model(MarkovModelEntity(10, { 'b': { 'b c': 1 } }, {}, ['b'], 456))
+
+        ret = await self.obj.get_model(10)
+
+        self.assertEqual(ret, MarkovModelEntity(10, { 'b': { 'b c': 1 } }, {}, ['b'], 456))
+
+    async def test_save_model_does_not_modify_models_of_other_channels(self) -> None:
+        await self.obj.save_model(MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+        await self.obj.save_model(MarkovModelEntity(20, { 'b': { 'b c': 1 } }, {}, ['b'], 456))
+
+        ret = await self.obj.get_model(10)
+
+        self.assertEqual(ret, MarkovModelEntity(10, { 'a': { 'a b': 2 } }, {}, ['a'], 123))
+
+    async def test_save_model_leaves_no_temporary_files(self) -> None:
+        await self.obj.save_model(MarkovModelEntity(10, {}, {}, [], 123))
+
+        self.assertListEqual(os.listdir(self.directory.name), ['10.pickle'])
+
+    async def test_get_model_returns_none_if_model_saved_by_incompatible_version(self) -> None:
+        with open(os.path.join(self.directory.name, '10.pickle'), 'wb') as f:
+            pickle.dump({ 'channel_id': 10, 'occurrences': {}, 'sentence_starts': [], 'newest_message': 123 }, f)
+
+        ret = await self.obj.get_model(10)
+
+        self.assertEqual(ret, None)
+
+    async def test_get_deltas_returns_empty_list_if_no_deltas_appended(self) -> None:
+        ret = await self.obj.get_deltas(10)
+
+        self.assertListEqual(ret, [])
+
+    async def test_get_deltas_returns_appended_deltas_in_order(self) -> None:
+        await self.obj.append_delta(MarkovDeltaEntity(10, { ('a', 'a b'): 1 }, {}, { 'a': 1 }, 1))
+        await self.obj.append_delta(MarkovDeltaEntity(10, { ('b', 'b c'): 2 }, {}, {}, 2))
+
+        ret = await self.obj.get_deltas(10)
+
+        self.assertListEqual(ret, [
+            MarkovDeltaEntity(10, { ('a', 'a b'): 1 }, {}, { 'a': 1 }, 1),
+            MarkovDeltaEntity(10, { ('b', 'b c'): 2 }, {}, {}, 2)
+        ])
+
+    async def test_get_deltas_drops_delta_cut_short_while_appended(self) -> None:
+        await self.obj.append_delta(MarkovDeltaEntity(10, { ('a', 'a b'): 1 }, {}, { 'a': 1 }, 1))
+        data = pickle.dumps(MarkovDeltaEntity(10, {}, {}, {}, 2).to_dict())
+        with open(os.path.join(self.directory.name, '10.log'), 'ab') as f:
+            f.write(data[:len(data) // 2])
+
+        await self.obj.get_deltas(10)
+        await self.obj.append_delta(MarkovDeltaEntity(10, {}, {}, {}, 3))
+        ret = await self.obj.get_deltas(10)
+
+        self.assertListEqual([ delta.newest_message for delta in ret ], [1, 3])
+
+    async def test_delete_deltas_deletes_appended_deltas(self) -> None:
+        await self.obj.append_delta(MarkovDeltaEntity(10, { ('a', 'a b'): 1 }, {}, { 'a': 1 }, 1))
+
+        await self.obj.delete_deltas(10)
+
+        self.assertListEqual(await self.obj.get_deltas(10), [])
+
+    async def test_get_frozen_grammar_returns_none_if_deltas_appended_after_freezing(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        await self.obj.save_frozen_grammar(10, grammar, MarkovGrammar(), SentenceStarts(['a']), 123)
+        await self.obj.append_delta(MarkovDeltaEntity(10, { ('b', 'b c'): 1 }, {}, {}, 124))
+
+        ret = await self.obj.get_frozen_grammar(10)
+
+        self.assertEqual(ret, None)
+
+    async def test_get_frozen_grammar_returns_none_if_frozen_grammar_not_found(self) -> None:
+        ret = await self.obj.get_frozen_grammar(10)
+
+        self.assertEqual(ret, None)
+
+    async def test_get_frozen_grammar_returns_saved_frozen_grammar(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        await self.obj.save_frozen_grammar(10, grammar, MarkovGrammar(), SentenceStarts(['a']), 123)
+
+        ret = await self.obj.get_frozen_grammar(10)
+
+        self.assertEqual(ret['a'], 'a b')
+        self.assertListEqual(list(ret.sentence_starts), ['a'])
+        self.assertEqual(ret.newest_message, 123)
+
+    async def test_get_frozen_grammar_returns_none_if_file_is_not_frozen_grammar(self) -> None:
+        with open(os.path.join(self.directory.name, '10.frozen'), 'wb') as f:
+            f.write(b'not a frozen grammar')
+
+        ret = await self.obj.get_frozen_grammar(10)
+
+        self.assertEqual(ret, None)
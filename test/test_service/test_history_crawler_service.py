@@ -0,0 +1,112 @@
+import datetime
+from unittest.mock import MagicMock
+
+from nextcord.utils import time_snowflake
+
+from service.history_crawler_service import HistoryCrawlerService
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'service.history_crawler_service'
+
+
+def make_channel(count: int, fail_after: int | None = None) -> MagicMock:
+    '''Creates a channel mock whose history contains the specified number of messages, sent one hour after another,
+    with ids being snowflakes of the time they were sent.'''
+
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=count + 1)
+    messages = []
+
+    for i in range(1, count + 1):
+        msg = MagicMock()
+        msg.id = time_snowflake(start + datetime.timedelta(hours=i))
+        messages.append(msg)
+
+    async def history(oldest_first: bool, limit: None, after: MagicMock | None = None, before: MagicMock | None = None):
+        window = [ msg for msg in messages if (after is None or msg.id > after.id) and (before is None or msg.id < before.id) ]
+
+        for msg in (window if oldest_first else window[::-1]):
+            if fail_after is not None and msg.id > messages[fail_after].id:
+                raise RuntimeError
+
+            yield msg
+
+    channel = MagicMock()
+    channel.created_at = start
+    channel.history = history
+    channel.messages = messages
+
+    return channel
+
+
+@tested_module(TEST_MODULE)
+class HistoryCrawlerServiceUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.conf = MagicMock()
+        self.conf.markov_crawl_concurrency = 3
+        self.conf.markov_crawl_windows = 8
+        self.conf.markov_crawl_min_window_hours = 1
+        self.conf.markov_learning_chunk_size = 2
+
+        self.obj = HistoryCrawlerService(self.conf)
+
+    async def test_crawl_yields_all_messages_in_order(self) -> None:
+        channel = make_channel(50)
+
+        ret = [ msg async for msg in self.obj.crawl(channel, None) ]
+
+        self.assertEqual(ret, channel.messages)
+
+    async def test_crawl_yields_messages_after_specified_message(self) -> None:
+        channel = make_channel(50)
+
+        ret = [ msg async for msg in self.obj.crawl(channel, channel.messages[19].id) ]
+
+        self.assertEqual(ret, channel.messages[20:])
+
+    async def test_crawl_uses_single_request_chain_if_not_concurrent(self) -> None:
+        self.conf.markov_crawl_concurrency = 1
+        self.obj = HistoryCrawlerService(self.conf)
+        channel = make_channel(50)
+
+        ret = [ msg async for msg in self.obj.crawl(channel, channel.messages[19].id) ]
+
+        self.assertEqual(ret, channel.messages[20:])
+
+    async def test_crawl_splits_period_into_windows_of_minimum_span(self) -> None:
+        self.conf.markov_crawl_min_window_hours = 20
+        self.obj = HistoryCrawlerService(self.conf)
+        channel = make_channel(50)
+
+        ret = self.obj._get_window_bounds(channel, None)
+
+        self.assertEqual(len(ret), 2)
+
+    async def test_crawl_uses_single_request_chain_for_period_shorter_than_minimum_span(self) -> None:
+        self.conf.markov_crawl_min_window_hours = 20
+        self.obj = HistoryCrawlerService(self.conf)
+        channel = make_channel(50)
+        history = channel.history
+        calls = []
+
+        def counted_history(*args, **kwargs):
+            calls.append(kwargs)
+
+            return history(*args, **kwargs)
+
+        channel.history = counted_history
+
+        ret = [ msg async for msg in self.obj.crawl(channel, channel.messages[39].id) ]
+
+        self.assertEqual(ret, channel.messages[40:])
+        self.assertEqual(len(calls), 1)
+
+    async def test_crawl_throws_exception_of_failed_window(self) -> None:
+        channel = make_channel(50, fail_after=30)
+        ret = []
+
+        with self.assertRaises(RuntimeError):
+            async for msg in self.obj.crawl(channel, None):
+                ret.append(msg)
+
+        self.assertEqual(ret, channel.messages[:31])
@@ -0,0 +1,83 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from service.markov_preprocessing_service import MarkovPreprocessingService
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'service.markov_preprocessing_service'
+
+
+@tested_module(TEST_MODULE)
+class MarkovPreprocessingServiceUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.obj = MarkovPreprocessingService([2])
+
+    def test_preprocess_counts_transitions_of_merged_messages(self) -> None:
+        ret = self.obj.preprocess([['Ala ma', 'kota'], ['ma kota']])
+
+        self.assertDictEqual(dict(ret.transitions), {
+            ('ala', 'Ala ma'): 1,
+            ('ma', 'ma kota'): 2
+        })
+
+    def test_preprocess_counts_transitions_of_every_order(self) -> None:
+        obj = MarkovPreprocessingService([1, 3])
+
+        ret = obj.preprocess([['Ala ma kota']])
+
+        self.assertDictEqual(dict(ret.transitions), {
+            ('', 'Ala'): 1,
+            ('', 'ma'): 1,
+            ('', 'kota'): 1,
+            ('ala ma', 'Ala ma kota'): 1
+        })
+
+    def test_preprocess_uses_input_of_the_highest_order_contained_in_message_as_sentence_start(self) -> None:
+        obj = MarkovPreprocessingService([2, 3])
+
+        ret = obj.preprocess([['Ala ma kota'], ['Żółw je']])
+
+        self.assertDictEqual(dict(ret.sentence_starts), { 'ala ma': 1, 'zolw': 1 })
+
+    def test_preprocess_counts_transitions_of_reversed_messages(self) -> None:
+        ret = self.obj.preprocess([['Ala ma', 'kota']])
+
+        self.assertDictEqual(dict(ret.reverse_transitions), {
+            ('ma', 'ma Ala'): 1,
+            ('kota', 'kota ma'): 1
+        })
+
+    def test_preprocess_counts_first_tokens_of_unmerged_messages_as_sentence_starts(self) -> None:
+        ret = self.obj.preprocess([['Ala ma', 'kota'], ['Żółw je', 'ala ma']])
+
+        self.assertDictEqual(dict(ret.sentence_starts), { 'ala': 2, 'zolw': 1 })
+
+    def test_preprocess_counts_transitions_and_sentence_starts_of_every_author(self) -> None:
+        ret = self.obj.preprocess([['Ala ma'], ['ma kota'], ['Ala je']], [1, 2, 1])
+
+        self.assertDictEqual(dict(ret.author_transitions[1]), { ('ala', 'Ala ma'): 1, ('ala', 'Ala je'): 1 })
+        self.assertDictEqual(dict(ret.author_transitions[2]), { ('ma', 'ma kota'): 1 })
+        self.assertDictEqual(dict(ret.author_sentence_starts[1]), { 'ala': 2 })
+
+    def test_preprocess_filters_hyperlinks_and_command_invokations(self) -> None:
+        ret = self.obj.preprocess([['!skip', 'see https://example.com now', 'hi <@123> there']])
+
+        self.assertDictEqual(dict(ret.transitions), {
+            ('see', 'see now'): 1,
+            ('now', 'now hi'): 1,
+            ('hi', 'hi there'): 1
+        })
+
+    def test_preprocess_counts_sentence_starts_of_messages_within_long_runs(self) -> None:
+        ret = self.obj.preprocess([['Ala ma', '!skip', 'kota', 'Żółw je'] * 100])
+
+        self.assertDictEqual(dict(ret.sentence_starts), { 'ala': 100, 'zolw': 100 })
+        self.assertEqual(ret.transitions[('ma', 'ma kota')], 100)
+        self.assertEqual(ret.transitions[('je', 'je Ala')], 99)
+
+    def test_preprocess_can_be_run_in_another_process(self) -> None:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            ret = executor.submit(self.obj.preprocess, [['a b']]).result()
+
+        self.assertDictEqual(dict(ret.transitions), { ('a', 'a b'): 1 })
@@ -0,0 +1,834 @@
+import asyncio
+import datetime
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+from model.entity.markov_model_entity import MarkovModelEntity
+from model.exception.author_not_learned import AuthorNotLearned
+from model.exception.channel_not_learned import ChannelNotLearned
+from model.exception.invalid_model_archive import InvalidModelArchive
+from model.exception.learning_cancelled import LearningCancelled
+from model.exception.no_new_messages import NoNewMessages
+from model.exception.not_learning import NotLearning
+from model.exception.word_not_learned import WordNotLearned
+from model.markov.frozen_markov_grammar import FrozenMarkovGrammar
+from model.markov.markov_grammar import MarkovGrammar
+from model.markov.sentence_starts import SentenceStarts
+from service.convertor_service import ConvertorService
+from service.history_crawler_service import HistoryCrawlerService
+from service.markov_service import MarkovService
+from utils.test_utils import TestCase, tested_module
+
+
+TEST_MODULE = 'service.markov_service'
+
+
+def make_channel(id: int, contents: list[str]) -> MagicMock:
+    '''Creates a channel mock whose history contains messages with the specified contents, sent one after another by
+    alternating authors.'''
+
+    start = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+    authors = [ MagicMock(), MagicMock() ]
+    messages = []
+
+    for i, content in enumerate(contents, 1):
+        msg = MagicMock()
+        msg.id = i
+        msg.author = authors[i % 2]
+        msg.content = content
+        msg.created_at = start + datetime.timedelta(minutes=i)
+        messages.append(msg)
+
+    async def history(oldest_first: bool, limit: None, after: MagicMock | None = None, before: MagicMock | None = None):
+        newer = [ msg for msg in messages if (after is None or msg.id > after.id) and (before is None or msg.id < before.id) ]
+
+        for msg in (newer if oldest_first else newer[::-1]):
+            yield msg
+
+    channel = MagicMock()
+    channel.id = id
+    channel.created_at = start
+    channel.history = history
+    channel.messages = messages
+
+    for msg in messages:
+        msg.channel = channel
+
+    return channel
+
+
+@tested_module(TEST_MODULE)
+class MarkovServiceUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self.markov_repository = AsyncMock()
+        self.markov_repository.get_model.return_value = None
+        self.markov_repository.get_deltas.return_value = []
+
+        self.conf = MagicMock()
+        self.conf.markov_learning_chunk_size = 1000
+        self.conf.markov_learning_workers = 1
+        self.conf.markov_live_learning_interval = 60
+        self.conf.markov_log_compaction_ratio = 1
+        self.conf.markov_crawl_concurrency = 1
+        self.conf.markov_crawl_windows = 1
+        self.conf.markov_crawl_min_window_hours = 24
+        self.conf.markov_pregenerated_messages = 0
+        self.conf.markov_pregeneration_watermark = 0
+        self.conf.markov_memory_budget = 64 * 1024 * 1024
+        self.conf.markov_freeze_threshold = 0
+        self.conf.markov_prune_min_count = 1
+        self.conf.markov_prune_min_input_count = 1
+        self.conf.markov_max_row_size = 0
+        self.conf.markov_gram_orders = [2]
+        self.conf.markov_weighted_sentence_starts = False
+        self.conf.markov_author_models = True
+        self.executor = self.patch('ProcessPoolExecutor')
+        self.executor.side_effect = lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)
+
+        self.obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+    async def test_learn_returns_number_of_learned_messages(self) -> None:
+        ret = await self.obj.learn(make_channel(10, ['a b c', 'd e f']))
+
+        self.assertEqual(ret, 2)
+
+    async def test_learn_throws_exception_if_no_new_messages(self) -> None:
+        channel = make_channel(10, ['a b c'])
+        await self.obj.learn(channel)
+
+        with self.assertRaises(NoNewMessages):
+            await self.obj.learn(channel)
+
+    async def test_learn_persists_learned_model(self) -> None:
+        await self.obj.learn(make_channel(10, ['a b']))
+
+        model = self.markov_repository.save_model.call_args.args[0]
+        self.assertEqual(model.channel_id, 10)
+        self.assertEqual(model.newest_message, 1)
+        self.assertListEqual(model.sentence_starts['starts'], ['a'])
+
+    async def test_say_throws_exception_if_channel_not_learned(self) -> None:
+        with self.assertRaises(ChannelNotLearned):
+            await self.obj.say(make_channel(10, []))
+
+    async def test_say_generates_message_from_learned_channel(self) -> None:
+        channel = make_channel(10, ['a b c'])
+        await self.obj.learn(channel)
+
+        ret = await self.obj.say(channel)
+
+        self.assertEqual(ret.strip(), 'a b c')
+
+    async def test_say_generates_message_from_multiple_orders(self) -> None:
+        self.conf.markov_gram_orders = [2, 3]
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b c', 'c d'])
+        await obj.learn(channel)
+        obj.sentence_starts[10] = obj.sentence_starts[10].filter(lambda start: start == 'a b')
+
+        ret = await obj.say(channel)
+
+        self.assertEqual(ret, 'a b c d')
+
+    async def test_say_generates_message_around_the_word(self) -> None:
+        channel = make_channel(10, ['Ala ma kota'])
+        await self.obj.learn(channel)
+
+        ret = await self.obj.say(channel, 'MA')
+
+        self.assertEqual(ret, 'Ala ma kota')
+
+    async def test_say_generates_message_around_the_last_word_of_a_message(self) -> None:
+        channel = make_channel(10, ['Ala ma kota'])
+        await self.obj.learn(channel)
+
+        ret = await self.obj.say(channel, 'kota')
+
+        self.assertEqual(ret, 'Ala ma kota')
+
+    async def test_say_throws_exception_if_word_not_learned(self) -> None:
+        channel = make_channel(10, ['Ala ma kota'])
+        await self.obj.learn(channel)
+
+        with self.assertRaises(WordNotLearned):
+            await self.obj.say(channel, 'psa')
+
+    async def test_say_imitates_the_author(self) -> None:
+        channel = make_channel(10, ['a b', 'a c', 'a b', 'a c'])
+        await self.obj.learn(channel)
+
+        ret = { await self.obj.say(channel, author=channel.messages[1].author) for _ in range(20) }
+
+        self.assertSetEqual(ret, { 'a c' })
+
+    async def test_say_throws_exception_if_author_not_learned(self) -> None:
+        channel = make_channel(10, ['a b'])
+        await self.obj.learn(channel)
+
+        with self.assertRaises(AuthorNotLearned):
+            await self.obj.say(channel, author=MagicMock())
+
+    async def test_say_imitates_the_author_after_restoring_persisted_model(self) -> None:
+        channel = make_channel(10, ['a b', 'a c'])
+        await self.obj.learn(channel)
+        self.markov_repository.get_model.return_value = self.markov_repository.save_model.call_args.args[0]
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        ret = await obj.say(channel, author=channel.messages[0].author)
+
+        self.assertEqual(ret, 'a b')
+
+    async def test_learn_prunes_transitions_of_authors(self) -> None:
+        self.conf.markov_prune_min_count = 2
+        self.conf.markov_log_compaction_ratio = 0.25
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b', 'c d', 'a b', 'x y'])
+        await obj.learn(channel)
+        msg = make_channel(10, ['a b']).messages[0]
+        msg.id = 5
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+
+        self.assertEqual(await obj.say(channel, author=channel.messages[0].author), 'a b')
+
+        with self.assertRaises(AuthorNotLearned):
+            await obj.say(channel, author=channel.messages[1].author)
+
+    async def test_say_merged_generates_message_from_models_of_every_channel(self) -> None:
+        first, second = make_channel(10, ['a b']), make_channel(20, ['b c'])
+        await self.obj.learn(first)
+        await self.obj.learn(second)
+        self.obj.sentence_starts[20] = SentenceStarts()
+
+        ret = await self.obj.say_merged([ first, second ])
+
+        self.assertTupleEqual(ret, ('a b c', 0))
+
+    async def test_say_merged_skips_channels_not_learned(self) -> None:
+        channel = make_channel(10, ['a b'])
+        await self.obj.learn(channel)
+
+        ret = await self.obj.say_merged([ channel, make_channel(20, []) ])
+
+        self.assertTupleEqual(ret, ('a b', 0))
+
+    async def test_say_merged_throws_exception_if_no_channel_learned(self) -> None:
+        with self.assertRaises(ChannelNotLearned):
+            await self.obj.say_merged([ make_channel(10, []), make_channel(20, []) ])
+
+    async def test_say_merged_generates_message_around_the_word(self) -> None:
+        first, second = make_channel(10, ['Ala ma']), make_channel(20, ['ma kota'])
+        await self.obj.learn(first)
+        await self.obj.learn(second)
+
+        ret = await self.obj.say_merged([ first, second ], 'ma')
+
+        self.assertTupleEqual(ret, ('Ala ma kota', 0))
+
+    async def test_say_merged_skips_channels_not_in_memory_once_memory_is_full(self) -> None:
+        self.conf.markov_memory_budget = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        first, second = make_channel(10, ['a b']), make_channel(20, ['c d'])
+        await obj.learn(first)
+        await obj.learn(second)
+        self.markov_repository.get_model.reset_mock()
+
+        ret = await obj.say_merged([ first, second ])
+
+        self.assertTupleEqual(ret, ('c d', 1))
+        self.assertNotIn(10, obj.grammars)
+        self.markov_repository.get_model.assert_not_awaited()
+
+    async def test_say_restores_persisted_model(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        self.markov_repository.get_model.return_value = MarkovModelEntity(10, grammar.to_dict(), MarkovGrammar().to_dict(), SentenceStarts(['a']).to_dict(), 1)
+
+        ret = await self.obj.say(make_channel(10, []))
+
+        self.assertEqual(ret.strip(), 'a b')
+
+    async def test_learn_continues_from_persisted_cursor(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        self.markov_repository.get_model.return_value = MarkovModelEntity(10, grammar.to_dict(), MarkovGrammar().to_dict(), SentenceStarts(['a']).to_dict(), 1)
+
+        ret = await self.obj.learn(make_channel(10, ['a b', 'c d']))
+
+        self.assertEqual(ret, 1)
+
+    async def test_model_is_restored_only_once(self) -> None:
+        channel = make_channel(10, ['a b'])
+        await self.obj.learn(channel)
+
+        await self.obj.say(channel)
+        await self.obj.say(channel)
+
+        self.markov_repository.get_model.assert_called_once_with(10)
+
+    async def test_learn_in_chunks_learns_the_same_model(self) -> None:
+        contents = [ 'a b c', 'b c d', 'c d e', 'a c e' ]
+        await self.obj.learn(make_channel(10, contents))
+        self.conf.markov_learning_chunk_size = 1
+        chunked = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await chunked.learn(make_channel(10, contents))
+
+        self.assertDictEqual(chunked.grammars[10].to_dict(), self.obj.grammars[10].to_dict())
+        self.assertDictEqual(chunked.sentence_starts[10].to_dict(), self.obj.sentence_starts[10].to_dict())
+        self.assertEqual(chunked.newest_message[10], 4)
+
+    async def test_learn_merges_consecutive_messages_of_the_same_author(self) -> None:
+        channel = make_channel(10, ['a b', 'c d'])
+        channel_messages = [ msg async for msg in channel.history(oldest_first=True, limit=None) ]
+        channel_messages[1].author = channel_messages[0].author
+
+        await self.obj.learn(channel)
+
+        self.assertEqual(self.obj.grammars[10]['b'], 'b c')
+        self.assertSetEqual(set(self.obj.sentence_starts[10]), { 'a', 'c' })
+
+    async def test_learn_preprocesses_messages_in_worker_processes(self) -> None:
+        await self.obj.learn(make_channel(10, ['a b']))
+
+        self.assertEqual(self.executor.call_args.kwargs['max_workers'], 1)
+        self.assertEqual(self.executor.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+
+    async def test_learn_live_message_ignores_channels_not_learned_since_start(self) -> None:
+        channel = make_channel(10, ['a b', 'c d'])
+
+        for msg in channel.messages:
+            self.obj.learn_live_message(msg)
+
+        self.assertDictEqual(self.obj.live_runs, {})
+
+    async def test_live_messages_are_learned_after_their_runs_close(self) -> None:
+        channel = make_channel(10, ['a b', 'c d', 'e f'])
+        learned, live = channel.messages[:1], channel.messages[1:]
+        channel.messages[:] = learned
+        await self.obj.learn(channel)
+
+        for msg in live:
+            self.obj.learn_live_message(msg)
+        await self.obj._learn_live_runs()
+
+        self.assertEqual(self.obj.newest_message[10], 3)
+        self.assertSetEqual(set(self.obj.sentence_starts[10]), { 'a', 'c', 'e' })
+        self.assertEqual(self.obj.grammars[10]['e'], 'e f')
+
+    async def test_live_messages_of_channel_learned_without_messages_are_learned(self) -> None:
+        channel = make_channel(10, ['a b', 'c d'])
+        live = channel.messages[:]
+        channel.messages[:] = []
+
+        with self.assertRaises(NoNewMessages):
+            await self.obj.learn(channel)
+
+        for msg in live:
+            self.obj.learn_live_message(msg)
+        await self.obj._learn_live_runs()
+
+        self.assertEqual(self.obj.newest_message[10], 2)
+        self.assertSetEqual(set(self.obj.sentence_starts[10]), { 'a', 'c' })
+
+    async def test_live_messages_already_learned_by_learn_are_skipped(self) -> None:
+        channel = make_channel(10, ['a b', 'c d'])
+        learned, live = channel.messages[:1], channel.messages[1:]
+        channel.messages[:] = learned
+        await self.obj.learn(channel)
+
+        for msg in live:
+            self.obj.learn_live_message(msg)
+        channel.messages[:] = learned + live
+        await self.obj.learn(channel)
+        await self.obj._learn_live_runs()
+
+        self.assertListEqual(list(self.obj.grammars[10].row_counts[1]), [1])
+
+    async def test_start_learning_reports_number_of_learned_messages(self) -> None:
+        on_finished, on_failed = AsyncMock(), AsyncMock()
+
+        job = self.obj.start_learning(make_channel(10, ['a b', 'c d']), on_finished, on_failed)
+        await job.task
+
+        on_finished.assert_awaited_once_with(2)
+        on_failed.assert_not_awaited()
+        self.assertEqual(job.processed_messages, 2)
+
+    async def test_start_learning_reports_failure(self) -> None:
+        on_finished, on_failed = AsyncMock(), AsyncMock()
+
+        job = self.obj.start_learning(make_channel(10, []), on_finished, on_failed)
+        await job.task
+
+        on_finished.assert_not_awaited()
+        self.assertIsInstance(on_failed.call_args.args[0], NoNewMessages)
+
+    async def test_start_learning_joins_learning_in_progress(self) -> None:
+        channel = make_channel(10, ['a b'])
+        first_on_finished, second_on_finished = AsyncMock(), AsyncMock()
+
+        first = self.obj.start_learning(channel, first_on_finished, AsyncMock())
+        second = self.obj.start_learning(channel, second_on_finished, AsyncMock())
+        await first.task
+
+        self.assertIs(first, second)
+        self.assertEqual(len(second.listeners), 2)
+        first_on_finished.assert_awaited_once_with(1)
+        second_on_finished.assert_awaited_once_with(1)
+
+    async def test_start_learning_reports_to_every_listener_if_one_fails(self) -> None:
+        channel = make_channel(10, ['a b'])
+        first_on_finished, second_on_finished = AsyncMock(side_effect=RuntimeError), AsyncMock()
+
+        job = self.obj.start_learning(channel, first_on_finished, AsyncMock())
+        self.obj.start_learning(channel, second_on_finished, AsyncMock())
+        await job.task
+
+        second_on_finished.assert_awaited_once_with(1)
+
+    async def test_concurrent_learn_of_the_same_channel_crawls_history_once(self) -> None:
+        channel = make_channel(10, ['a b', 'a b'])
+        history = MagicMock(side_effect=channel.history)
+        channel.history = history
+
+        ret = await asyncio.gather(self.obj.learn(channel), self.obj.learn(channel))
+
+        self.assertListEqual(ret, [2, 2])
+        history.assert_called_once()
+        self.assertListEqual(list(self.obj.grammars[10].row_counts[0]), [2])
+
+    async def test_concurrent_learn_of_different_channels_runs_in_parallel(self) -> None:
+        first, second = make_channel(10, ['a b']), make_channel(20, ['c d'])
+        first_history = first.history
+        async def waiting_history(**kwargs):
+            async for msg in first_history(**kwargs):
+                await asyncio.wait_for(second_learned.wait(), 1)
+                yield msg
+        first.history = waiting_history
+        second_learned = asyncio.Event()
+
+        async def learn_second():
+            await self.obj.learn(second)
+            second_learned.set()
+
+        await asyncio.gather(self.obj.learn(first), learn_second())
+
+        self.assertSetEqual(set(self.obj.grammars), { 10, 20 })
+
+    async def test_cancelling_one_caller_does_not_cancel_joined_learning(self) -> None:
+        channel = make_channel(10, ['a b'])
+        first = asyncio.create_task(self.obj.learn(channel))
+        second = asyncio.create_task(self.obj.learn(channel))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        self.assertEqual(await second, 1)
+
+    async def test_concurrent_say_waits_for_the_same_restoration(self) -> None:
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        self.markov_repository.get_model.return_value = MarkovModelEntity(10, grammar.to_dict(), MarkovGrammar().to_dict(), SentenceStarts(['a']).to_dict(), 1)
+        channel = make_channel(10, [])
+
+        ret = await asyncio.gather(self.obj.say(channel), self.obj.say(channel))
+
+        self.assertListEqual([ msg.strip() for msg in ret ], ['a b', 'a b'])
+        self.markov_repository.get_model.assert_called_once_with(10)
+
+    async def test_get_learn_job_throws_exception_if_not_learning(self) -> None:
+        job = self.obj.start_learning(make_channel(10, ['a b']), AsyncMock(), AsyncMock())
+        await job.task
+
+        self.assertRaises(NotLearning, self.obj.get_learn_job, 10)
+
+    async def test_cancel_learning_keeps_messages_learned_so_far(self) -> None:
+        self.conf.markov_learning_chunk_size = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b', 'c d', 'e f', 'g h'])
+        history = channel.history
+        async def slow_history(**kwargs):
+            async for msg in history(**kwargs):
+                if msg.id == 4:
+                    obj.cancel_learning(10)
+                    await asyncio.sleep(1)
+                yield msg
+        channel.history = slow_history
+        on_finished, on_failed = AsyncMock(), AsyncMock()
+
+        job = obj.start_learning(channel, on_finished, on_failed)
+        await asyncio.wait([job.task])
+
+        on_finished.assert_not_awaited()
+        self.assertIsInstance(on_failed.call_args.args[0], LearningCancelled)
+        self.assertEqual(obj.newest_message[10], 1)
+        self.assertEqual(self.markov_repository.save_model.call_args.args[0].newest_message, 1)
+
+    async def test_cancel_learning_before_the_job_runs_reports_cancellation(self) -> None:
+        on_finished, on_failed = AsyncMock(), AsyncMock()
+
+        job = self.obj.start_learning(make_channel(10, ['a b']), on_finished, on_failed)
+        self.obj.cancel_learning(10)
+        await job.task
+
+        on_finished.assert_not_awaited()
+        self.assertIsInstance(on_failed.call_args.args[0], LearningCancelled)
+        self.assertRaises(NotLearning, self.obj.get_learn_job, 10)
+
+    async def test_learn_logs_every_chunk(self) -> None:
+        self.conf.markov_learning_chunk_size = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b', 'c d', 'e f', 'g h']))
+
+        logged = [ call.args[0].newest_message for call in self.markov_repository.append_delta.call_args_list ]
+        self.assertListEqual(logged, [1, 2, 3, 4])
+
+    async def test_learn_logs_small_updates_without_saving_the_model(self) -> None:
+        channel = make_channel(10, ['a b c d'])
+        await self.obj.learn(channel)
+        msg = make_channel(10, ['a b']).messages[0]
+        msg.id = 2
+        channel.messages.append(msg)
+
+        await self.obj.learn(channel)
+
+        self.markov_repository.save_model.assert_awaited_once()
+        self.markov_repository.delete_deltas.assert_awaited_once_with(10)
+        self.assertEqual(self.markov_repository.append_delta.call_args.args[0].transitions, { ('a', 'a b'): 1 })
+
+    async def test_learn_saves_the_model_once_the_log_outgrows_it(self) -> None:
+        self.conf.markov_log_compaction_ratio = 0.5
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b c d'])
+        await obj.learn(channel)
+        msg = make_channel(10, ['x y z a']).messages[0]
+        msg.id = 2
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+
+        self.assertEqual(self.markov_repository.save_model.await_count, 2)
+        self.assertEqual(self.markov_repository.save_model.call_args.args[0].newest_message, 2)
+
+    async def test_say_replays_logged_changes_onto_persisted_model(self) -> None:
+        channel = make_channel(10, ['a b c d'])
+        await self.obj.learn(channel)
+        msg = make_channel(10, ['d e']).messages[0]
+        msg.id = 2
+        channel.messages.append(msg)
+        await self.obj.learn(channel)
+        self.markov_repository.get_model.return_value = self.markov_repository.save_model.call_args.args[0]
+        self.markov_repository.get_deltas.return_value = [
+            call.args[0] for call in self.markov_repository.append_delta.call_args_list
+        ]
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        ret = await obj.say(channel, 'a')
+
+        self.assertEqual(ret, 'a b c d e')
+        self.assertListEqual(list(obj.grammars[10].row_counts[0]), [1])
+        self.assertEqual(obj.newest_message[10], 2)
+
+    async def test_say_answers_from_pool_of_pregenerated_messages(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b c'])
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+        generate = self.patch('MarkovGenerator')
+
+        ret = await obj.say(channel)
+
+        self.assertEqual(ret, 'a b c')
+        self.assertEqual(len(obj.pregenerated[10]), 2)
+        generate.assert_not_called()
+
+    async def test_say_refills_pool_below_watermark(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        self.conf.markov_pregeneration_watermark = 3
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b c'])
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+
+        await obj.say(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+
+        self.assertEqual(len(obj.pregenerated[10]), 3)
+
+    async def test_learning_replaces_messages_pregenerated_from_outdated_model(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['x y'])
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+        msg = MagicMock()
+        msg.id = 2
+        msg.author = MagicMock()
+        msg.content = 'y z'
+        msg.created_at = channel.messages[0].created_at
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+
+        self.assertEqual(len(obj.pregenerated[10]), 3)
+        self.assertNotIn('x y', obj.pregenerated[10])
+
+    async def test_pregeneration_generates_messages_in_batch(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        generate = self.patch('MarkovGenerator')
+
+        await obj.learn(make_channel(10, ['a b c']))
+        await asyncio.gather(*obj.pregenerations.values())
+
+        self.assertListEqual(list(obj.pregenerated[10]), ['a b c'] * 3)
+        self.assertIn(10, obj.batch_generators)
+        generate.assert_not_called()
+
+    async def test_pregeneration_generates_messages_one_at_a_time_for_multiple_orders(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        self.conf.markov_gram_orders = [2, 3]
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b c']))
+        await asyncio.gather(*obj.pregenerations.values())
+
+        self.assertEqual(len(obj.pregenerated[10]), 3)
+        self.assertNotIn(10, obj.batch_generators)
+
+    async def test_learning_discards_outdated_batch_generator(self) -> None:
+        self.conf.markov_pregenerated_messages = 3
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['x y'])
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+        generator = obj.batch_generators[10]
+        msg = make_channel(10, ['y z']).messages[0]
+        msg.id = 2
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+        await asyncio.gather(*obj.pregenerations.values())
+
+        self.assertIsNot(obj.batch_generators[10], generator)
+
+    async def test_least_recently_used_models_are_evicted_over_memory_budget(self) -> None:
+        self.conf.markov_memory_budget = 0
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b']))
+        await obj.learn(make_channel(20, ['c d']))
+
+        self.assertNotIn(10, obj.grammars)
+        self.assertIn(20, obj.grammars)
+        self.assertEqual(obj.newest_message[10], 1)
+
+    async def test_say_reloads_evicted_model(self) -> None:
+        self.conf.markov_memory_budget = 0
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        saved = {}
+        self.markov_repository.save_model.side_effect = lambda model: saved.update({ model.channel_id: model })
+        self.markov_repository.get_model.side_effect = lambda channel_id: saved.get(channel_id)
+        channel = make_channel(10, ['a b'])
+        await obj.learn(channel)
+        await obj.learn(make_channel(20, ['c d']))
+
+        ret = await obj.say(channel)
+
+        self.assertEqual(ret, 'a b')
+        self.assertNotIn(20, obj.grammars)
+
+    async def test_learn_keeps_evicted_model(self) -> None:
+        self.conf.markov_memory_budget = 0
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        saved = {}
+        self.markov_repository.save_model.side_effect = lambda model: saved.update({ model.channel_id: model })
+        self.markov_repository.get_model.side_effect = lambda channel_id: saved.get(channel_id)
+        channel = make_channel(10, ['a b'])
+        await obj.learn(channel)
+        await obj.learn(make_channel(20, ['c d']))
+        msg = make_channel(10, ['a b']).messages[0]
+        msg.id = 2
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+
+        self.assertListEqual(list(obj.grammars[10].row_counts[0]), [2])
+
+    async def test_learn_freezes_large_models(self) -> None:
+        self.conf.markov_freeze_threshold = 2
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b']))
+        await obj.learn(make_channel(20, ['a b c']))
+
+        self.markov_repository.save_frozen_grammar.assert_awaited_once()
+        self.assertEqual(self.markov_repository.save_frozen_grammar.call_args.args[0], 20)
+
+    async def test_learn_deletes_frozen_model_of_model_below_threshold(self) -> None:
+        self.conf.markov_freeze_threshold = 10
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b']))
+
+        self.markov_repository.save_frozen_grammar.assert_not_awaited()
+        self.markov_repository.delete_frozen_grammar.assert_awaited_with(10)
+
+    async def test_say_uses_frozen_model(self) -> None:
+        self.conf.markov_freeze_threshold = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        self.markov_repository.get_frozen_grammar.return_value = FrozenMarkovGrammar(
+            FrozenMarkovGrammar.freeze(grammar, SentenceStarts(['a']), 1)
+        )
+
+        ret = await obj.say(make_channel(10, []))
+
+        self.assertEqual(ret, 'a b')
+        self.markov_repository.get_model.assert_not_awaited()
+
+    async def test_say_generates_message_around_word_from_frozen_model(self) -> None:
+        self.conf.markov_freeze_threshold = 1
+        self.conf.markov_gram_orders = [3]
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        await obj.learn(make_channel(10, ['a b c d']))
+        grammar, reverse_grammar = obj.grammars[10], obj.reverse_grammars[10]
+        self.markov_repository.get_frozen_grammar.return_value = FrozenMarkovGrammar(
+            FrozenMarkovGrammar.freeze(grammar, obj.sentence_starts[10], 1, reverse_grammar)
+        )
+        obj._evict(10)
+
+        ret = await obj.say(make_channel(10, []), 'c')
+
+        self.assertEqual(ret, 'a b c d')
+        self.assertIsInstance(obj.grammars[10], FrozenMarkovGrammar)
+
+    async def test_learn_replaces_frozen_model_with_mutable_model(self) -> None:
+        self.conf.markov_freeze_threshold = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        grammar = MarkovGrammar()
+        grammar += ['a', 'a b']
+        self.markov_repository.get_frozen_grammar.return_value = FrozenMarkovGrammar(
+            FrozenMarkovGrammar.freeze(grammar, SentenceStarts(['a']), 1)
+        )
+        self.markov_repository.get_model.return_value = MarkovModelEntity(10, grammar.to_dict(), MarkovGrammar().to_dict(), SentenceStarts(['a']).to_dict(), 1)
+        channel = make_channel(10, ['a b', 'b c'])
+        await obj.say(channel)
+
+        await obj.learn(channel)
+
+        self.assertIsInstance(obj.grammars[10], MarkovGrammar)
+        self.assertEqual(len(obj.grammars[10]), 2)
+
+    async def test_learn_prunes_rare_transitions(self) -> None:
+        self.conf.markov_prune_min_count = 2
+        self.conf.markov_log_compaction_ratio = 0.25
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b', 'c d', 'a b'])
+        await obj.learn(channel)
+        msg = make_channel(10, ['a b']).messages[0]
+        msg.id = 4
+        channel.messages.append(msg)
+
+        await obj.learn(channel)
+
+        self.assertEqual(len(obj.grammars[10]), 1)
+        self.assertSetEqual(set(obj.sentence_starts[10]), { 'a' })
+
+    async def test_learn_keeps_transitions_learned_since_the_last_compaction(self) -> None:
+        self.conf.markov_prune_min_count = 2
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        channel = make_channel(10, ['a b'])
+
+        for id in range(2, 4):
+            await obj.learn(channel)
+            msg = make_channel(10, ['a b']).messages[0]
+            msg.id = id
+            channel.messages.append(msg)
+
+        await obj.learn(channel)
+
+        self.assertEqual(len(obj.grammars[10]), 1)
+        self.assertEqual(obj.grammars[10].get_occurrences('a'), 3)
+
+    async def test_learn_compacts_the_log_of_long_learnings(self) -> None:
+        self.conf.markov_learning_chunk_size = 1
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+
+        await obj.learn(make_channel(10, ['a b', 'c d', 'a b', 'a b', 'a b']))
+
+        self.assertEqual(self.markov_repository.append_delta.await_count, 5)
+        self.assertEqual(self.markov_repository.save_model.await_count, 3)
+
+    async def test_import_model_restores_exported_model_in_another_channel(self) -> None:
+        channel = make_channel(10, ['a b', 'a c'])
+        channel.messages[0].author.id, channel.messages[1].author.id = 1, 2
+        await self.obj.learn(channel)
+        f = io.BytesIO()
+        await self.obj.export_model(10, f)
+        f.seek(0)
+
+        await self.obj.import_model(20, f)
+
+        self.assertDictEqual(self.obj.grammars[20].to_dict(), self.obj.grammars[10].to_dict())
+        self.assertEqual(self.obj.newest_message[20], 2)
+        self.assertEqual(await self.obj.say(make_channel(20, []), author=channel.messages[0].author), 'a b')
+        self.assertEqual(self.markov_repository.save_model.call_args.args[0].channel_id, 20)
+
+    async def test_import_model_replaces_model_of_the_channel(self) -> None:
+        await self.obj.learn(make_channel(10, ['a b']))
+        f = io.BytesIO()
+        await self.obj.export_model(10, f)
+        await self.obj.learn(make_channel(20, ['c d']))
+        self.obj.live_channels.add(20)
+        f.seek(0)
+
+        await self.obj.import_model(20, f)
+
+        self.assertEqual(await self.obj.say(make_channel(20, [])), 'a b')
+        self.assertNotIn(20, self.obj.live_channels)
+        self.markov_repository.delete_frozen_grammar.assert_awaited_with(20)
+
+    async def test_say_does_not_load_imported_model_again(self) -> None:
+        await self.obj.learn(make_channel(10, ['a b']))
+        f = io.BytesIO()
+        await self.obj.export_model(10, f)
+        f.seek(0)
+        await self.obj.import_model(20, f)
+        self.markov_repository.reset_mock()
+
+        ret = await self.obj.say(make_channel(20, []))
+
+        self.assertEqual(ret, 'a b')
+        self.markov_repository.get_model.assert_not_awaited()
+        self.markov_repository.get_deltas.assert_not_awaited()
+
+    async def test_import_model_saves_imported_model_as_is(self) -> None:
+        await self.obj.learn(make_channel(10, ['a b', 'c d', 'a b']))
+        f = io.BytesIO()
+        await self.obj.export_model(10, f)
+        self.conf.markov_prune_min_count = 2
+        obj = MarkovService(self.conf, self.markov_repository, ConvertorService(), HistoryCrawlerService(self.conf))
+        f.seek(0)
+
+        await obj.import_model(20, f)
+
+        self.assertEqual(len(obj.grammars[20]), 2)
+        self.assertDictEqual(self.markov_repository.save_model.call_args.args[0].grammar, obj.grammars[20].to_dict())
+
+    async def test_export_model_throws_exception_if_channel_not_learned(self) -> None:
+        with self.assertRaises(ChannelNotLearned):
+            await self.obj.export_model(10, io.BytesIO())
+
+    async def test_import_model_throws_exception_if_file_is_not_exported_model(self) -> None:
+        with self.assertRaises(InvalidModelArchive):
+            await self.obj.import_model(10, io.BytesIO(b'not a model'))
+
+        self.assertNotIn(10, self.obj.grammars)